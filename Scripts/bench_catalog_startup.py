@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Scripts/bench_catalog_startup.py
+
+"""
+Scripts/bench_catalog_startup.py
+
+Benchmark catalog startup in fresh worker processes: parsing the JSON files versus
+memory-mapping the compiled snapshot. Each run reports time to load the catalog and
+fetch a few components, and the process's resident memory growth.
+
+    python3 -m Scripts.bench_catalog_startup
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from memory.component_catalog import TEMPLATES_DIR, build_snapshot
+
+REPEATS = 5
+
+# Runs in a child process so every measurement starts cold
+WORKER = """
+import json, sys, time
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+from memory.component_catalog import ComponentCatalog
+before = rss_kb()
+start = time.perf_counter()
+catalog = ComponentCatalog(snapshot_path=sys.argv[1] or None)
+names = catalog.names()
+for name in ["ChatInput", "ChatOutput", "OpenAIModel", "Prompt", "Chroma"]:
+    catalog.get(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "rss_kb": rss_kb() - before, "components": len(names)}))
+"""
+
+
+def run(snapshot_path: str):
+    results = []
+    for _ in range(REPEATS):
+        out = subprocess.run([sys.executable, "-c", WORKER, snapshot_path],
+                             capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout))
+    best = min(results, key=lambda r: r["ms"])
+    return best["ms"], min(r["rss_kb"] for r in results), best["components"]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "component_catalog.snapshot")
+        header = build_snapshot(TEMPLATES_DIR, snapshot_path)
+        print(f"snapshot: {os.path.getsize(snapshot_path) / 1024:.0f} KB ({header['codec']}), version {header['version']}")
+        print(f"{'mode':>9} {'startup ms':>11} {'rss KB':>8} {'components':>11}")
+        for mode, path in (("json", ""), ("snapshot", snapshot_path)):
+            ms, rss, count = run(path)
+            print(f"{mode:>9} {ms:>11.2f} {rss:>8} {count:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# Scripts/bench_decoding.py
+
+"""
+Scripts/bench_decoding.py
+
+Per-request CPU of decoding the agents' structured outputs. The old path unwrapped
+each response, parsed it with json, built the pydantic model from the dict, dumped
+it back into dicts and merged those into the pipeline context; the optimizer and
+assembler then re-encoded the component dicts for their prompts. The new path
+validates the JSON text with the prebuilt TypeAdapters in agents/decoding.py,
+carries the typed objects in the context and encodes component specs with
+pydantic-core.
+
+Only this decode/encode path is timed (no LLM calls, no I/O). Each figure is the
+best of ROUNDS rounds; the difference is in the tens of microseconds per request
+and varies from run to run, which is small next to a single model call.
+
+    python3 -m Scripts.bench_decoding
+"""
+import time
+import types
+
+import fast_json
+from agents.decoding import decode, encode_components, output_text
+from memory.prompt_fragments import splice
+from schemas import (
+    AssemblyResult,
+    ComponentSelection,
+    OptimizedPlan,
+    RequirementContext,
+    WorkflowPlan,
+)
+
+COMPONENT_COUNTS = [3, 8, 20]
+REPEATS = 2000
+ROUNDS = 5
+
+
+def response(text: str):
+    """Stand-in for a Responses API result carrying `text`."""
+    return types.SimpleNamespace(output=[types.SimpleNamespace(content=[types.SimpleNamespace(text=text)])])
+
+
+def outputs(components: int):
+    steps = [f"Step {i}: process the data with component {i}" for i in range(components)]
+    specs = [
+        {"step": step, "component_name": f"Component{i}",
+         "parameters": {f"param_{j}": f"value {j}" for j in range(8)}}
+        for i, step in enumerate(steps)
+    ]
+    return {
+        "requirements": fast_json.dumps({
+            "use_case": "Answer questions over PDF documents with retrieval-augmented generation",
+            "key_tasks": ["Load PDF documents", "Split the text into chunks", "Embed the chunks",
+                          "Retrieve relevant chunks", "Generate an answer"],
+            "tech_stack": ["OpenAI", "Chroma DB"],
+            "constraints": ["Low cost"],
+            "ambiguities": [],
+        }),
+        "plan": fast_json.dumps({"steps": steps}),
+        "selection": fast_json.dumps({"components": specs}),
+        "optimized": fast_json.dumps({"components": specs, "needs_clarification": False, "ambiguities": []}),
+        "flow": fast_json.dumps({"flow_json": {"nodes": [
+            {"id": f"node_{i}", "type": spec["component_name"], "data": spec["parameters"]} for i, spec in enumerate(specs)
+        ]}}),
+    }
+
+
+def _unwrap(resp):
+    content = resp.output[0].content
+    if isinstance(content, list):
+        content = content[0]
+    if hasattr(content, 'text'):
+        content = content.text
+    if isinstance(content, str):
+        return fast_json.loads(content)
+    return content
+
+
+def old_request(texts):
+    """Decode path before the TypeAdapter layer: dicts dumped and rebuilt at each node."""
+    context = {"prompt": "..."}
+    requirements = RequirementContext(**_unwrap(response(texts["requirements"])))
+    context = {**context, **requirements.model_dump()}
+    plan = WorkflowPlan(**_unwrap(response(texts["plan"])))
+    context = {**context, "plan": {**plan.model_dump(), "plan_pattern_id": None}}
+    selection = ComponentSelection(**_unwrap(response(texts["selection"])))
+    context = {**context, "components": {"components": [c.model_dump() for c in selection.components]}}
+    splice({"components": context["components"]["components"], "constraints": context["constraints"]})
+    optimized = OptimizedPlan(**_unwrap(response(texts["optimized"])))
+    comps = [c.model_dump() for c in optimized.components]
+    context = {**context, "components": comps, "needs_clarification": optimized.needs_clarification,
+               "ambiguities": optimized.ambiguities}
+    splice({"components": context["components"]})
+    result = AssemblyResult(**_unwrap(response(texts["flow"])))
+    return {**context, "flow_json": result.flow_json}
+
+
+def new_request(texts):
+    """Current path: validate_json on the text, typed objects carried in the context."""
+    context = {"prompt": "..."}
+    requirements = decode(output_text(response(texts["requirements"])), RequirementContext)
+    context = {**context, "requirements": requirements}
+    plan = decode(output_text(response(texts["plan"])), WorkflowPlan)
+    context = {**context, "plan": plan}
+    selection = decode(output_text(response(texts["selection"])), ComponentSelection)
+    context = {**context, "selection": selection}
+    splice({"components": encode_components(selection.components), "constraints": requirements.constraints})
+    optimized = decode(output_text(response(texts["optimized"])), OptimizedPlan)
+    context = {**context, "optimized": optimized}
+    splice({"components": encode_components(optimized.components)})
+    result = decode(output_text(response(texts["flow"])), AssemblyResult)
+    return {**context, "flow_json": result.flow_json}
+
+
+def per_request_us(fn, texts) -> float:
+    fn(texts)
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            fn(texts)
+        best = min(best, time.perf_counter() - start)
+    return best / REPEATS * 1e6
+
+
+def main():
+    print(f"{'components':>10} {'old us':>9} {'new us':>9} {'saved us':>9} {'speedup':>8}")
+    for count in COMPONENT_COUNTS:
+        texts = outputs(count)
+        old = per_request_us(old_request, texts)
+        new = per_request_us(new_request, texts)
+        print(f"{count:>10} {old:>9.1f} {new:>9.1f} {old - new:>9.1f} {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# Scripts/bench_edge_handles.py
+
+"""
+Scripts/bench_edge_handles.py
+
+Check that the memoized, non-recursive handle encoder produces byte-for-byte the
+same edges as the original recursive implementation, then time both on edge
+lists of increasing size. tests/test_edge_handles.py runs the same equivalence
+check under pytest.
+
+    python3 -m Scripts.bench_edge_handles
+"""
+import json
+import random
+import time
+from urllib.parse import quote
+
+from flow.handles import generate_edges, handle_cache_stats, sorted_json
+
+SIZES = [100, 1000, 10000]
+PORTS_PER_NODE = 3
+
+
+def custom_json_dumps(obj):
+    """The original recursive handle encoder."""
+    if isinstance(obj, dict):
+        return "{" + ",".join(f'"{k}":{custom_json_dumps(v)}' for k, v in sorted(obj.items())) + "}"
+    elif isinstance(obj, list):
+        return "[" + ",".join(custom_json_dumps(item) for item in obj) + "]"
+    elif obj is None:
+        return "null"
+    else:
+        return json.dumps(obj)
+
+
+def reference_edge(source_node_id, source_node_type, target_node_id, output_name="text",
+                   output_types=["Message"], target_field_name="input_value",
+                   target_field_type="str", input_types=None):
+    """The original generate_edge_handles, kept verbatim as the reference."""
+    if input_types is None:
+        input_types = output_types
+    source_handle = {
+        "dataType": source_node_type,
+        "id": source_node_id,
+        "name": output_name,
+        "output_types": output_types
+    }
+    target_handle = {
+        "fieldName": target_field_name,
+        "id": target_node_id,
+        "inputTypes": input_types,
+        "type": target_field_type
+    }
+
+    source_handle_str = quote(custom_json_dumps(source_handle))
+    target_handle_str = quote(custom_json_dumps(target_handle))
+    edge_id = f"reactflow__edge-{source_node_id}{source_handle_str}-{target_node_id}{target_handle_str}"
+    return {
+        "id": edge_id,
+        "source": source_node_id,
+        "target": target_node_id,
+        "sourceHandle": source_handle_str,
+        "targetHandle": target_handle_str,
+        "type": "default",
+        "data": {
+            "sourceHandle": source_handle,
+            "targetHandle": target_handle
+        }
+    }
+
+
+def edge_specs(n_edges: int, seed: int = 0):
+    """Edges over n_edges / 4 nodes, so ports repeat the way they do in imported flows."""
+    rng = random.Random(seed)
+    n_nodes = max(2, n_edges // 4)
+    types = ["Message", "Data", "DataFrame", "Embeddings", "LanguageModel", "Tool", "Memory", "Text"]
+    specs = []
+    # Each component type has fixed port types
+    outputs = {(c, p): rng.sample(types, 1 + p % 2) for c in range(40) for p in range(PORTS_PER_NODE)}
+    inputs = {(c, p): rng.sample(types, 1 + p) for c in range(40) for p in range(PORTS_PER_NODE)}
+    for _ in range(n_edges):
+        source, target = rng.sample(range(n_nodes), 2)
+        out_port, in_port = rng.randrange(PORTS_PER_NODE), rng.randrange(PORTS_PER_NODE)
+        specs.append({
+            "source_node_id": f"Component-{source:05d}",
+            "source_node_type": f"Component{source % 40}",
+            "target_node_id": f"Component-{target:05d}",
+            "output_name": f"output_{out_port}",
+            "output_types": outputs[source % 40, out_port],
+            "target_field_name": f"field_{in_port}",
+            "target_field_type": "other",
+            "input_types": inputs[target % 40, in_port],
+        })
+    return specs
+
+
+# Values outside the usual shape: escaping, unicode, None, numbers, nesting, tuples
+EDGE_CASES = [
+    {"source_node_id": "ChatInput-a1", "source_node_type": "ChatInput", "target_node_id": "ChatOutput-b2"},
+    {"source_node_id": 'quo"te\\s', "source_node_type": "Tab\tType", "target_node_id": "ünï cödé-✓",
+     "output_name": "out put", "output_types": ["Mes\"sage", "Ünïcode"], "input_types": []},
+    {"source_node_id": "n1", "source_node_type": "T", "target_node_id": "n2", "output_types": None},
+    {"source_node_id": "n1", "source_node_type": "T", "target_node_id": "n2",
+     "output_types": [1, 2.5, True, None, ["nested", {"b": 1, "a": [None]}]], "target_field_type": None},
+    {"source_node_id": "n1", "source_node_type": "T", "target_node_id": "n2",
+     "output_types": ("tu", "ple"), "input_types": ("x",)},
+    {"source_node_id": 7, "source_node_type": "T", "target_node_id": 8, "output_types": [True], "input_types": [1]},
+    {"source_node_id": 7, "source_node_type": "T", "target_node_id": 8, "output_types": [1], "input_types": [True]},
+    {"source_node_id": 1, "source_node_type": "T", "target_node_id": True, "output_types": ["a"]},
+    {"source_node_id": True, "source_node_type": "T", "target_node_id": 1, "output_types": ["a"]},
+]
+
+
+def check_equivalence():
+    specs = edge_specs(2000, seed=1) + EDGE_CASES
+    expected = [reference_edge(**spec) for spec in specs]
+    # Twice: first call fills the caches, second call is served from them
+    for _ in range(2):
+        actual = generate_edges(specs)
+        for want, got in zip(expected, actual):
+            assert got == want, f"edge differs:\n{got}\n{want}"
+            assert json.dumps(got) == json.dumps(want)
+    for value in [{"b": [1, {"d": None, "c": "x"}], "a": []}, [], {}, "s", 1.5, None, [[[]]]]:
+        assert sorted_json(value) == custom_json_dumps(value), value
+    print(f"equivalence: {len(specs)} edges byte-for-byte identical")
+
+
+def main():
+    check_equivalence()
+    print(f"{'edges':>7} {'reference ms':>13} {'cold ms':>9} {'warm ms':>9} {'speedup':>8}")
+    for size in SIZES:
+        specs = edge_specs(size, seed=size)
+        start = time.perf_counter()
+        [reference_edge(**spec) for spec in specs]
+        reference_time = time.perf_counter() - start
+
+        # Fresh node ids so the first run pays for encoding every port once
+        for spec in specs:
+            spec["source_node_id"] += f"-{size}"
+            spec["target_node_id"] += f"-{size}"
+        start = time.perf_counter()
+        generate_edges(specs)
+        cold_time = time.perf_counter() - start
+        start = time.perf_counter()
+        generate_edges(specs)
+        warm_time = time.perf_counter() - start
+        print(f"{size:>7} {reference_time * 1000:>13.2f} {cold_time * 1000:>9.2f} "
+              f"{warm_time * 1000:>9.2f} {reference_time / cold_time:>7.1f}x")
+    print(f"handle cache: {handle_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# Scripts/bench_expand.py
+
+"""
+Scripts/bench_expand.py
+
+Benchmark expansion of minimal flows into full genericNode JSON: time and
+extra memory of copy-on-write expansion versus deep-copying each template,
+plus streamed serialization time and size.
+
+    python3 -m Scripts.bench_expand
+"""
+import copy
+import json
+import random
+import time
+import tracemalloc
+
+from flow.expand import FlowExpander
+from memory.component_catalog import component_catalog
+
+SIZES = [10, 100, 500]
+
+
+def minimal_flow(n_nodes: int, seed: int = 0):
+    rng = random.Random(seed)
+    names = component_catalog.names()
+    nodes = []
+    for i in range(n_nodes):
+        name = rng.choice(names)
+        fields = [k for k, v in component_catalog.get(name)["template"].items() if isinstance(v, dict) and k != "code"]
+        data = {field: f"value-{i}" for field in rng.sample(fields, min(3, len(fields)))}
+        nodes.append({"id": f"{name}-{i}", "type": name, "position": {"x": i, "y": 0}, "data": data})
+    return {"nodes": nodes, "edges": []}
+
+
+def deepcopy_expand(flow):
+    """Baseline: a full deep copy of the template per node."""
+    nodes = []
+    for node in flow["nodes"]:
+        definition = copy.deepcopy(component_catalog.get(node["type"]))
+        for name, value in node["data"].items():
+            definition["template"][name]["value"] = value
+        nodes.append({"id": node["id"], "type": "genericNode", "position": node["position"],
+                      "data": {"id": node["id"], "type": node["type"], "node": definition}})
+    return {"nodes": nodes, "edges": flow["edges"]}
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    component_catalog.load()
+    expander = FlowExpander()
+    print(f"{'nodes':>6} {'cow ms':>8} {'cow KB':>8} {'deepcopy ms':>12} {'deepcopy KB':>12} "
+          f"{'stream ms':>10} {'warm ms':>8} {'json.dumps ms':>14} {'bytes':>10}")
+    for size in SIZES:
+        flow = minimal_flow(size)
+        expanded, cow_time, cow_peak = measure(expander.expand_flow, flow)
+        _, deep_time, deep_peak = measure(deepcopy_expand, flow)
+
+        start = time.perf_counter()
+        streamed = "".join(expander.iter_json(expanded))
+        stream_time = time.perf_counter() - start
+        start = time.perf_counter()
+        "".join(expander.iter_json(expanded))
+        warm_time = time.perf_counter() - start
+        start = time.perf_counter()
+        baseline = json.dumps(expanded, separators=(",", ":"))
+        dumps_time = time.perf_counter() - start
+        assert json.loads(streamed) == json.loads(baseline), "streamed JSON differs from json.dumps"
+
+        print(f"{size:>6} {cow_time * 1000:>8.2f} {cow_peak / 1024:>8.0f} {deep_time * 1000:>12.2f} "
+              f"{deep_peak / 1024:>12.0f} {stream_time * 1000:>10.2f} {warm_time * 1000:>8.2f} "
+              f"{dumps_time * 1000:>14.2f} {len(streamed):>10}")
+
+
+if __name__ == "__main__":
+    main()
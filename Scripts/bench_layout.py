@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Scripts/bench_layout.py
+
+"""
+Scripts/bench_layout.py
+
+Benchmark the layered flow layout on random DAGs of increasing size.
+
+    python3 -m Scripts.bench_layout
+"""
+import random
+import time
+
+from flow.layout import layout_nodes
+
+SIZES = [10, 100, 500, 1000, 5000]
+EDGES_PER_NODE = 2
+REPEATS = 5
+
+
+def random_flow(n_nodes: int, seed: int = 0):
+    """Random DAG: each node gets up to EDGES_PER_NODE inputs from earlier nodes."""
+    rng = random.Random(seed)
+    nodes = [{"id": f"n{i}", "type": "Component", "data": {}} for i in range(n_nodes)]
+    edges = []
+    for i in range(1, n_nodes):
+        for _ in range(rng.randint(1, EDGES_PER_NODE)):
+            j = rng.randrange(max(0, i - 20), i)
+            edges.append({"source": f"n{j}", "target": f"n{i}"})
+    rng.shuffle(nodes)
+    return nodes, edges
+
+
+def main():
+    print(f"{'nodes':>7} {'edges':>7} {'best ms':>9} {'us/node':>9}")
+    for size in SIZES:
+        nodes, edges = random_flow(size)
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            layout_nodes(nodes, edges)
+            best = min(best, time.perf_counter() - start)
+        print(f"{size:>7} {len(edges):>7} {best * 1000:>9.2f} {best * 1e6 / size:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
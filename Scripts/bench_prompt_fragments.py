@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Scripts/bench_prompt_fragments.py
+
+"""
+Scripts/bench_prompt_fragments.py
+
+Benchmark building the /design user message under load: parsing each retrieved
+template document and re-encoding the whole payload per request (the previous path)
+versus splicing cached lean template fragments. Requests run back to back and on a
+thread pool, as concurrent requests would in one worker.
+
+    python3 -m Scripts.bench_prompt_fragments
+"""
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from memory.component_catalog import component_catalog
+from memory.prompt_fragments import PromptFragments, splice
+
+REQUESTS = 500
+TEMPLATES_PER_REQUEST = 20
+THREADS = 8
+DOCS = ["Langflow documentation chunk " * 40] * 3
+
+
+def make_requests(seed: int = 0):
+    """Template results as the vector store returns them: component name plus JSON document."""
+    rng = random.Random(seed)
+    names = component_catalog.names()
+    documents = {name: json.dumps(component_catalog.get(name), indent=2) for name in names}
+    popular = rng.sample(names, 60)
+    return [
+        [{"metadata": {"component": name}, "document": documents[name]} for name in rng.sample(popular, TEMPLATES_PER_REQUEST)]
+        for _ in range(REQUESTS)
+    ]
+
+
+def baseline_message(template_results):
+    templates = {entry["metadata"]["component"]: json.loads(entry["document"]) for entry in template_results}
+    return json.dumps({"prompt": "Build a RAG chatbot", "documentation": DOCS, "templates": templates}, ensure_ascii=False)
+
+
+def fragment_message(fragments: PromptFragments, template_results):
+    templates = fragments.templates(fragments.entries(template_results), "v1")
+    return splice({"prompt": "Build a RAG chatbot", "documentation": DOCS, "templates": templates})
+
+
+def run(build, requests, threads: int):
+    start = time.perf_counter()
+    if threads == 1:
+        sizes = [len(build(r)) for r in requests]
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            sizes = [len(m) for m in pool.map(build, requests)]
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(sizes) / len(sizes)
+
+
+def main():
+    component_catalog.load()
+    requests = make_requests()
+    fragments = PromptFragments()
+    fragment_message(fragments, requests[0])  # warm the catalog decode path
+    print(f"{REQUESTS} requests x {TEMPLATES_PER_REQUEST} templates")
+    print(f"{'path':>10} {'threads':>8} {'ms/request':>11} {'req/s':>8} {'avg KB':>8}")
+    for threads in (1, THREADS):
+        for label, build in (("baseline", baseline_message),
+                             ("fragments", lambda r: fragment_message(fragments, r))):
+            elapsed, size = run(build, requests, threads)
+            print(f"{label:>10} {threads:>8} {elapsed * 1000 / REQUESTS:>11.3f} "
+                  f"{REQUESTS / elapsed:>8.0f} {size / 1024:>8.1f}")
+    print(f"fragment cache: {fragments.stats()}")
+
+
+if __name__ == "__main__":
+    main()
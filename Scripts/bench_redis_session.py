@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# Scripts/bench_redis_session.py
+
+"""
+Scripts/bench_redis_session.py
+
+Bytes stored per session and Redis ops/sec for the session store. The old client
+kept each session as one JSON string, so every change rewrote (and every read parsed)
+the whole context; the current one keeps a hash of msgpack-encoded fields, compressed
+when large, and updates only the fields that changed.
+
+The size comparison runs offline. The ops/sec part needs a Redis server at REDIS_URL
+and is skipped when none answers; it writes and deletes "session:h:bench:*" and
+"bench:*:json" keys.
+
+    python3 -m Scripts.bench_redis_session
+"""
+import asyncio
+import json
+import time
+
+from memory.redis_client import RedisClient, encode_value
+
+SESSIONS = 200
+COMPONENT_COUNTS = [3, 8, 20]
+
+
+def context(components: int) -> dict:
+    """A pipeline context as the session store would hold it after a design run."""
+    specs = [
+        {"step": f"Step {i}: process the data with component {i}", "component_name": f"Component{i}",
+         "parameters": {f"param_{j}": f"value {j}" for j in range(8)}}
+        for i in range(components)
+    ]
+    return {
+        "prompt": "Build a chatbot that answers questions over our PDF documents with citations",
+        "requirements": {
+            "use_case": "Answer questions over PDF documents with retrieval-augmented generation",
+            "key_tasks": ["Load PDF documents", "Split the text into chunks", "Embed the chunks",
+                          "Retrieve relevant chunks", "Generate an answer"],
+            "tech_stack": ["OpenAI", "Chroma DB"],
+            "constraints": ["Low cost"],
+            "ambiguities": [],
+        },
+        "plan": {"steps": [spec["step"] for spec in specs], "plan_pattern_id": None},
+        "selection": {"components": specs},
+        "optimized": {"components": specs, "needs_clarification": False, "ambiguities": []},
+        "clarifications": {},
+        "flow_json": {"nodes": [
+            {"id": f"node_{i}", "type": spec["component_name"], "data": spec["parameters"]}
+            for i, spec in enumerate(specs)
+        ], "edges": [{"source": f"node_{i}", "target": f"node_{i + 1}"} for i in range(components - 1)]},
+    }
+
+
+def stored_bytes(ctx: dict):
+    """(old JSON string, hash fields) sizes, counting field names for the hash."""
+    old = len(json.dumps(ctx).encode("utf-8"))
+    new = sum(len(name) + len(encode_value(value)) for name, value in ctx.items())
+    return old, new
+
+
+async def ops_per_sec(client: RedisClient, ctx: dict):
+    """Full-context writes, single-field updates and full reads per second, old vs new."""
+    redis = client._redis
+    ids = [f"bench:{i}" for i in range(SESSIONS)]
+    update = {"clarifications": {"Which vector store should be used?": "Chroma DB"}}
+
+    async def rate(op) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*(op(session_id) for session_id in ids))
+        return SESSIONS / (time.perf_counter() - start)
+
+    async def old_write(session_id):
+        await redis.set(f"{session_id}:json", json.dumps(ctx), ex=client.default_ttl)
+
+    async def old_update(session_id):
+        stored = json.loads(await redis.get(f"{session_id}:json"))
+        stored.update(update)
+        await redis.set(f"{session_id}:json", json.dumps(stored), ex=client.default_ttl)
+
+    async def old_read(session_id):
+        json.loads(await redis.get(f"{session_id}:json"))
+
+    results = {
+        "write": (await rate(old_write),
+                  await rate(lambda session_id: client.set_session_context(session_id, ctx))),
+        "update": (await rate(old_update),
+                   await rate(lambda session_id: client.update_session_context(session_id, update))),
+        "read": (await rate(old_read),
+                 await rate(client.get_session_context)),
+    }
+    await redis.delete(*(f"{session_id}:json" for session_id in ids))
+    await asyncio.gather(*(client.clear_session_context(session_id) for session_id in ids))
+    return results
+
+
+async def run():
+    print(f"{'components':>10} {'json B':>8} {'hash B':>8} {'saved':>7}")
+    for count in COMPONENT_COUNTS:
+        old, new = stored_bytes(context(count))
+        print(f"{count:>10} {old:>8} {new:>8} {1 - new / old:>6.0%}")
+
+    client = RedisClient()
+    try:
+        await client.connect()
+    except Exception as e:
+        print(f"\nSkipping ops/sec: no Redis at {client.redis_url} ({e})")
+        return
+    try:
+        print(f"\n{SESSIONS} concurrent sessions, pool of {client.max_connections}")
+        print(f"{'components':>10} {'op':>7} {'old ops/s':>10} {'new ops/s':>10}")
+        for count in COMPONENT_COUNTS:
+            for op, (old, new) in (await ops_per_sec(client, context(count))).items():
+                print(f"{count:>10} {op:>7} {old:>10.0f} {new:>10.0f}")
+    finally:
+        await client.disconnect()
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# Scripts/bench_requirement_extractor.py
+
+"""
+Scripts/bench_requirement_extractor.py
+
+Run the local requirement extractor over sample prompts: the extracted context,
+its confidence, whether the analyzer would skip the LLM, and the time per call.
+
+    python3 -m Scripts.bench_requirement_extractor
+"""
+import time
+
+from agents.requirement_extractor import requirement_extractor, REQUIREMENT_EXTRACTOR_CONFIDENCE
+
+PROMPTS = [
+    "rag system",
+    "RAG over PDFs with OpenAI and Chroma",
+    "chatbot",
+    "Build a chatbot with GPT-4o that answers questions about my PDF documents",
+    "simple agent with tavily search and calculator",
+    "Summarize YouTube videos with Claude",
+    "translate text cheaply",
+    "local rag with ollama",
+    "scrape a website and extract product prices into a spreadsheet",
+    "I need a workflow for our sales team that qualifies leads from HubSpot, enriches them and drafts outreach emails",
+    "Design a multi-tenant document review platform with approval steps and audit logs",
+]
+REPEATS = 200
+
+
+def main():
+    requirement_extractor.build()
+    skipped = 0
+    for prompt in PROMPTS:
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            context, confidence = requirement_extractor.extract(prompt)
+        micros = (time.perf_counter() - start) / REPEATS * 1e6
+        local = context is not None and confidence >= REQUIREMENT_EXTRACTOR_CONFIDENCE
+        skipped += local
+        print(f"{'local' if local else 'LLM  '} {confidence:4.2f} {micros:6.1f}us  {prompt}")
+        if context is not None:
+            print(f"      use_case={context['use_case']!r} tech_stack={context['tech_stack']} constraints={context['constraints']}")
+    print(f"Skipped the LLM for {skipped}/{len(PROMPTS)} prompts (threshold {REQUIREMENT_EXTRACTOR_CONFIDENCE})")
+
+
+if __name__ == "__main__":
+    main()
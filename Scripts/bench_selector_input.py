@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# Scripts/bench_selector_input.py
+
+"""
+Scripts/bench_selector_input.py
+
+Compare the selector's model input before and after two-phase selection: the old
+single call sent 50 lean templates with every request, while the new calls send a
+shortlist of component cards per step, then the lean templates of the chosen
+components only. Token counts are estimated at 4 characters per token; the live
+figures are under "selector.*" in the /metrics endpoint.
+
+    python3 -m Scripts.bench_selector_input
+"""
+import time
+
+import fast_json
+from agents.systemprompts import SELECTOR_PROMPT, SELECTOR_SHORTLIST_PROMPT
+from memory.component_cards import component_cards
+from memory.component_catalog import component_catalog
+from memory.prompt_fragments import prompt_fragments, splice
+
+# Number of templates the old selector retrieved per request
+OLD_TEMPLATE_COUNT = 50
+REPEATS = 20
+
+SCENARIOS = [
+    ["Load PDF documents from a directory", "Split the text into chunks", "Embed the chunks with OpenAI embeddings",
+     "Store the vectors in a Chroma vector store", "Retrieve relevant chunks for the question", "Generate an answer with an LLM"],
+    ["Receive a chat message", "Search the web for the question", "Summarize the results with an LLM", "Send the chat response"],
+    ["Read a CSV file", "Convert rows to a dataframe", "Answer questions about the data with an agent"],
+]
+
+
+def tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def old_message(steps):
+    names = component_catalog.names()[:OLD_TEMPLATE_COUNT]
+    return SELECTOR_PROMPT + splice({
+        "steps": steps,
+        "tech_stack": [],
+        "constraints": [],
+        "available_components": names,
+        "documentation": [],
+        "templates": prompt_fragments.templates((name, None) for name in names),
+    })
+
+
+def new_messages(steps):
+    shortlists = [{"step": step, "candidates": component_cards.shortlist(step)} for step in steps]
+    phase_one = SELECTOR_SHORTLIST_PROMPT + fast_json.dumps({"steps": shortlists, "tech_stack": [], "constraints": []})
+    # Assume the model picks the top candidate of every step
+    chosen = list(dict.fromkeys(entry["candidates"][0]["name"] for entry in shortlists if entry["candidates"]))
+    phase_two = SELECTOR_PROMPT + splice({
+        "steps": steps,
+        "tech_stack": [],
+        "constraints": [],
+        "available_components": chosen,
+        "documentation": [],
+        "templates": prompt_fragments.templates((name, None) for name in chosen),
+    })
+    return phase_one, phase_two
+
+
+def best_of(fn, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    component_cards.build()
+    print(f"{'steps':>5} {'old tok':>8} {'phase1 tok':>11} {'phase2 tok':>11} {'saved':>7} {'old ms':>7} {'new ms':>7}")
+    for steps in SCENARIOS:
+        old, old_time = best_of(old_message, steps)
+        (phase_one, phase_two), new_time = best_of(new_messages, steps)
+        new_total = tokens(phase_one) + tokens(phase_two)
+        print(f"{len(steps):>5} {tokens(old):>8} {tokens(phase_one):>11} {tokens(phase_two):>11} "
+              f"{1 - new_total / tokens(old):>6.0%} {old_time * 1000:>7.2f} {new_time * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
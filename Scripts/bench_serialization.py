@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Scripts/bench_serialization.py
+
+"""
+Scripts/bench_serialization.py
+
+Benchmark response serialization for expanded flows: encode time of the standard
+json module versus fast_json (orjson when installed), and bytes on the wire
+uncompressed, gzip and brotli at the middleware's settings.
+
+    python3 -m Scripts.bench_serialization
+"""
+import gzip
+import json
+import time
+
+import fast_json
+from Scripts.bench_expand import minimal_flow
+from flow.expand import flow_expander
+from memory.component_catalog import component_catalog
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SIZES = [10, 100, 500]
+REPEATS = 5
+
+
+def best_of(fn, *args):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    component_catalog.load()
+    print(f"fast_json backend: {'orjson' if fast_json.orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'nodes':>6} {'json ms':>9} {'fast ms':>9} {'speedup':>8} {'raw KB':>9} {'gzip KB':>9} {'br KB':>9}")
+    for size in SIZES:
+        payload = {"flow_json": flow_expander.expand_flow(minimal_flow(size))}
+        baseline, json_time = best_of(lambda p: json.dumps(p, ensure_ascii=False).encode("utf-8"), payload)
+        body, fast_time = best_of(fast_json.dumps_bytes, payload)
+        assert fast_json.loads(body) == json.loads(baseline), "fast_json output differs"
+        gzipped = gzip.compress(body, compresslevel=6)
+        br = f"{len(brotli.compress(body, quality=5)) / 1024:>9.0f}" if brotli is not None else f"{'n/a':>9}"
+        print(f"{size:>6} {json_time * 1000:>9.2f} {fast_time * 1000:>9.2f} {json_time / fast_time:>7.1f}x "
+              f"{len(body) / 1024:>9.0f} {len(gzipped) / 1024:>9.0f} {br}")
+
+
+if __name__ == "__main__":
+    main()
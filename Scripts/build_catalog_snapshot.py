@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# Scripts/build_catalog_snapshot.py
+
+"""
+Scripts/build_catalog_snapshot.py
+
+Compile the component_categories/ JSON files into the binary catalog snapshot the
+services memory-map at startup. Run it as a build step whenever the templates change;
+a stale snapshot is detected and ignored, so forgetting it only costs startup time.
+
+    python3 -m Scripts.build_catalog_snapshot
+"""
+import logging
+
+from memory.component_catalog import SNAPSHOT_PATH, TEMPLATES_DIR, build_snapshot
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    header = build_snapshot(TEMPLATES_DIR, SNAPSHOT_PATH)
+    print(f"{SNAPSHOT_PATH}: version {header['version']}, codec {header['codec']}, "
+          f"{len(header['sources'])} source files")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,9 @@ Scripts/seed_component_docs.py
 Seed component documentation Markdown files and component templates (JSON) into Chroma DB.
 """
 import os
+import time
 import uuid
+import hashlib
 import asyncio
 import logging
 import json
@@ -88,6 +90,16 @@ async def seed_templates():
         except Exception as e:
             logging.error(f"Error processing template {fname}: {e}")
 
+def corpus_version() -> str:
+    """Content hash of the docs and templates being seeded, plus the seeding time."""
+    digest = hashlib.sha256()
+    for folder in (DOCS_DIR, TEMPLATES_DIR):
+        for fname in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, fname), "rb") as f:
+                digest.update(fname.encode("utf-8"))
+                digest.update(f.read())
+    return f"{digest.hexdigest()[:16]}-{int(time.time())}"
+
 async def main():
     # 1) Connect
     await vector_store.initialize()
@@ -98,6 +110,9 @@ async def main():
     
     # 3) Seed templates
     await seed_templates()
+
+    # 4) Publish the new corpus version so running services drop cached results
+    await vector_store.set_corpus_version(corpus_version())
     
     logging.info("Seeding complete!")
 
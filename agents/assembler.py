@@ -1,136 +1,202 @@
 import os
-import json
+import time
+import difflib
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import pprint
 
 from openai import OpenAI
-from schemas import AssemblyResult
-from memory.vector_store import vector_store
-from .systemprompts import FLOW_ASSEMBLER_PROMPT
+import fast_json
+from schemas import AssemblyResult, ComponentSpec, OptimizedPlan
+from memory.vector_store import vector_store, VectorStoreUnavailable
+from memory.prompt_fragments import prompt_fragments
+from memory.component_catalog import component_catalog
+from metrics import metrics
+from .model_router import model_router
+from .messages import build_messages, prompt_chars
+from .decoding import decode, encode_components, output_text
+from flow.edges import build_edges
+from flow.layout import layout_flow
+from flow.validator import flow_validator
+from .systemprompts import FLOW_ASSEMBLER_PROMPT, FLOW_REPAIR_PROMPT
 
 # Initialize OpenAI Responses client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
 
-async def assemble_flow(
-    optimized_plan: Dict[str, Any],
-    full_context: Dict[str, Any]
-) -> Dict[str, Any]:
+# Static instructions sent with every assembly request
+ASSEMBLER_NOTES = {
+    "Conform to Langflow JSON schema": True,
+    "Use exact component names from templates": True,
+    "List nodes in data-flow order; edges are derived locally": True,
+}
+
+# Minimum difflib ratio for a fuzzy component name match
+TEMPLATE_FUZZY_CUTOFF = float(os.getenv("TEMPLATE_FUZZY_CUTOFF", "0.6"))
+
+async def _resolve_templates(names: List[str]) -> Tuple[Dict[str, str], List[Tuple[str, Optional[str]]]]:
     """
-    Assembles a Langflow JSON workflow by:
-    1. Retrieving templates for each component
-    2. Invoking the OpenAI Responses API with components and templates
-    3. Generating a workflow that uses exact component names and structure
+    Resolve every component's template at once. Returns the resolved name per
+    requested name and the (name, document) entries for the prompt fragments.
+    1. Exact or case/separator-insensitive catalog match (no I/O).
+    2. One metadata-filtered vector store get for the names not in the catalog.
+    3. Fuzzy match against the catalog names for whatever is still missing.
     """
-    logging.info("[Assembler] Entry: assemble_flow")
-    logging.debug(f"[Assembler] Received optimized_plan: {pprint.pformat(optimized_plan)[:500]}")
-    logging.debug(f"[Assembler] Received full_context: {pprint.pformat(full_context)[:500]}")
-    try:
-        components = optimized_plan.get("components", [])
-        
-        # Retrieve templates for each component in the plan
-        component_templates = {}
-        for component_spec in components:
-            component_name = component_spec.get("component_name")
-            if not component_name:
+    resolved: Dict[str, str] = {}
+    entries: List[Tuple[str, Optional[str]]] = []
+    remaining = []
+    for name in dict.fromkeys(names):
+        canonical = flow_validator.canonical_type(name)
+        if canonical is not None:
+            resolved[name] = canonical
+            # The fragment cache reads the template from the catalog
+            entries.append((canonical, None))
+        else:
+            remaining.append(name)
+
+    if remaining:
+        try:
+            documents = await vector_store.get_templates(remaining)
+        except VectorStoreUnavailable as e:
+            logging.warning(f"[Assembler] Vector store unavailable for {remaining}; trying fuzzy matches: {e}")
+            documents = {}
+        for name in remaining:
+            if name in documents:
+                resolved[name] = name
+                entries.append((name, documents[name]))
                 continue
-                
-            # Query for templates specific to this component
-            logging.info(f"[Assembler] Retrieving template for {component_name}")
-            templates = await vector_store.query_templates(component_name=component_name)
-            
-            # Process the template if found
-            if templates:
-                try:
-                    template_data = json.loads(templates[0]["document"])
-                    component_templates[component_name] = template_data
-                    logging.info(f"[Assembler] Found template for {component_name}")
-                except json.JSONDecodeError:
-                    logging.warning(f"[Assembler] Could not parse template for {component_name}")
+            close = difflib.get_close_matches(name, component_catalog.names(), n=1, cutoff=TEMPLATE_FUZZY_CUTOFF)
+            if close:
+                logging.info(f"[Assembler] Resolved unknown component {name} to {close[0]}")
+                resolved[name] = close[0]
+                entries.append((close[0], None))
             else:
-                logging.warning(f"[Assembler] No template found for component {component_name}")
-        
-        # Build the prompt payload
-        prompt_payload = {
-            "components": components,
-            "templates": component_templates,
-            "notes": {
-                "Conform to Langflow JSON schema": True,
-                "Use exact component names from templates": True,
-                "Ensure connections are logically valid": True
-            }
-        }
-        logging.debug(f"[Assembler] Payload for OpenAI: {pprint.pformat(prompt_payload)[:500]}")
+                logging.warning(f"[Assembler] No template found for component {name}")
+    return resolved, entries
 
-        # Call the official Responses API
+def _call_model(stage: str, model: str, messages: List[Dict[str, str]]) -> Any:
+    """One JSON-mode Responses API call on `model`, recorded under `stage`; returns the output's JSON text."""
+    with model_router.track(stage, model) as call:
         response = client.responses.create(
-            model="gpt-4o",
-            input=[
-                {
-                    "role": "system",
-                    "content": FLOW_ASSEMBLER_PROMPT,
-                },
-                {
-                    "role": "user",
-                    "content": json.dumps(prompt_payload, ensure_ascii=False),
-                },
-            ],
+            model=model,
+            input=messages,
             text={"format": {"type": "json_object"}},
         )
-        logging.info("[Assembler] OpenAI API call complete.")
+        call["usage"] = response.usage
+    logging.info(f"[Assembler] OpenAI API call complete ({model}).")
 
-        # Get the content from the response
-        content = response.output[0].content
-        logging.debug(f"[Assembler] Raw OpenAI response: {str(content)[:500]}")
-        
-        # If content is a list, take the first item
-        if isinstance(content, list):
-            content = content[0]
-            
-        # If content is a ResponseOutputText object, get its text
-        if hasattr(content, 'text'):
-            content = content.text
-            
-        # If content is a string, parse it as JSON
-        if isinstance(content, str):
-            parsed = json.loads(content)
-        else:
-            # If it's already a dict, use it directly
-            parsed = content
+    content = output_text(response)
+    logging.debug(f"[Assembler] Raw OpenAI response: {str(content)[:500]}")
+    return content
 
-        # If the top-level keys are 'nodes' and 'edges', wrap them in 'flow_json'
-        if isinstance(parsed, dict) and "nodes" in parsed and "edges" in parsed and "flow_json" not in parsed:
-            parsed = {"flow_json": parsed}
-        logging.debug(f"[Assembler] Parsed response: {pprint.pformat(parsed)[:500]}")
+def _wrap_flow(parsed: Any) -> Any:
+    """Wrap a top-level {"nodes": ...} answer in 'flow_json'."""
+    if isinstance(parsed, dict) and "nodes" in parsed and "flow_json" not in parsed:
+        return {"flow_json": parsed}
+    return parsed
 
-        # Parse and validate against our Pydantic schema
-        result = AssemblyResult(**parsed)
+def _repair_nodes(nodes: List[Dict[str, Any]], model: str) -> List[Dict[str, Any]]:
+    """
+    Validate the generated nodes, fix what can be fixed locally and re-prompt
+    once, about the offending nodes only, on the next stronger model than the
+    one that produced them.
+    """
+    flow, _ = flow_validator.repair({"nodes": nodes, "edges": []})
+    issues = flow_validator.validate(flow)
+    if not issues:
+        return flow["nodes"]
+
+    logging.info(f"[Assembler] Re-prompting about {len(issues)} issues: {[i['message'] for i in issues]}")
+    repair_model = model_router.upgrade(model) or model
+    try:
+        content = _call_model("assembler.repair", repair_model,
+                              build_messages(FLOW_REPAIR_PROMPT, flow_validator.repair_request(flow, issues)))
+        corrected = fast_json.loads(content) if isinstance(content, str) else content
+        flow, _ = flow_validator.repair(flow_validator.merge_repair(flow, issues, corrected))
+        issues = flow_validator.validate(flow)
+    except Exception as e:
+        logging.warning(f"[Assembler] Repair prompt failed: {e}")
+    if issues:
+        logging.warning(f"[Assembler] Nodes still have {len(issues)} validation issues: {[i['message'] for i in issues]}")
+    return flow["nodes"]
+
+async def assemble_flow(optimized: OptimizedPlan) -> Dict[str, Any]:
+    """
+    Assembles a Langflow JSON workflow by:
+    1. Resolving the templates of all components at once
+    2. Invoking the OpenAI Responses API for the nodes, in data-flow order
+    3. Validating the nodes, repairing locally and re-prompting only about offending nodes
+    4. Deriving encoded edges locally from the template port types
+    5. Laying out node positions locally
+    """
+    logging.info("[Assembler] Entry: assemble_flow")
+    logging.debug(f"[Assembler] Received optimized plan: {pprint.pformat(optimized)[:500]}")
+    try:
+        components: List[ComponentSpec] = optimized.components
+        
+        # Resolve the templates of all components at once, correcting names that only matched fuzzily
+        start = time.perf_counter()
+        resolved, template_entries = await _resolve_templates(
+            [spec.component_name for spec in components if spec.component_name]
+        )
+        metrics.observe("assembler.templates", time.perf_counter() - start)
+        components = [
+            spec.model_copy(update={"component_name": resolved[spec.component_name]})
+            if resolved.get(spec.component_name, spec.component_name) != spec.component_name else spec
+            for spec in components
+        ]
+        logging.info(f"[Assembler] Resolved {len(template_entries)} templates for {len(components)} components")
+        
+        # Static notes and the sorted, pre-encoded lean templates go before the
+        # per-request component specs so the provider can cache the prefix
+        reference = {
+            "notes": ASSEMBLER_NOTES,
+            "templates": prompt_fragments.templates(template_entries, vector_store.corpus_version()),
+        }
+        prompt_payload = {"components": encode_components(components)}
+        logging.debug(f"[Assembler] Payload for OpenAI: {pprint.pformat(prompt_payload)[:500]}")
+        messages = build_messages(FLOW_ASSEMBLER_PROMPT, prompt_payload, reference)
+
+        # Route on flow size; output that fails validation is retried one model up
+        model = model_router.route("assembler", prompt_chars=prompt_chars(messages), components=len(components))
+        while True:
+            try:
+                content = _call_model("assembler.llm", model, messages)
+                # Validate the JSON text against our Pydantic schema
+                result = decode(content, AssemblyResult, coerce=_wrap_flow)
+                break
+            except ValueError as e:
+                # Invalid JSON or schema violation (pydantic's ValidationError is a ValueError)
+                stronger = model_router.upgrade(model)
+                if stronger is None:
+                    raise
+                logging.warning(f"[Assembler] {model} output failed validation, retrying on {stronger}: {e}")
+                model = stronger
         logging.info("[Assembler] Parsed AssemblyResult successfully.")
+        # Edges come from the template port types, not from the model
+        nodes = _repair_nodes(result.flow_json.get("nodes", []), model)
+        result.flow_json["nodes"] = nodes
+        result.flow_json["edges"] = build_edges(nodes)
+        layout_flow(result.flow_json)
         logging.debug(f"[Assembler] Returning flow_json: {pprint.pformat(result.flow_json)[:500]}")
         logging.info("[Assembler] Exit: assemble_flow")
         return result.flow_json
 
+    except VectorStoreUnavailable:
+        # Surface outages instead of silently working without retrieval context
+        raise
     except Exception as e:
         logging.error(f"[Assembler] Error: {e}", exc_info=True)
         # Fallback to a simple linear flow with correct structure
         nodes = []
-        for comp in optimized_plan.get("components", []):
+        for comp in optimized.components:
             node = {
-                "id": comp["step"].lower().replace(" ", "_"),
-                "type": comp["component_name"],
-                "position": {"x": len(nodes) * 200, "y": 100},
-                "data": comp.get("parameters", {})
+                "id": comp.step.lower().replace(" ", "_"),
+                "type": comp.component_name,
+                "data": comp.parameters
             }
             nodes.append(node)
             
-        edges = []
-        for i in range(len(nodes) - 1):
-            edge = {
-                "id": f"e{i+1}",
-                "source": nodes[i]["id"],
-                "target": nodes[i+1]["id"]
-            }
-            edges.append(edge)
-            
+        edges = build_edges(nodes)
+
         logging.info("[Assembler] Returning fallback flow with correct node/edge structure.")
-        return {"nodes": nodes, "edges": edges}
\ No newline at end of file
+        return layout_flow({"nodes": nodes, "edges": edges})
\ No newline at end of file
@@ -3,88 +3,95 @@ app/agents/clarifier.py
 
 Clarification Agent: formulates follow-up questions based on ambiguities
 and parses user answers into structured clarifications using the OpenAI Responses API.
+Questions answered before (or covered by a domain default) are served from the
+clarification cache; only unseen questions are sent to the model.
 """
 import os
-import json
 import logging
 import pprint
-from typing import Dict, Any, List
+from typing import List, Optional
 
 from openai import OpenAI
-from schemas import ClarificationAnswer
+import fast_json
+from schemas import ClarificationAnswer, RequirementContext
+from memory.clarification_cache import clarification_cache, detect_domains
+from metrics import metrics
+from .model_router import model_router
+from .decoding import decode, output_text
 from .systemprompts import CLASSIFIER_PROMPT
 
 # Initialize OpenAI Responses client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
 
-async def clarify_requirements(ambiguities: List[str]) -> Dict[str, Any]:
+metrics.register_rate("clarifier.skip_rate", "clarifier.llm_skipped", "clarifier.requests")
+metrics.register_rate("clarifier.cache_hit_rate", "clarifier.cached_answers", "clarifier.questions")
+
+async def clarify_requirements(ambiguities: List[str], requirements: Optional[RequirementContext] = None) -> ClarificationAnswer:
     """
-    Given a list of ambiguity questions, ask the OpenAI Responses API to
-    provide answers in JSON format under the key 'clarifications'.
+    Given a list of ambiguity questions, answer them (ClarificationAnswer.clarifications).
+    Cached answers and the defaults of the domains detected in `requirements` are used
+    first; the OpenAI Responses API only answers the rest.
     """
     logging.info("[Clarifier] Entry: clarify_requirements")
     logging.debug(f"[Clarifier] Received ambiguities: {pprint.pformat(ambiguities)[:500]}")
     if not ambiguities:
         logging.info("[Clarifier] No ambiguities provided, returning empty clarifications.")
-        return {"clarifications": {}}
+        return ClarificationAnswer(clarifications={})
+
+    answered, unseen = await clarification_cache.lookup(ambiguities, detect_domains(requirements))
+    metrics.increment("clarifier.requests")
+    metrics.increment("clarifier.questions", len(ambiguities))
+    metrics.increment("clarifier.cached_answers", len(answered))
+    logging.info(f"[Clarifier] {len(answered)} of {len(ambiguities)} questions answered from cache.")
+    if not unseen:
+        metrics.increment("clarifier.llm_skipped")
+        logging.info("[Clarifier] Exit: clarify_requirements")
+        return ClarificationAnswer(clarifications=answered)
 
     try:
         # Prepare the input payload as a JSON string
-        payload = json.dumps({"questions": ambiguities}, ensure_ascii=False)
+        payload = fast_json.dumps({"questions": unseen})
         logging.debug(f"[Clarifier] Payload for OpenAI: {payload}")
 
         # Call the official Responses API per Quickstart
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=[
-                {
-                    "role": "system",
-                    "content":CLASSIFIER_PROMPT,
-                },
-                {
-                    "role": "user",
-                    "content": payload,
-                },
-            ],
-            text={"format": {"type": "json_object"}},
-        )
+        model = model_router.route("clarifier", prompt_chars=len(CLASSIFIER_PROMPT) + len(payload))
+        with model_router.track("clarifier.llm", model) as call:
+            response = client.responses.create(
+                model=model,
+                input=[
+                    {
+                        "role": "system",
+                        "content":CLASSIFIER_PROMPT,
+                    },
+                    {
+                        "role": "user",
+                        "content": payload,
+                    },
+                ],
+                text={"format": {"type": "json_object"}},
+            )
+            call["usage"] = response.usage
         logging.info("[Clarifier] OpenAI API call complete.")
 
-        # Get the content from the response
-        content = response.output[0].content
+        content = output_text(response)
         logging.debug(f"[Clarifier] Raw OpenAI response: {str(content)[:500]}")
-        
-        # If content is a list, take the first item
-        if isinstance(content, list):
-            content = content[0]
-            
-        # If content is a ResponseOutputText object, get its text
-        if hasattr(content, 'text'):
-            content = content.text
-            
-        # If content is a string, parse it as JSON
-        if isinstance(content, str):
-            parsed = json.loads(content)
-        else:
-            # If it's already a dict, use it directly
-            parsed = content
-        logging.debug(f"[Clarifier] Parsed response: {pprint.pformat(parsed)[:500]}")
-
-        # Parse the JSON from the model's response
-        answer = ClarificationAnswer(**parsed)
+        answer = decode(content, ClarificationAnswer)
         logging.info("[Clarifier] Parsed clarifications successfully.")
-        logging.debug(f"[Clarifier] Returning clarifications: {pprint.pformat(answer.dict())[:500]}")
+        await clarification_cache.store({q: a for q, a in answer.clarifications.items() if q in unseen})
+        clarifications = {**answered, **{q: answer.clarifications.get(q, "") for q in unseen}}
+        logging.debug(f"[Clarifier] Returning clarifications: {pprint.pformat(clarifications)[:500]}")
         logging.info("[Clarifier] Exit: clarify_requirements")
-        return answer.dict()
+        return ClarificationAnswer(clarifications=clarifications)
 
-    except json.JSONDecodeError as e:
+    except ValueError as e:
+        # Invalid JSON or schema violation (pydantic's ValidationError is a ValueError)
         logging.error(f"[Clarifier] JSON parsing error: {e}", exc_info=True)
         logging.info("[Clarifier] Returning empty clarifications due to JSON error.")
         # Return empty answers for each question on parse failure
-        return {"clarifications": {q: "" for q in ambiguities}}
+        return ClarificationAnswer(clarifications={**answered, **{q: "" for q in unseen}})
 
     except Exception as e:
         logging.error(f"[Clarifier] Error: {e}", exc_info=True)
         logging.info("[Clarifier] Returning empty clarifications due to error.")
         # Return empty answers for each question on any other failure
-        return {"clarifications": {q: "" for q in ambiguities}}
\ No newline at end of file
+        return ClarificationAnswer(clarifications={**answered, **{q: "" for q in unseen}})
\ No newline at end of file
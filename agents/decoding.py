@@ -0,0 +1,63 @@
+"""
+app/agents/decoding.py
+
+Structured-output decoding for the agents. The JSON text of a Responses API result is
+parsed and validated in one pass by a prebuilt pydantic TypeAdapter per schema
+(validate_json runs in pydantic-core, without an intermediate dict), and the typed
+object is what agents return and the pipeline state carries. Only output that fails
+strict validation goes through json parsing and the agent's coercion hook.
+"""
+from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+
+import fast_json
+from memory.prompt_fragments import RawJSON
+from schemas import (
+    AssemblyResult,
+    ClarificationAnswer,
+    ComponentSelection,
+    ComponentSpec,
+    OptimizedPlan,
+    RequirementContext,
+    WorkflowPlan,
+)
+
+T = TypeVar("T")
+
+# Built once at import; building an adapter compiles the schema's validator
+ADAPTERS: Dict[type, TypeAdapter] = {
+    schema: TypeAdapter(schema)
+    for schema in (RequirementContext, WorkflowPlan, ComponentSelection, OptimizedPlan, ClarificationAnswer, AssemblyResult)
+}
+COMPONENT_LIST = TypeAdapter(List[ComponentSpec])
+
+
+def output_text(response: Any) -> Any:
+    """JSON text of a Responses API result (or the content itself if it is not text)."""
+    content = response.output[0].content
+    if isinstance(content, list):
+        content = content[0]
+    return getattr(content, "text", content)
+
+
+def decode(text: Any, schema: Type[T], coerce: Optional[Callable[[Any], Any]] = None) -> T:
+    """
+    Validate model output against a schema. With `coerce`, output that fails strict
+    validation is parsed, passed through coerce and validated again; without it the
+    ValidationError (a ValueError) propagates.
+    """
+    adapter = ADAPTERS[schema]
+    if not isinstance(text, (str, bytes)):
+        return adapter.validate_python(coerce(text) if coerce else text)
+    try:
+        return adapter.validate_json(text)
+    except ValidationError:
+        if coerce is None:
+            raise
+        return adapter.validate_python(coerce(fast_json.loads(text)))
+
+
+def encode_components(components: List[ComponentSpec]) -> RawJSON:
+    """Component specs as JSON text for splicing into a prompt, encoded by pydantic-core."""
+    return RawJSON(COMPONENT_LIST.dump_json(components).decode())
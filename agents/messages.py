@@ -0,0 +1,36 @@
+"""
+app/agents/messages.py
+
+Message layout for provider-side prompt caching. Providers cache the longest prefix
+of a prompt they have seen recently, so every call is built in the same order of
+decreasing stability:
+
+1. the static system prompt,
+2. the reference data shared by many requests (notes, the template slice sorted by
+   component name, see PromptFragments.templates),
+3. the per-request data (user prompt, steps, components, documentation) last.
+
+Dynamic values never go into the first two parts, so requests that reuse the same
+components hit the cache for everything but the final message.
+"""
+from typing import Any, Dict, List, Optional, Union
+
+from memory.prompt_fragments import splice
+
+
+def build_messages(system_prompt: str, request: Union[str, Dict[str, Any]],
+                   reference: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+    """
+    System, reference and request messages. Dict parts are encoded with splice, so
+    their RawJSON values (pre-encoded template fragments) go in verbatim.
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if reference:
+        messages.append({"role": "user", "content": splice(reference)})
+    messages.append({"role": "user", "content": request if isinstance(request, str) else splice(request)})
+    return messages
+
+
+def prompt_chars(messages: List[Dict[str, str]]) -> int:
+    """Total characters of a message list, for sizing the call before it is sent."""
+    return sum(len(message["content"]) for message in messages)
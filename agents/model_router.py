@@ -0,0 +1,198 @@
+"""
+app/agents/model_router.py
+
+Per-call model routing. Each provider has a ladder of models from fast to strong;
+a call starts on the fast model and moves up when its prompt is large or the flow
+has many components. A model whose rolling error rate or latency is out of bounds
+is skipped for the nearest healthy one, and a caller whose output failed validation
+retries one rung up (upgrade).
+
+Every routed call is recorded per model (latency window, errors, estimated cost), and
+the decisions and the cost saved against always using the strongest model show up in
+the /metrics snapshot.
+"""
+import os
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from metrics import metrics, usage_tokens
+
+# Provider -> models from fast to strong
+MODEL_TIERS = {
+    "openai": os.getenv("ROUTER_OPENAI_MODELS", "gpt-4o-mini,gpt-4o").split(","),
+    "groq": os.getenv("ROUTER_GROQ_MODELS", "gemma2-9b-it,llama-3.3-70b-versatile").split(","),
+}
+# Model -> USD per 1M (input, provider-cached input, output) tokens, for the cost estimates
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gemma2-9b-it": (0.20, 0.20, 0.20),
+    "llama-3.3-70b-versatile": (0.59, 0.59, 0.79),
+}
+
+# Prompts above this many (estimated) tokens go to the strong model
+ROUTER_LARGE_PROMPT_TOKENS = int(os.getenv("ROUTER_LARGE_PROMPT_TOKENS", "6000"))
+# Flows with more components than this go to the strong model
+ROUTER_SMALL_FLOW_COMPONENTS = int(os.getenv("ROUTER_SMALL_FLOW_COMPONENTS", "4"))
+# Rolling window per model (calls, and seconds after which a call no longer counts so an
+# unhealthy model is tried again), and the bounds a model must stay within to be routed to
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "50"))
+ROUTER_WINDOW_S = float(os.getenv("ROUTER_WINDOW_S", "300"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.3"))
+ROUTER_MAX_LATENCY_S = float(os.getenv("ROUTER_MAX_LATENCY_S", "60"))
+
+# Rough characters per token for sizing prompts before sending them
+CHARS_PER_TOKEN = 4
+
+
+def estimate_cost(model: str, usage: Any, cached: bool = True) -> float:
+    """
+    Estimated USD cost of a call's usage on a model (0 for unpriced models); with
+    cached=False, as if none of the input had been served from the prompt cache.
+    """
+    tokens = usage_tokens(usage)
+    input_price, cached_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0, 0.0))
+    cached_tokens = tokens["cached"] if cached else 0
+    return ((tokens["input"] - cached_tokens) * input_price + cached_tokens * cached_price
+            + tokens["output"] * output_price) / 1_000_000
+
+
+class _ModelWindow:
+    def __init__(self):
+        # (seconds, error) per call and the time it finished, newest last
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=ROUTER_WINDOW)
+        self.finished: Deque[float] = deque(maxlen=ROUTER_WINDOW)
+
+    def add(self, seconds: float, error: bool):
+        self.samples.append((seconds, error))
+        self.finished.append(time.monotonic())
+
+    def expire(self):
+        cutoff = time.monotonic() - ROUTER_WINDOW_S
+        while self.finished and self.finished[0] < cutoff:
+            self.finished.popleft()
+            self.samples.popleft()
+
+    def error_rate(self) -> Optional[float]:
+        if not self.samples:
+            return None
+        return sum(error for _, error in self.samples) / len(self.samples)
+
+    def p50(self) -> Optional[float]:
+        latencies = sorted(seconds for seconds, error in self.samples if not error)
+        return latencies[len(latencies) // 2] if latencies else None
+
+    def healthy(self) -> bool:
+        self.expire()
+        if len(self.samples) < ROUTER_MIN_SAMPLES:
+            return True
+        p50 = self.p50()
+        return self.error_rate() <= ROUTER_MAX_ERROR_RATE and (p50 is None or p50 <= ROUTER_MAX_LATENCY_S)
+
+
+class ModelRouter:
+    """
+    Picks a model per call and keeps the rolling latency/error window of each model.
+    """
+    def __init__(self, tiers: Dict[str, List[str]] = MODEL_TIERS):
+        self.tiers = {provider.lower(): [m.strip() for m in models if m.strip()] for provider, models in tiers.items()}
+        self._lock = threading.Lock()
+        self._windows: Dict[str, _ModelWindow] = defaultdict(_ModelWindow)
+
+    def _ladder(self, provider: str) -> List[str]:
+        ladder = self.tiers.get(provider.lower())
+        if not ladder:
+            raise ValueError(f"No models configured for provider '{provider}'")
+        return ladder
+
+    def tier(self, prompt_chars: int = 0, components: int = 0) -> int:
+        """Rung a call of this size starts on: 0 (fast) or 1 (strong)."""
+        if prompt_chars / CHARS_PER_TOKEN > ROUTER_LARGE_PROMPT_TOKENS or components > ROUTER_SMALL_FLOW_COMPONENTS:
+            return 1
+        return 0
+
+    def healthy(self, model: str) -> bool:
+        with self._lock:
+            window = self._windows.get(model)
+            return window is None or window.healthy()
+
+    def route(self, stage: str, provider: str = "openai", prompt_chars: int = 0,
+              components: int = 0, min_tier: int = 0) -> str:
+        """
+        Model for a call of `stage`: the rung for its size (at least `min_tier`), or the
+        nearest healthy rung above, then below, when that model is out of bounds.
+        """
+        ladder = self._ladder(provider)
+        wanted = min(max(self.tier(prompt_chars, components), min_tier), len(ladder) - 1)
+        order = ladder[wanted:] + ladder[:wanted][::-1]
+        model = next((m for m in order if self.healthy(m)), ladder[wanted])
+        if model != ladder[wanted]:
+            logging.info(f"[ModelRouter] {stage}: {ladder[wanted]} is unhealthy, routing to {model}")
+            metrics.increment("router.rerouted")
+        metrics.increment(f"router.{stage}.{model}")
+        return model
+
+    def upgrade(self, model: str, provider: str = "openai") -> Optional[str]:
+        """Next stronger model after `model`, or None when it is the strongest."""
+        ladder = self._ladder(provider)
+        if model not in ladder:
+            return None
+        index = ladder.index(model)
+        if index + 1 >= len(ladder):
+            return None
+        metrics.increment("router.upgrades")
+        return ladder[index + 1]
+
+    def record(self, model: str, seconds: float, usage: Any = None, error: bool = False, provider: str = "openai"):
+        """
+        Add a call to the model's window, and its estimated cost to the metrics with the
+        savings against the strongest model and against an uncached prompt.
+        """
+        with self._lock:
+            self._windows[model].add(seconds, error)
+        metrics.record_llm_call(f"model.{model}", seconds, usage, error)
+        if usage is None:
+            return
+        cost = estimate_cost(model, usage)
+        strongest = self.tiers.get(provider.lower(), [model])[-1]
+        metrics.increment("router.cost_usd", cost)
+        metrics.increment("router.cost_saved_usd", max(estimate_cost(strongest, usage) - cost, 0.0))
+        metrics.increment("router.cache_saved_usd", estimate_cost(model, usage, cached=False) - cost)
+
+    @contextmanager
+    def track(self, stage: str, model: str, provider: str = "openai"):
+        """
+        metrics.llm_call for `stage` that also records the call against the model; the
+        caller stores the response's usage in the yielded dict under "usage".
+        """
+        with metrics.llm_call(stage) as call:
+            start = time.perf_counter()
+            try:
+                yield call
+            except Exception:
+                self.record(model, time.perf_counter() - start, call["usage"], error=True, provider=provider)
+                raise
+            self.record(model, time.perf_counter() - start, call["usage"], provider=provider)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            for window in self._windows.values():
+                window.expire()
+            return {
+                model: {
+                    "samples": len(window.samples),
+                    "error_rate": round(window.error_rate(), 3) if window.samples else None,
+                    "p50_ms": round(window.p50() * 1000, 1) if window.p50() is not None else None,
+                    "healthy": window.healthy(),
+                }
+                for model, window in sorted(self._windows.items())
+            }
+
+
+# Singleton instance
+model_router = ModelRouter()
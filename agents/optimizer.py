@@ -2,85 +2,101 @@
 app/agents/optimizer.py
 
 Optimizer/Critic agent: evaluates and refines the selected components for cost,
-performance, and completeness using the OpenAI Responses API.
+performance, and completeness. Deterministic rules (see optimizer_rules.py) run first;
+the OpenAI Responses API is only called for constraints the rules cannot settle.
 """
 import os
-import json
+import time
 import logging
 from typing import Dict, Any, List
 import pprint
 
 from openai import OpenAI
-from schemas import OptimizedPlan, ComponentSpec
+from schemas import ComponentSelection, ComponentSpec, OptimizedPlan, RequirementContext
+from memory.prompt_fragments import splice
+from metrics import metrics
+from .model_router import model_router
+from .decoding import decode, encode_components, output_text
+from .optimizer_rules import rule_optimizer
 from .systemprompts import OPTIMIZER_PROMPT
 
 # Initialize OpenAI Responses client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
 
+# Assumed latency of the LLM optimizer until one call has been measured
+OPTIMIZER_LLM_ESTIMATE_MS = float(os.getenv("OPTIMIZER_LLM_ESTIMATE_MS", "2000"))
+
+metrics.register_rate("optimizer.skip_rate", "optimizer.llm_skipped", "optimizer.requests")
+
+def _fill_defaults(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """Empty lists for components/ambiguities the model left out or returned as null."""
+    if parsed.get("components") is None:
+        parsed["components"] = []
+    if parsed.get("ambiguities") is None:
+        parsed["ambiguities"] = []
+    return parsed
+
 async def optimize_plan(
-    components_dict: Dict[str, Any],
-    context: Dict[str, Any]
-) -> Dict[str, Any]:
+    selection: ComponentSelection,
+    requirements: RequirementContext
+) -> OptimizedPlan:
     logging.info("[Optimizer] Entry: optimize_plan")
-    logging.debug(f"[Optimizer] Received components_dict: {pprint.pformat(components_dict)[:500]}")
-    logging.debug(f"[Optimizer] Received context: {pprint.pformat(context)[:500]}")
+    logging.debug(f"[Optimizer] Received selection: {pprint.pformat(selection)[:500]}")
+    logging.debug(f"[Optimizer] Received requirements: {pprint.pformat(requirements)[:500]}")
     try:
-        components: List[Dict[str, Any]] = components_dict.get("components", [])
-        constraints: List[str] = context.get("constraints", [])
+        components: List[ComponentSpec] = selection.components
+        constraints: List[str] = requirements.constraints
         logging.debug(f"[Optimizer] Components: {components}")
         logging.debug(f"[Optimizer] Constraints: {constraints}")
+        metrics.increment("optimizer.requests")
+        start = time.perf_counter()
+        components, unresolved = rule_optimizer.optimize(components, constraints)
+        rules_seconds = time.perf_counter() - start
+        metrics.observe("optimizer.rules", rules_seconds)
+        if not unresolved:
+            llm_seconds = metrics.average_seconds("optimizer.llm")
+            saved_ms = (llm_seconds * 1000 if llm_seconds is not None else OPTIMIZER_LLM_ESTIMATE_MS) - rules_seconds * 1000
+            metrics.increment("optimizer.llm_skipped")
+            metrics.increment("optimizer.latency_saved_ms", max(saved_ms, 0.0))
+            logging.info(f"[Optimizer] Rules settled all constraints; skipping the LLM ({len(components)} components).")
+            logging.info("[Optimizer] Exit: optimize_plan")
+            return OptimizedPlan(components=components)
+
+        # Only the constraints the rules could not settle go to the model
         payload = {
-            "components": components,
-            "constraints": constraints
+            "components": encode_components(components),
+            "constraints": unresolved
         }
         logging.debug(f"[Optimizer] Payload for OpenAI: {pprint.pformat(payload)[:500]}")
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=[
-                {
-                    "role": "system",
-                    "content": OPTIMIZER_PROMPT,
-                },
-                {
-                    "role": "user",
-                    "content": json.dumps(payload, ensure_ascii=False),
-                },
-            ],
-            text={"format": {"type": "json_object"}},
-        )
+        user_content = splice(payload)
+        model = model_router.route("optimizer", prompt_chars=len(OPTIMIZER_PROMPT) + len(user_content))
+        with model_router.track("optimizer.llm", model) as call:
+            response = client.responses.create(
+                model=model,
+                input=[
+                    {
+                        "role": "system",
+                        "content": OPTIMIZER_PROMPT,
+                    },
+                    {
+                        "role": "user",
+                        "content": user_content,
+                    },
+                ],
+                text={"format": {"type": "json_object"}},
+            )
+            call["usage"] = response.usage
         logging.info("[Optimizer] OpenAI API call complete.")
-        content = response.output[0].content
+        content = output_text(response)
         logging.debug(f"[Optimizer] Raw OpenAI response: {str(content)[:500]}")
-        if isinstance(content, list):
-            content = content[0]
-        if hasattr(content, 'text'):
-            content = content.text
-        if isinstance(content, str):
-            parsed = json.loads(content)
-        else:
-            parsed = content
-        logging.debug(f"[Optimizer] Parsed response: {pprint.pformat(parsed)[:500]}")
-        if "components" not in parsed or parsed["components"] is None:
-            parsed["components"] = []
-        if "ambiguities" not in parsed or parsed["ambiguities"] is None:
-            parsed["ambiguities"] = []
+        optimized = decode(content, OptimizedPlan, coerce=_fill_defaults)
         # Only set needs_clarification to True if there are real ambiguities
-        parsed["needs_clarification"] = bool(parsed.get("ambiguities")) and len(parsed["ambiguities"]) > 0
-        optimized = OptimizedPlan(**parsed)
-        comp_dicts = [c.model_dump() for c in optimized.components]
-        logging.info(f"[Optimizer] Optimized {len(comp_dicts)} components.")
-        logging.debug(f"[Optimizer] Returning: components={comp_dicts}, needs_clarification={optimized.needs_clarification}, ambiguities={optimized.ambiguities}")
+        optimized.needs_clarification = bool(optimized.ambiguities)
+        logging.info(f"[Optimizer] Optimized {len(optimized.components)} components.")
+        logging.debug(f"[Optimizer] Returning: components={optimized.components}, needs_clarification={optimized.needs_clarification}, ambiguities={optimized.ambiguities}")
         logging.info("[Optimizer] Exit: optimize_plan")
-        return {
-            "components": comp_dicts,
-            "needs_clarification": optimized.needs_clarification,
-            "ambiguities": optimized.ambiguities
-        }
+        return optimized
     except Exception as e:
         logging.error(f"[Optimizer] Error: {e}", exc_info=True)
         logging.info("[Optimizer] Returning original components due to error.")
-        return {
-            "components": components_dict.get("components", []),
-            "needs_clarification": False,
-            "ambiguities": []
-        }
\ No newline at end of file
+        return OptimizedPlan(components=selection.components)
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+app/agents/optimizer_rules.py
+
+Deterministic optimizer rules run before the LLM optimizer: a cost/latency table of
+the model and embedding components (built from the models and embeddings categories
+of the component catalog), component swaps for explicit "cheap", "local" and "fast"
+constraints, and removal of duplicate components. The LLM is only needed for
+constraints these rules do not recognise.
+"""
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from memory.component_catalog import ComponentCatalog, component_catalog
+from schemas import ComponentSpec
+
+# Catalog categories holding swappable components, and the kind they provide
+MODEL_CATEGORIES = {"models": "llm", "embeddings": "embeddings"}
+
+# Provider key (matched against the folded component name) -> (cost tier, latency tier, runs locally).
+# Tiers are relative: 0 is free, 3 is premium; latency 1 is fastest.
+PROVIDER_PROFILES = {
+    "ollama": (0, 3, True),
+    "lmstudio": (0, 3, True),
+    "groq": (1, 1, False),
+    "deepseek": (1, 2, False),
+    "cloudflare": (1, 2, False),
+    "huggingface": (1, 3, False),
+    "mistral": (2, 2, False),
+    "openai": (2, 2, False),
+    "google": (2, 2, False),
+    "vertex": (2, 2, False),
+    "cohere": (2, 2, False),
+    "nvidia": (2, 2, False),
+    "anthropic": (3, 2, False),
+    "perplexity": (3, 3, False),
+}
+DEFAULT_PROFILE = (2, 2, False)
+
+# Markers of the cheaper variants among a component's model options, best first
+CHEAP_MODEL_MARKERS = ("nano", "mini", "instant", "flash", "haiku", "small", "8b", "3.5-turbo")
+# Template fields naming the model, in the order they are looked up
+MODEL_FIELDS = ("model_name", "model")
+
+# Explicit constraint phrases -> rule. Bare topic words ("cost", "private", "latency")
+# say nothing about which way the user wants to go, so they are left to the LLM.
+CONSTRAINT_RULES = {
+    "cost": re.compile(r"\b(cheap(er|est|ly)?|low[- ]cost|inexpensive)\b", re.I),
+    "local": re.compile(r"\b(run(s|ning)? locally|offline|on[- ]prem(ise|ises)?|self[- ]hosted|air[- ]gapped)\b", re.I),
+    "latency": re.compile(r"\b(fast(er|est)?|low[- ]latency|real[- ]?time)\b", re.I),
+}
+# Constraints with a negation ("not cheap", "no local models") are never settled by the rules
+NEGATION = re.compile(r"\b(not|no|without|never|cannot)\b|n't\b", re.I)
+
+# Parameters that do not carry over to a different provider's component
+_PROVIDER_PARAMS = {"model_name", "model", "api_key", "base_url", "openai_api_base", "code"}
+
+
+def _fold(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _cheap_option(options: List[Any]) -> Optional[str]:
+    """First option carrying a cheap-model marker as a whole name segment."""
+    for marker in CHEAP_MODEL_MARKERS:
+        pattern = re.compile(rf"(^|[-_/. :]){re.escape(marker)}($|[-_/. :])", re.I)
+        for option in options:
+            if isinstance(option, str) and pattern.search(option):
+                return option
+    return None
+
+
+def classify_constraints(constraints: List[str]) -> Tuple[List[str], List[str]]:
+    """Split constraints into the rules they trigger and the ones no rule recognises."""
+    rules: List[str] = []
+    unresolved: List[str] = []
+    for constraint in constraints:
+        if constraint and NEGATION.search(constraint):
+            unresolved.append(constraint)
+            continue
+        matched = [rule for rule, pattern in CONSTRAINT_RULES.items() if pattern.search(constraint or "")]
+        if matched:
+            rules.extend(rule for rule in matched if rule not in rules)
+        elif constraint and constraint.strip():
+            unresolved.append(constraint)
+    return rules, unresolved
+
+
+class ModelProfileTable:
+    """
+    Cost/latency/locality profile of every model and embedding component. Built lazily.
+    """
+    def __init__(self, catalog: ComponentCatalog = component_catalog):
+        self.catalog = catalog
+        self._profiles: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def build(self):
+        if self._profiles is not None:
+            return
+        profiles = {}
+        for name in self.catalog.names():
+            kind = MODEL_CATEGORIES.get(self.catalog.category(name))
+            if kind is None:
+                continue
+            template = self.catalog.get(name)
+            fields = template.get("template", {})
+            outputs = {t for out in template.get("outputs", []) for t in out.get("types") or []}
+            # Skip helpers in these categories that do not provide a model (e.g. similarity, vectorize)
+            if "LanguageModel" not in outputs and "Embeddings" not in outputs:
+                continue
+            folded = _fold(name)
+            provider = next((key for key in PROVIDER_PROFILES if key in folded), None)
+            cost, latency, local = PROVIDER_PROFILES.get(provider, DEFAULT_PROFILE)
+            model_field = next((f for f in MODEL_FIELDS if isinstance(fields.get(f), dict)), None)
+            options = fields[model_field].get("options") or [] if model_field else []
+            profiles[name] = {
+                "kind": kind,
+                "provider": provider,
+                "cost": cost,
+                "latency": latency,
+                "local": local,
+                "model_field": model_field,
+                "cheap_model": _cheap_option(options),
+                "parameters": set(fields),
+                "deprecated": "deprecated" in template.get("display_name", "").lower(),
+            }
+        self._profiles = profiles
+        logging.info(f"[OptimizerRules] Profiled {len(profiles)} model components")
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        self.build()
+        return self._profiles.get(name)
+
+    def best(self, kind: str, rules: List[str]) -> Optional[str]:
+        """Best component of a kind under the rules; local first, then by cost or latency."""
+        self.build()
+        candidates = [(name, p) for name, p in self._profiles.items() if p["kind"] == kind and not p["deprecated"]]
+        # Only an explicit locality constraint moves a flow onto local model servers
+        local = "local" in rules
+        candidates = [(name, p) for name, p in candidates if p["local"] == local]
+        if not candidates:
+            return None
+
+        # Generic provider-agnostic components (no known provider) are never preferred;
+        # ties go to the provider listed first in PROVIDER_PROFILES
+        providers = list(PROVIDER_PROFILES)
+        candidates.sort(key=lambda item: (item[1]["provider"] is None, self.rank(item[1], rules),
+                                          providers.index(item[1]["provider"]) if item[1]["provider"] else 0))
+        return candidates[0][0]
+
+    @staticmethod
+    def rank(profile: Dict[str, Any], rules: List[str]) -> Tuple[int, ...]:
+        """Sort key of a profile under the rules: latency only for "fast", else cost then latency."""
+        if "latency" in rules and "cost" not in rules:
+            return (profile["latency"],)
+        return (profile["cost"], profile["latency"])
+
+
+class RuleOptimizer:
+    """
+    Applies the deterministic rules to a component list.
+    """
+    def __init__(self, table: Optional[ModelProfileTable] = None):
+        self.table = table or ModelProfileTable()
+
+    @staticmethod
+    def dedupe(components: List[ComponentSpec]) -> List[ComponentSpec]:
+        """Drop components repeated with the same configuration, keeping the first."""
+        seen = set()
+        unique = []
+        for comp in components:
+            key = (comp.component_name, repr(sorted(comp.parameters.items())))
+            if key in seen:
+                logging.info(f"[OptimizerRules] Dropping duplicate {comp.component_name} for step '{comp.step}'")
+                continue
+            seen.add(key)
+            unique.append(comp)
+        return unique
+
+    def apply(self, comp: ComponentSpec, rules: List[str]) -> ComponentSpec:
+        """Component with the rules applied; the input is not modified."""
+        name = comp.component_name
+        profile = self.table.get(name)
+        if profile is None or not rules:
+            return comp
+        parameters = dict(comp.parameters)
+
+        keep = not ("local" in rules and not profile["local"])
+        if keep and "cost" in rules and profile["cheap_model"]:
+            # Same provider, cheaper model
+            field = profile["model_field"]
+            if parameters.get(field) != profile["cheap_model"]:
+                logging.info(f"[OptimizerRules] {name}: {field} -> {profile['cheap_model']}")
+                parameters[field] = profile["cheap_model"]
+            return comp.model_copy(update={"parameters": parameters})
+
+        replacement = self.table.best(profile["kind"], rules)
+        if replacement is None or replacement == name:
+            return comp
+        target = self.table.get(replacement)
+        if keep and self.table.rank(target, rules) >= self.table.rank(profile, rules):
+            return comp
+        logging.info(f"[OptimizerRules] Swapping {name} -> {replacement} for {rules}")
+        carried = {key: value for key, value in parameters.items()
+                   if key in target["parameters"] and key not in _PROVIDER_PARAMS}
+        if "cost" in rules and target["cheap_model"]:
+            carried[target["model_field"]] = target["cheap_model"]
+        return comp.model_copy(update={"component_name": replacement, "parameters": carried})
+
+    def optimize(self, components: List[ComponentSpec], constraints: List[str]) -> Tuple[List[ComponentSpec], List[str]]:
+        """
+        Apply the rules triggered by the constraints and drop duplicates. Returns the
+        optimized components and the constraints no rule settles (empty when the
+        LLM optimizer can be skipped).
+        """
+        rules, unresolved = classify_constraints(constraints)
+        optimized = self.dedupe([self.apply(comp, rules) for comp in components])
+        if unresolved:
+            logging.info(f"[OptimizerRules] Constraints need the LLM: {unresolved}")
+        return optimized, unresolved
+
+
+# Singleton instance
+rule_optimizer = RuleOptimizer()
@@ -2,10 +2,9 @@
 app/agents/planner.py
 
 Planner agent: generates an abstract workflow plan using retrieval-augmented generation (RAG)
-with Chroma DB retrieval and the OpenAI Responses API.
+over the library of past successful plans in Chroma DB and the OpenAI Responses API.
 """
 import os
-import json
 import logging
 import uuid
 import pprint
@@ -13,82 +12,132 @@ from typing import Dict, Any, List
 from .systemprompts import PLANNER_PROMPT
 
 from openai import OpenAI
-from schemas import WorkflowPlan
+import fast_json
+from schemas import RequirementContext, WorkflowPlan
 from memory.vector_store import vector_store
+from metrics import metrics
+from .model_router import model_router
+from .decoding import decode, output_text
 
 # Initialize OpenAI Responses client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
 
-async def plan_workflow(context: Dict[str, Any]) -> Dict[str, Any]:
+# A stored plan this close (cosine similarity) with the same tech stack is reused as is
+PATTERN_REUSE_SIMILARITY = float(os.getenv("PATTERN_REUSE_SIMILARITY", "0.95"))
+# Looser matches above this similarity are passed to the model as examples
+PATTERN_EXAMPLE_SIMILARITY = float(os.getenv("PATTERN_EXAMPLE_SIMILARITY", "0.6"))
+PATTERN_EXAMPLES = int(os.getenv("PATTERN_EXAMPLES", "3"))
+
+metrics.register_rate("planner.reuse_rate", "planner.patterns_reused", "planner.requests")
+
+def _same_stack(a: List[str], b: List[str]) -> bool:
+    return {t.strip().lower() for t in a} == {t.strip().lower() for t in b}
+
+async def record_plan(requirements: RequirementContext, plan: WorkflowPlan):
+    """
+    Store the plan of a request that produced a flow in the pattern library.
+    Failures are logged and ignored; the library is an optimization.
+    """
+    if not plan.steps or plan.plan_pattern_id:
+        # Nothing planned, or the plan came from the library (its use was counted then)
+        return
+    try:
+        pattern_id = await vector_store.add_pattern(
+            requirements.use_case,
+            requirements.tech_stack,
+            plan.steps,
+            requirements.key_tasks,
+        )
+        if pattern_id:
+            logging.info(f"[Planner] Recorded plan pattern {pattern_id}")
+    except Exception as e:
+        logging.warning(f"[Planner] Could not record plan pattern: {e}")
+
+async def plan_workflow(requirements: RequirementContext) -> WorkflowPlan:
     """
     Generate an abstract workflow plan.
-    1. Retrieve similar past plans from Chroma DB.
-    2. Incorporate retrieved examples into the prompt for RAG.
-    3. Call the OpenAI Responses API to produce a JSON plan.
-    4. Store the new plan back into Chroma DB for future retrieval.
+    1. Retrieve similar past plans from the pattern library in Chroma DB.
+    2. Reuse a near-identical plan directly, without calling the model.
+    3. Otherwise pass the looser matches to the model as examples.
+    4. Call the OpenAI Responses API to produce a JSON plan.
+    Plans are stored back into the library by record_plan once a flow is built from them.
     """
     logging.info("[Planner] Entry: plan_workflow")
-    logging.debug(f"[Planner] Received context: {pprint.pformat(context)[:500]}")
+    logging.debug(f"[Planner] Received requirements: {pprint.pformat(requirements)[:500]}")
+    metrics.increment("planner.requests")
     try:
+        use_case = requirements.use_case
+        tech_stack = requirements.tech_stack
+
         # 1. Retrieve similar past workflows from Chroma DB (async)
-        # use_case = context.get("use_case", "")
-        # past_entries = await vector_store.query_patterns(use_case, n_results=3)
-        # examples: List[str] = [entry["document"] for entry in past_entries]
-        # logging.debug(f"Retrieved {len(examples)} past examples for use case '{use_case}'")
+        patterns: List[Dict[str, Any]] = []
+        if use_case:
+            try:
+                query = vector_store.pattern_text(use_case, tech_stack, requirements.key_tasks)
+                patterns = await vector_store.query_patterns(query, n_results=PATTERN_EXAMPLES)
+            except Exception as e:
+                logging.warning(f"[Planner] Pattern library unavailable, planning without examples: {e}")
+        logging.debug(f"[Planner] Retrieved {len(patterns)} past patterns for use case '{use_case}'")
+
+        # 2. Reuse a very close match directly
+        if patterns and patterns[0]["similarity"] >= PATTERN_REUSE_SIMILARITY and _same_stack(patterns[0]["tech_stack"], tech_stack):
+            best = patterns[0]
+            logging.info(f"[Planner] Reusing plan pattern {best['id']} (similarity {best['similarity']:.3f}); skipping the LLM.")
+            metrics.increment("planner.patterns_reused")
+            try:
+                await vector_store.touch_pattern(best["id"])
+            except Exception as e:
+                logging.warning(f"[Planner] Could not update pattern use count: {e}")
+            logging.info("[Planner] Exit: plan_workflow")
+            return WorkflowPlan(steps=best["steps"], plan_pattern_id=best["id"])
 
-        # # 2. Build the prompt payload combining context and RAG examples
-        # payload = {
-        #     "use_case": use_case,
-        #     "key_tasks": context.get("key_tasks", []),
-        #     "tech_stack": context.get("tech_stack", []),
-        #     "constraints": context.get("constraints", []),
-        #     "examples": examples
-        # }
-        
+        # 3. Build the prompt payload combining context and RAG examples
+        examples = [
+            {"use_case": p["use_case"], "tech_stack": p["tech_stack"], "steps": p["steps"]}
+            for p in patterns if p["similarity"] >= PATTERN_EXAMPLE_SIMILARITY
+        ]
         payload = {
-            "use_case":    context.get("use_case", ""),
-            "key_tasks":   context.get("key_tasks", []),
-            "tech_stack":  context.get("tech_stack", []),
-            "constraints": context.get("constraints", [])
+            "use_case":    use_case,
+            "key_tasks":   requirements.key_tasks,
+            "tech_stack":  tech_stack,
+            "constraints": requirements.constraints
         }
+        if examples:
+            payload["examples"] = examples
+            metrics.increment("planner.examples_used", len(examples))
         logging.debug(f"[Planner] Payload for OpenAI: {pprint.pformat(payload)[:500]}")
 
-        # 3. Call the Responses API to generate structured JSON (updated for new API)
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=[
-                {
-                    "role": "system",
-                    "content":PLANNER_PROMPT,
-                },
-                {
-                    "role": "user",
-                    "content": json.dumps(payload, ensure_ascii=False),
-                },
-            ],
-            text={"format": {"type": "json_object"}},
-        )
+        # 4. Call the Responses API to generate structured JSON (updated for new API)
+        user_content = fast_json.dumps(payload)
+        model = model_router.route("planner", prompt_chars=len(PLANNER_PROMPT) + len(user_content))
+        with model_router.track("planner.llm", model) as call:
+            response = client.responses.create(
+                model=model,
+                input=[
+                    {
+                        "role": "system",
+                        "content":PLANNER_PROMPT,
+                    },
+                    {
+                        "role": "user",
+                        "content": user_content,
+                    },
+                ],
+                text={"format": {"type": "json_object"}},
+            )
+            call["usage"] = response.usage
         logging.info("[Planner] OpenAI API call complete.")
-        content = response.output[0].content
+        content = output_text(response)
         logging.debug(f"[Planner] Raw OpenAI response: {str(content)[:500]}")
-        if isinstance(content, list):
-            content = content[0]
-        if hasattr(content, 'text'):
-            content = content.text
-        if isinstance(content, str):
-            parsed = json.loads(content)
-        else:
-            parsed = content
-        logging.debug(f"[Planner] Parsed response: {pprint.pformat(parsed)[:500]}")
-        plan = WorkflowPlan(**parsed)
+        plan = decode(content, WorkflowPlan)
         logging.info("[Planner] Parsed WorkflowPlan successfully.")
-        logging.debug(f"[Planner] Returning plan: {pprint.pformat(plan.model_dump())[:500]}")
+        logging.debug(f"[Planner] Returning plan: {pprint.pformat(plan)[:500]}")
         logging.info("[Planner] Exit: plan_workflow")
-        return plan.model_dump()
+        return plan
 
     except Exception as e:
         logging.error(f"[Planner] Error: {e}", exc_info=True)
         # Fallback: return an empty plan if anything goes wrong
         empty = WorkflowPlan(steps=[])
         logging.info("[Planner] Returning empty plan due to error.")
-        return empty.model_dump()
\ No newline at end of file
+        return empty
\ No newline at end of file
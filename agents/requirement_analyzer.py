@@ -1,22 +1,28 @@
 """
 app/agents/requirement_analyzer.py
 
-Requirement Analyzer agent: parses free-text user prompts into structured RequirementContext
-using the OpenAI Responses API.
+Requirement Analyzer agent: parses free-text user prompts into structured RequirementContext.
+Prompts the local extractor (requirement_extractor.py) understands with enough confidence
+are settled without a model call; the rest go to the OpenAI Responses API.
 """
 import os
-import json
+import time
 import logging
-from typing import Dict, Any
 import pprint
 
 from openai import OpenAI
 from schemas import RequirementContext
+from metrics import metrics
+from .model_router import model_router
+from .decoding import decode, output_text
+from .requirement_extractor import requirement_extractor, REQUIREMENT_EXTRACTOR_CONFIDENCE
 from .systemprompts import REQUIREMENT_ANALYZER_PROMPT
 
 # Initialize OpenAI Responses client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
 
+metrics.register_rate("analyzer.skip_rate", "analyzer.llm_skipped", "analyzer.requests")
+
 def ensure_list_fields(parsed):
     for key in ["key_tasks", "tech_stack", "constraints", "ambiguities"]:
         value = parsed.get(key)
@@ -28,49 +34,53 @@ def ensure_list_fields(parsed):
             parsed[key] = []
     return parsed
 
-async def analyze_requirements(user_prompt: str) -> Dict[str, Any]:
+async def analyze_requirements(user_prompt: str) -> RequirementContext:
     """
     Parse the user prompt into a structured RequirementContext.
     :param user_prompt: Free-text description of the desired AI workflow.
-    :return: Dictionary matching the RequirementContext schema.
+    :return: The RequirementContext.
     """
     logging.info("[RequirementAnalyzer] Entry: analyze_requirements")
     logging.debug(f"[RequirementAnalyzer] Received user_prompt: {user_prompt!r}")
+    metrics.increment("analyzer.requests")
     try:
-        logging.info("[RequirementAnalyzer] Sending request to OpenAI API for requirement extraction.")
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=[
-                {
-                    "role": "system",
-                    "content": REQUIREMENT_ANALYZER_PROMPT,
-                },
-                {
-                    "role": "user",
-                    "content": user_prompt,
-                },
-            ],
-            text={"format": {"type": "json_object"}},
-        )
+        start = time.perf_counter()
+        local, confidence = requirement_extractor.extract(user_prompt)
+        metrics.observe("analyzer.local", time.perf_counter() - start)
+        if local is not None and confidence >= REQUIREMENT_EXTRACTOR_CONFIDENCE:
+            context = RequirementContext(**local)
+            metrics.increment("analyzer.llm_skipped")
+            logging.info(f"[RequirementAnalyzer] Extracted locally (confidence {confidence:.2f}); skipping the LLM.")
+            logging.debug(f"[RequirementAnalyzer] Returning context: {pprint.pformat(context)[:500]}")
+            logging.info("[RequirementAnalyzer] Exit: analyze_requirements")
+            return context
+        logging.info(f"[RequirementAnalyzer] Local extraction confidence {confidence:.2f}; sending request to OpenAI API for requirement extraction.")
+        model = model_router.route("analyzer", prompt_chars=len(REQUIREMENT_ANALYZER_PROMPT) + len(user_prompt))
+        with model_router.track("analyzer.llm", model) as call:
+            response = client.responses.create(
+                model=model,
+                input=[
+                    {
+                        "role": "system",
+                        "content": REQUIREMENT_ANALYZER_PROMPT,
+                    },
+                    {
+                        "role": "user",
+                        "content": user_prompt,
+                    },
+                ],
+                text={"format": {"type": "json_object"}},
+            )
+            call["usage"] = response.usage
         logging.info("[RequirementAnalyzer] OpenAI API call complete.")
-        content = response.output[0].content
+        content = output_text(response)
         logging.debug(f"[RequirementAnalyzer] Raw OpenAI response: {str(content)[:500]}")
-        if isinstance(content, list):
-            content = content[0]
-        if hasattr(content, 'text'):
-            content = content.text
-        if isinstance(content, str):
-            parsed = json.loads(content)
-        else:
-            parsed = content
-        logging.debug(f"[RequirementAnalyzer] Parsed response before coercion: {pprint.pformat(parsed)[:500]}")
-        parsed = ensure_list_fields(parsed)
-        logging.debug(f"[RequirementAnalyzer] Parsed and coerced response: {pprint.pformat(parsed)[:500]}")
-        context = RequirementContext(**parsed)
+        # Strict validation of the JSON text; list fields returned as strings or null are coerced
+        context = decode(content, RequirementContext, coerce=ensure_list_fields)
         logging.info("[RequirementAnalyzer] Parsed context successfully.")
-        logging.debug(f"[RequirementAnalyzer] Returning context: {pprint.pformat(context.model_dump())[:500]}")
+        logging.debug(f"[RequirementAnalyzer] Returning context: {pprint.pformat(context)[:500]}")
         logging.info("[RequirementAnalyzer] Exit: analyze_requirements")
-        return context.model_dump()
+        return context
     except Exception as e:
         logging.error(f"[RequirementAnalyzer] Error: {e}", exc_info=True)
         empty = RequirementContext(
@@ -81,4 +91,4 @@ async def analyze_requirements(user_prompt: str) -> Dict[str, Any]:
             ambiguities=[]
         )
         logging.info("[RequirementAnalyzer] Returning empty context due to error.")
-        return empty.model_dump()
+        return empty
@@ -0,0 +1,268 @@
+"""
+app/agents/requirement_extractor.py
+
+Local requirement extractor run before the LLM analyzer. The prompt is matched
+against one phrase table built from the component catalog (provider, vector store
+and tool names, with aliases) and a keyword taxonomy of use cases, data sources,
+constraints and filler words, to fill use_case, key_tasks, tech_stack and
+constraints without a model call.
+
+Confidence is the share of the prompt's words the table explains; the analyzer
+only trusts the result when a use case was recognised and the confidence reaches
+REQUIREMENT_EXTRACTOR_CONFIDENCE. Negations are not parsed, so prompts containing
+one always go to the LLM. Short prompts such as "rag system" or "chatbot
+with openai and chroma" are settled locally; anything richer goes to the LLM.
+"""
+import os
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from memory.component_catalog import ComponentCatalog, component_catalog
+
+REQUIREMENT_EXTRACTOR_CONFIDENCE = float(os.getenv("REQUIREMENT_EXTRACTOR_CONFIDENCE", "0.75"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Prompts that negate something ("not using chroma", "no openai") are left to the LLM
+_NEGATION = re.compile(r"\b(not|no|without|never|cannot)\b|n't\b", re.I)
+
+# Catalog categories whose components name a provider, store or tool, and the
+# label used for vendor categories whose display names are actions ("List Pages")
+TECH_CATEGORIES = ("models", "embeddings", "vectorstores", "memories", "tools", "amazon", "cohere", "nvidia")
+VENDOR_CATEGORIES = {
+    "Notion": "Notion", "apify": "Apify", "assemblyai": "AssemblyAI", "composio": "Composio",
+    "confluence": "Confluence", "crewai": "CrewAI", "firecrawl": "Firecrawl", "git": "Git",
+    "homeassistant": "Home Assistant", "langwatch": "LangWatch", "needle": "Needle",
+    "scrapegraph": "ScrapeGraph", "unstructured": "Unstructured", "youtube": "YouTube",
+}
+# Words dropped from display names to get the brand ("OpenAI Embeddings" -> "OpenAI")
+_GENERIC_NAME_WORDS = frozenset(
+    "embeddings embedding inference chat memory model models api search tool structured deprecated "
+    "rerank retriever extraction bucket uploader".split()
+)
+# First words of multi-word brands that are too generic to match alone ("Python REPL")
+_AMBIGUOUS_FIRST_WORDS = frozenset("google amazon azure python graph local hyper self home".split())
+# Generic catalog components that name no provider
+_GENERIC_COMPONENTS = frozenset(
+    "EmbeddingModel LanguageModelComponent EmbeddingSimilarityComponent TextEmbedderComponent AstraVectorize".split()
+)
+
+# Common names -> tech stack label
+ALIASES = {
+    "gpt": "OpenAI", "chatgpt": "OpenAI", "gpt4": "OpenAI", "open ai": "OpenAI",
+    "claude": "Anthropic", "gemini": "Google Generative AI", "mistral": "MistralAI",
+    "chroma": "Chroma DB", "chromadb": "Chroma DB", "postgres": "PGVector", "postgresql": "PGVector",
+    "pgvector": "PGVector", "mongo": "MongoDB Atlas", "mongodb": "MongoDB Atlas", "astra": "Astra DB",
+    "hugging face": "HuggingFace", "hf": "HuggingFace", "watsonx": "IBM watsonx.ai",
+    "bedrock": "Amazon Bedrock", "s3": "Amazon S3", "elastic": "Elasticsearch",
+    "gmail": "Gmail", "google drive": "Google Drive", "serpapi": "Serp", "wolfram": "WolframAlpha",
+}
+
+# Use cases in priority order: keywords, use case text and key tasks ({source} is filled in)
+USE_CASES = [
+    {
+        "name": "rag",
+        "keywords": ("rag", "retrieval", "retrieval augmented generation", "question answering", "qa",
+                     "knowledge base", "semantic search", "document search", "chat with", "ask questions",
+                     "answer questions", "answers questions", "questions about"),
+        "use_case": "Answer questions over {source} with retrieval-augmented generation",
+        "key_tasks": ["Load {source}", "Split the text into chunks", "Embed the chunks and store them in a vector store",
+                      "Retrieve the chunks relevant to each question", "Generate an answer with an LLM"],
+    },
+    {
+        "name": "agent",
+        "keywords": ("agent", "agents", "tool calling", "function calling", "autonomous", "multi agent"),
+        "use_case": "LLM agent that calls tools to complete user requests",
+        "key_tasks": ["Receive the user request", "Let an LLM agent choose and call tools", "Return the agent's answer"],
+    },
+    {
+        "name": "summarization",
+        "keywords": ("summarize", "summarise", "summarizer", "summarization", "summary", "summaries", "tldr"),
+        "use_case": "Summarize {source} with an LLM",
+        "key_tasks": ["Load {source}", "Summarize the content with an LLM", "Return the summary"],
+    },
+    {
+        "name": "translation",
+        "keywords": ("translate", "translation", "translator"),
+        "use_case": "Translate text with an LLM",
+        "key_tasks": ["Receive the text to translate", "Translate it with an LLM", "Return the translation"],
+    },
+    {
+        "name": "scraping",
+        "keywords": ("scrape", "scraper", "scraping", "crawl", "crawler", "crawling"),
+        "use_case": "Extract content from web pages",
+        "key_tasks": ["Fetch the web pages", "Extract the relevant content", "Return the extracted data"],
+    },
+    {
+        "name": "extraction",
+        "keywords": ("extract", "extraction", "extractor", "structured output", "parse", "parser"),
+        "use_case": "Extract structured data from {source} with an LLM",
+        "key_tasks": ["Load {source}", "Extract the fields with an LLM", "Return the structured output"],
+    },
+    {
+        "name": "classification",
+        "keywords": ("classify", "classifier", "classification", "categorize", "sentiment", "sentiment analysis"),
+        "use_case": "Classify text with an LLM",
+        "key_tasks": ["Receive the text", "Classify it with an LLM", "Return the label"],
+    },
+    {
+        "name": "sql",
+        "keywords": ("sql", "text to sql", "database query", "query a database"),
+        "use_case": "Answer questions about a SQL database",
+        "key_tasks": ["Translate the question into SQL", "Run the query against the database", "Answer from the query results"],
+    },
+    {
+        "name": "chatbot",
+        "keywords": ("chatbot", "chat bot", "chat", "assistant", "conversational", "conversation", "customer support"),
+        "use_case": "Conversational chatbot",
+        "key_tasks": ["Receive the user's chat message", "Keep the conversation history",
+                      "Generate a response with an LLM", "Return the response in the chat"],
+    },
+]
+
+# Data source keywords -> phrase used in use cases and tasks
+SOURCES = {
+    "pdf": "PDF documents", "pdfs": "PDF documents", "document": "documents", "documents": "documents",
+    "docs": "documents", "file": "files", "files": "files", "csv": "CSV files", "spreadsheet": "spreadsheets",
+    "website": "web pages", "websites": "web pages", "web": "web pages", "web pages": "web pages",
+    "url": "web pages", "urls": "web pages", "youtube": "YouTube transcripts", "videos": "YouTube transcripts",
+    "notion": "Notion pages", "google drive": "Google Drive files", "confluence": "Confluence pages",
+    "emails": "emails", "email": "emails",
+}
+
+# Constraint keywords -> canonical constraint (worded so the optimizer rules recognise it)
+CONSTRAINTS = {
+    "cheap": "Low cost", "cheaper": "Low cost", "cheaply": "Low cost", "low cost": "Low cost", "budget": "Low cost",
+    "inexpensive": "Low cost", "affordable": "Low cost",
+    "local": "Run locally", "locally": "Run locally", "offline": "Run locally", "on prem": "Run locally",
+    "self hosted": "Run locally",
+    "fast": "Low latency", "low latency": "Low latency", "quick": "Low latency", "real time": "Low latency",
+    "realtime": "Low latency",
+}
+
+# Words that add nothing to the requirements
+FILLER = frozenset(
+    "a an the and or of to for in on with using use uses by from into that which who this these my our your me us i we "
+    "it its is are be can could should would will want need needs like please build create make design set up setup "
+    "simple basic small system app application pipeline workflow flow project tool tools based powered "
+    "text search "
+    "some any all about over my their them uses via".split()
+)
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class RequirementExtractor:
+    """
+    Phrase-table matcher producing a RequirementContext dict and a confidence.
+    The table is built lazily on first use.
+    """
+    def __init__(self, catalog: ComponentCatalog = component_catalog):
+        self.catalog = catalog
+        # token tuple -> [(kind, value)], at most one per kind; kinds: tech, use_case, source, constraint
+        self._phrases: Optional[Dict[Tuple[str, ...], List[Tuple[str, str]]]] = None
+        self._max_ngram = 1
+
+    def _add(self, phrases, phrase: str, kind: str, value: str):
+        key = tuple(_tokens(phrase))
+        if not key:
+            return
+        # Also match the words run together ("chroma db" -> "chromadb")
+        for k in (key, ("".join(key),)) if len(key) > 1 else (key,):
+            meanings = phrases.setdefault(k, [])
+            if all(existing != kind for existing, _ in meanings):
+                meanings.append((kind, value))
+
+    def build(self):
+        if self._phrases is not None:
+            return
+        phrases: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        # Taxonomy first so its meaning wins over catalog names of the same kind
+        for use_case in USE_CASES:
+            for keyword in use_case["keywords"]:
+                self._add(phrases, keyword, "use_case", use_case["name"])
+        for keyword, constraint in CONSTRAINTS.items():
+            self._add(phrases, keyword, "constraint", constraint)
+        for keyword, source in SOURCES.items():
+            self._add(phrases, keyword, "source", source)
+        for alias, label in ALIASES.items():
+            self._add(phrases, alias, "tech", label)
+        for name in self.catalog.names():
+            category = self.catalog.category(name)
+            if name in _GENERIC_COMPONENTS:
+                continue
+            if category in VENDOR_CATEGORIES:
+                label = VENDOR_CATEGORIES[category]
+            elif category in TECH_CATEGORIES:
+                display = (self.catalog.get(name) or {}).get("display_name") or name
+                label = " ".join(word for word in re.sub(r"\[.*?\]", "", display).split()
+                                 if word.lower() not in _GENERIC_NAME_WORDS)
+                if not label:
+                    continue
+            else:
+                continue
+            self._add(phrases, label, "tech", label)
+            self._add(phrases, name, "tech", label)
+            # "tavily" for "Tavily AI", "yahoo" for "Yahoo Finance"
+            first = _tokens(label)[0] if _tokens(label) else ""
+            if len(first) >= 4 and first not in _AMBIGUOUS_FIRST_WORDS:
+                self._add(phrases, first, "tech", label)
+        self._phrases = phrases
+        self._max_ngram = max(len(key) for key in phrases)
+        logging.info(f"[RequirementExtractor] Built phrase table with {len(phrases)} phrases")
+
+    def extract(self, prompt: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Requirement context for a prompt and the confidence in it (0-1). The context
+        is None when no use case was recognised.
+        """
+        self.build()
+        tokens = _tokens(prompt)
+        if not tokens:
+            return None, 0.0
+        if _NEGATION.search(prompt):
+            logging.debug("[RequirementExtractor] Prompt contains a negation, leaving it to the LLM")
+            return None, 0.0
+        explained = 0
+        use_cases: List[str] = []
+        tech_stack: List[str] = []
+        sources: List[str] = []
+        constraints: List[str] = []
+        found = {"use_case": use_cases, "tech": tech_stack, "source": sources, "constraint": constraints}
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self._max_ngram, len(tokens) - i), 0, -1):
+                meanings = self._phrases.get(tuple(tokens[i:i + n]))
+                if meanings is not None:
+                    for kind, value in meanings:
+                        if value not in found[kind]:
+                            found[kind].append(value)
+                    explained += n
+                    i += n
+                    break
+            else:
+                token = tokens[i]
+                # Filler words and version numbers ("gpt 4o", "llama 3") explain themselves
+                if token in FILLER or any(ch.isdigit() for ch in token):
+                    explained += 1
+                i += 1
+
+        confidence = explained / len(tokens)
+        if not use_cases:
+            return None, confidence
+        spec = next(u for u in USE_CASES if u["name"] in use_cases)
+        source = sources[0] if sources else "documents"
+        context = {
+            "use_case": spec["use_case"].format(source=source),
+            "key_tasks": [task.format(source=source) for task in spec["key_tasks"]],
+            "tech_stack": tech_stack,
+            "constraints": constraints,
+            "ambiguities": [],
+        }
+        return context, confidence
+
+
+# Singleton instance
+requirement_extractor = RequirementExtractor()
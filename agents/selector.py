@@ -2,131 +2,164 @@
 app/agents/selector.py
 
 Component Selector agent: maps abstract workflow steps to concrete Langflow components
-using RAG over documentation chunks and component templates stored in Chroma DB and the OpenAI Responses API.
+in two phases (shortlist by component card, then parameters from the chosen templates),
+using documentation chunks stored in Chroma DB and the OpenAI Responses API.
 """
 import os
-import json
+import re
 import logging
 import pprint
 from typing import Dict, Any, List
 
 from openai import OpenAI
-from schemas import ComponentSpec, ComponentSelection
-from memory.vector_store import vector_store
-from .systemprompts import SELECTOR_PROMPT
+import fast_json
+from schemas import ComponentSpec, ComponentSelection, RequirementContext, WorkflowPlan
+from memory.vector_store import vector_store, VectorStoreUnavailable
+from memory.prompt_fragments import prompt_fragments
+from memory.component_cards import component_cards
+from memory.component_catalog import component_catalog
+from .model_router import model_router
+from .messages import build_messages, prompt_chars
+from .decoding import decode, output_text
+from .systemprompts import SELECTOR_PROMPT, SELECTOR_SHORTLIST_PROMPT
 
 # Initialize OpenAI Responses client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
 
-async def select_components(plan: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+# Candidate cards shown to the model per step in phase one
+SHORTLIST_SIZE = int(os.getenv("SELECTOR_SHORTLIST_SIZE", "8"))
+# Characters of documentation sent per chosen component in phase two
+DOC_SECTION_CHARS = int(os.getenv("SELECTOR_DOC_SECTION_CHARS", "3000"))
+
+_SECTION = re.compile(r"^## ", re.M)
+
+def _fold(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+def _documentation(chunks: List[Dict[str, Any]], names: List[str]) -> List[str]:
+    """
+    Sections of the retrieved documentation about the chosen components. Doc chunks
+    cover a whole category (one "## <display name>" section per component), so each
+    component is mapped to its section by catalog display name or component name.
+    """
+    sections: Dict[str, str] = {}
+    for chunk in chunks:
+        for section in _SECTION.split(chunk["document"])[1:]:
+            heading = _fold(section.split("\n", 1)[0])
+            sections.setdefault(heading, "## " + section.strip())
+    docs = []
+    for name in names:
+        display = (component_catalog.get(name) or {}).get("display_name") or ""
+        section = sections.get(_fold(display)) or sections.get(_fold(name))
+        if section and section[:DOC_SECTION_CHARS] not in docs:
+            docs.append(section[:DOC_SECTION_CHARS])
+    return docs
+
+def _call_model(stage: str, messages: List[Dict[str, str]], components: int = 0) -> Any:
+    """
+    One JSON-mode Responses API call on the model routed for its size, recorded in
+    the metrics under `stage`. Returns the output's JSON text.
+    """
+    model = model_router.route(stage, prompt_chars=prompt_chars(messages), components=components)
+    with model_router.track(stage, model) as call:
+        response = client.responses.create(
+            model=model,
+            input=messages,
+            text={"format": {"type": "json_object"}},
+        )
+        call["usage"] = response.usage
+    logging.info(f"[Selector] OpenAI API call complete ({stage}).")
+    content = output_text(response)
+    logging.debug(f"[Selector] Raw OpenAI response: {str(content)[:500]}")
+    return content
+
+async def select_components(plan: WorkflowPlan, requirements: RequirementContext) -> ComponentSelection:
     """
-    Select concrete Langflow components for each abstract step using RAG:
-    1. Retrieve documentation chunks relevant to each step from Chroma DB.
-    2. Retrieve component templates for potential components.
-    3. Build prompt including examples, templates, and available components.
-    4. Invoke the OpenAI Responses API to choose one component per step.
+    Select concrete Langflow components for each abstract step in two phases:
+    1. Shortlist candidate cards per step (name, display name, one-line description,
+       output types) from the component card index.
+    2. Ask the model to pick one candidate per step from the shortlists only.
+    3. Send the full (lean) templates and the documentation sections of the chosen
+       components only, and ask the model for the parameters.
     """
     logging.info("[Selector] Entry: select_components")
     logging.debug(f"[Selector] Received plan: {pprint.pformat(plan)[:500]}")
-    logging.debug(f"[Selector] Received context: {pprint.pformat(context)[:500]}")
+    logging.debug(f"[Selector] Received requirements: {pprint.pformat(requirements)[:500]}")
     try:
-        steps: List[str] = plan.get("steps", [])
-        tech_stack: List[str] = context.get("tech_stack", [])
-        constraints: List[str] = context.get("constraints", [])
+        steps: List[str] = plan.steps
+        tech_stack: List[str] = requirements.tech_stack
+        constraints: List[str] = requirements.constraints
         logging.debug(f"[Selector] Steps: {steps}")
         logging.debug(f"[Selector] Tech stack: {tech_stack}")
         logging.debug(f"[Selector] Constraints: {constraints}")
         
-        # 1. RAG: retrieve docs for each step (documentation only)
-        doc_results = []
-        for step in steps:
-            logging.info(f"[Selector] Querying vector store for docs related to step: {step}")
-            docs = await vector_store.query_docs(query=step, content_type="documentation")
+        # 1. RAG: retrieve docs for all steps in one batched query (documentation only)
+        logging.info(f"[Selector] Querying vector store for docs related to {len(steps)} steps")
+        per_step = await vector_store.query_docs_batch(queries=steps, n_results=3, content_type="documentation")
+        for step, docs in zip(steps, per_step):
             logging.debug(f"[Selector] Retrieved docs for step '{step}': {pprint.pformat(docs)[:500]}")
-            doc_results.extend(docs)
-        logging.debug(f"[Selector] Total retrieved doc chunks: {len(doc_results)}")
-        
-        # 2. Collect available components from documentation results
-        doc_components = set()
-        doc_chunks = []
-        for entry in doc_results:
-            chunk = entry["document"]
-            doc_chunks.append(chunk)
-            comp = entry["metadata"].get("component")
-            if comp:
-                doc_components.add(comp)
-        
-        # 3. Retrieve templates for all components
-        logging.info("[Selector] Retrieving component templates")
-        template_results = await vector_store.query_templates(n_results=50)
         
-        # Process template results
-        component_templates = {}
-        for entry in template_results:
-            component_name = entry["metadata"].get("component")
-            if component_name:
-                # Parse JSON template if possible
-                try:
-                    template_data = json.loads(entry["document"])
-                    component_templates[component_name] = template_data
-                except json.JSONDecodeError:
-                    logging.warning(f"[Selector] Could not parse template for {component_name}")
+        # 2. Phase one: compact shortlist per step
+        stack = " ".join(tech_stack)
+        shortlists = []
+        for step in steps:
+            cards = component_cards.shortlist(f"{step} {stack}", n_results=SHORTLIST_SIZE)
+            shortlists.append({"step": step, "candidates": cards})
+        shortlist_payload = {
+            "steps": shortlists,
+            "tech_stack": tech_stack,
+            "constraints": constraints,
+        }
+        shortlist_content = fast_json.dumps(shortlist_payload)
+        logging.debug(f"[Selector] Shortlist payload: {shortlist_content[:500]}")
+        content = _call_model("selector.shortlist", build_messages(SELECTOR_SHORTLIST_PROMPT, shortlist_content))
+        picked = fast_json.loads(content) if isinstance(content, str) else content
         
-        # Combine both types of components
-        available_components = list(doc_components.union(set(component_templates.keys())))
-        logging.debug(f"[Selector] Available components: {available_components}")
+        candidates = {card["name"] for entry in shortlists for card in entry["candidates"]}
+        chosen = []
+        for comp in picked.get("components", []):
+            name = comp.get("component_name")
+            if name in candidates and name not in chosen:
+                chosen.append(name)
+            elif name not in candidates:
+                logging.warning(f"[Selector] Ignoring component '{name}' outside the shortlist")
+        logging.info(f"[Selector] Phase one chose {chosen} from {len(candidates)} candidates")
+        if not chosen:
+            return ComponentSelection(components=[])
         
-        # 4. Build payload for Responses API
+        # 3. Phase two: full schemas and documentation for the chosen components only
+        chosen_set = set(chosen)
+        doc_chunks = _documentation(vector_store.dedupe_results(per_step), chosen)
+        # Templates (sorted, shared by requests choosing the same components) before the per-request data
+        reference = {
+            "templates": prompt_fragments.templates(((name, None) for name in chosen), vector_store.corpus_version())
+        }
         payload = {
-            "steps": steps,
+            "steps": [comp.get("step") for comp in picked.get("components", []) if comp.get("component_name") in chosen_set],
             "tech_stack": tech_stack,
             "constraints": constraints,
-            "available_components": available_components,
+            "available_components": chosen,
             "documentation": doc_chunks,
-            "templates": component_templates
         }
         logging.debug(f"[Selector] Payload for OpenAI: {pprint.pformat(payload)[:500]}")
-        
-        # 5. Call the OpenAI Responses API
-        response = client.responses.create(
-            model="gpt-4o-mini",
-            input=[
-                {
-                    "role": "system",
-                    "content": SELECTOR_PROMPT,
-                },
-                {
-                    "role": "user",
-                    "content": json.dumps(payload, ensure_ascii=False),
-                },
-            ],
-            text={"format": {"type": "json_object"}},
-        )
-        logging.info("[Selector] OpenAI API call complete.")
-        content = response.output[0].content
-        logging.debug(f"[Selector] Raw OpenAI response: {str(content)[:500]}")
-        if isinstance(content, list):
-            content = content[0]
-        if hasattr(content, 'text'):
-            content = content.text
-        if isinstance(content, str):
-            parsed = json.loads(content)
-        else:
-            parsed = content
-        logging.debug(f"[Selector] Parsed response: {pprint.pformat(parsed)[:500]}")
-        selection = ComponentSelection(**parsed)
+        content = _call_model("selector.parameters", build_messages(SELECTOR_PROMPT, payload, reference),
+                              components=len(chosen))
+        selection = decode(content, ComponentSelection)
         valid_comps: List[ComponentSpec] = []
         for comp in selection.components:
-            if comp.component_name in available_components:
+            if comp.component_name in chosen_set:
                 valid_comps.append(comp)
             else:
                 logging.warning(f"[Selector] Ignoring unsupported component '{comp.component_name}'")
         logging.info(f"[Selector] Selected {len(valid_comps)} valid components.")
-        logging.debug(f"[Selector] Returning components: {pprint.pformat([c.dict() for c in valid_comps])[:500]}")
+        logging.debug(f"[Selector] Returning components: {pprint.pformat(valid_comps)[:500]}")
         logging.info("[Selector] Exit: select_components")
-        return {"components": [c.dict() for c in valid_comps]}
+        return ComponentSelection(components=valid_comps)
+    except VectorStoreUnavailable:
+        # Surface outages instead of silently working without retrieval context
+        raise
     except Exception as e:
         logging.error(f"[Selector] Error: {e}", exc_info=True)
         empty = ComponentSelection(components=[])
         logging.info("[Selector] Returning empty component selection due to error.")
-        return {"components": []}
\ No newline at end of file
+        return empty
\ No newline at end of file
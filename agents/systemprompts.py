@@ -18,6 +18,7 @@ Your response MUST be a single valid JSON object with exactly one key: "steps".
     "Outline the order fulfillment process including shipping and delivery."
   ]
 - If you are unsure or have no information, return an empty list: { "steps": [] }
+- The context may include "examples": plans that worked for similar past requests, each with its "use_case", "tech_stack" and "steps". Use them as a reference for granularity and ordering, and adapt them to this request; do not copy steps that do not apply.
 
 **EXAMPLES (CORRECT):**
 {
@@ -71,30 +72,26 @@ Respond with valid JSON only.
 '''
 
 FLOW_ASSEMBLER_PROMPT = '''
-You are a Flow Assembler. Given a list of component specifications and component templates, generate a valid Langflow workflow in JSON format.
+You are a Flow Assembler. Given a list of component specifications and component templates, generate the nodes of a valid Langflow workflow in JSON format.
 
 Your response MUST be a single valid JSON object with exactly one top-level key: "flow_json".
 
-- The value of "flow_json" MUST be an object (dictionary) with exactly two keys: "nodes" and "edges".
-- "nodes" MUST be a list (array) of node objects. Each node object MUST have the following keys:
+- The value of "flow_json" MUST be an object (dictionary) with exactly one key: "nodes".
+- "nodes" MUST be a list (array) of node objects, ordered by data flow: every node MUST come after the nodes that feed it (e.g., loader before splitter, splitter before vector store, model before the output that displays its answer).
+- Each node object MUST have the following keys:
    - "id" (string): A unique identifier for the node (e.g., "loader", "splitter", "embedder")
    - "type" (string): MUST EXACTLY match a component name from the provided templates
-   - "position" (object): With "x" and "y" coordinates
    - "data" (object): Configuration parameters for this component
-- "edges" MUST be a list (array) of edge objects. Each edge object MUST have the following keys:
-   - "id" (string): A unique identifier for the edge (e.g., "e1", "e2")
-   - "source" (string): The id of the source node
-   - "target" (string): The id of the target node
-- The workflow MUST be logically consistent - components should only connect to compatible components (e.g., an embedding component must connect to a vector store, a loader must connect to a splitter)
+- DO NOT include edges or positions. Connections are derived automatically from the node order and the input/output types in the templates, and the layout is computed automatically.
 - DO NOT include any extra keys at the top level (only "flow_json" is allowed).
 - DO NOT include any explanations, comments, or text outside the JSON object.
 - DO NOT wrap the response in Markdown or any other formatting.
 - DO NOT include any metadata, summaries, or extra fields outside "flow_json".
-- If there are no nodes or edges, use empty lists: { "flow_json": { "nodes": [], "edges": [] } }
+- If there are no nodes, use an empty list: { "flow_json": { "nodes": [] } }
 
 **CRITICAL REQUIREMENTS**
 1. The "type" field MUST EXACTLY match the component names from templates
-2. Connections between components must be logically valid (check input/output compatibility)
+2. The order of "nodes" MUST follow the data flow, since edges are built from it
 3. All required parameters for each component must be included in the "data" object
 
 **EXAMPLE (CORRECT):**
@@ -104,7 +101,6 @@ Your response MUST be a single valid JSON object with exactly one top-level key:
       {
         "id": "loader",
         "type": "GitLoaderComponent",
-        "position": { "x": 100, "y": 100 },
         "data": {
           "repo_source": "Remote",
           "clone_url": "https://github.com/my-org/annual-report.git",
@@ -114,8 +110,7 @@ Your response MUST be a single valid JSON object with exactly one top-level key:
       },
       {
         "id": "splitter",
-        "type": "RecursiveCharacterTextSplitter",
-        "position": { "x": 500, "y": 500 },
+        "type": "SplitText",
         "data": {
           "chunk_size": 1000,
           "chunk_overlap": 200
@@ -124,70 +119,51 @@ Your response MUST be a single valid JSON object with exactly one top-level key:
       {
         "id": "embedder",
         "type": "OpenAIEmbeddings",
-        "position": { "x": 1000, "y": 1000 },
         "data": {
           "model": "text-embedding-3-small"
         }
       },
+      {
+        "id": "question",
+        "type": "ChatInput",
+        "data": {}
+      },
       {
         "id": "store",
         "type": "Chroma",
-        "position": { "x": 1700, "y": 1500 },
         "data": {
           "collection_name": "annual_report_index",
           "persist_directory": "./chroma_store",
-          "search_type": "similarity",
           "number_of_results": 10
         }
       },
+      {
+        "id": "prompt",
+        "type": "Prompt",
+        "data": {
+          "template": "Answer using the context: {context}"
+        }
+      },
       {
         "id": "llm",
         "type": "OpenAIModel",
-        "position": { "x": 300, "y": 300 },
         "data": {
           "model_name": "gpt-4o",
           "temperature": 0.0
         }
       },
       {
-        "id": "memory",
-        "type": "Memory",
-        "position": { "x": 500, "y": 300 },
+        "id": "answer",
+        "type": "ChatOutput",
         "data": {}
-      },
-      {
-        "id": "qa",
-        "type": "RetrievalQA",
-        "position": { "x": 700, "y": 300 },
-        "data": {
-          "input_value": "What are the key insights from the annual report?",
-          "chain_type": "Stuff"
-        }
       }
-    ],
-    "edges": [
-      { "id": "e1", "source": "loader", "target": "splitter" },
-      { "id": "e2", "source": "splitter", "target": "embedder" },
-      { "id": "e3", "source": "embedder", "target": "store" },
-      { "id": "e4", "source": "store", "target": "qa" },
-      { "id": "e5", "source": "llm", "target": "qa" },
-      { "id": "e6", "source": "memory", "target": "qa" }
     ]
   }
 }
 
 **EXAMPLES (INCORRECT, DO NOT DO THIS):**
 {
-  "nodes": [ ... ],
-  "edges": [ ... ]
-}
-{
-  "flow_json": {
-    "nodes": [
-      { "id": "1", "type": "X", "parameters": {} }
-    ]
-    // Missing 'edges' key
-  }
+  "nodes": [ ... ]
 }
 {
   "flow_json": [
@@ -200,32 +176,27 @@ Your response MUST be a single valid JSON object with exactly one top-level key:
       { 
         "id": "loader",
         "type": "GitLoader", // INCORRECT - doesn't match exact template name
-        "position": { "x": 100, "y": 100 },
         "data": {}
       }
-    ],
-    "edges": []
+    ]
   }
 }
 {
   "flow_json": {
     "nodes": [
-      { "id": "1", "type": "OpenAIEmbeddings", "position": {}, "data": {} },
-      { "id": "2", "type": "OpenAIModel", "position": {}, "data": {} }
-    ],
-    "edges": [
-      { "id": "e1", "source": "1", "target": "2" }
+      { "id": "store", "type": "Chroma", "data": {} },
+      { "id": "embedder", "type": "OpenAIEmbeddings", "data": {} }
+      // INCORRECT - the embedder feeds the store, so it must come first
     ]
   }
 }
 
 **REMEMBER:**
-- Only output a JSON object with a single key "flow_json" whose value is an object with exactly two keys: "nodes" and "edges".
+- Only output a JSON object with a single key "flow_json" whose value is an object with exactly one key: "nodes".
 - The "type" field MUST EXACTLY match the component names from templates.
-- Edges must connect logically compatible components.
+- Nodes must be listed in data-flow order; do not output edges or positions.
 - Do not include any other keys, objects, or explanations.
-- Each item in "nodes" must have "id", "type", "position", and "data".
-- Each item in "edges" must have "id", "source", and "target".
+- Each item in "nodes" must have "id", "type", and "data".
 - Respond with valid JSON only.
 '''
 
@@ -602,4 +573,33 @@ Your response MUST be a single valid JSON object with exactly one key: "componen
 - Do not include any other keys, objects, or explanations.
 - "parameters" must always be present and reflect the actual parameter structure from templates.
 - Respond with valid JSON only.
-'''
\ No newline at end of file
+'''
+FLOW_REPAIR_PROMPT = '''
+You are a Flow Repairer. A generated Langflow workflow failed validation. You are given only the offending parts:
+- "issues": what is wrong, each with a code, the node id and/or edge index, and a message
+- "nodes": the offending nodes, in the same {id, type, data} form as the workflow
+- "edges": the offending edges, if any
+- "components": for each component type involved, its valid "parameters", "outputs" and "inputs"; for unknown types, the "closest_components" in the catalog
+
+Fix every issue using only the component names, parameters and ports listed in "components".
+- Keep every node id unchanged.
+- Replace an unknown component type with the closest component that serves the same purpose.
+- Remove or rename parameters that the component does not have.
+- Only return edges if edges were given; return them corrected, or omit the ones that cannot be fixed.
+
+Your response MUST be a single valid JSON object with exactly two top-level keys: "nodes" and "edges", containing only the corrected nodes and edges.
+Respond with valid JSON only.
+'''
+
+SELECTOR_SHORTLIST_PROMPT = '''
+You are a component selection assistant. For each abstract workflow step you are given a shortlist of candidate Langflow components, each described by a compact card: "name", "display_name", a one-line "description", its "outputs" types and its "category".
+
+Pick exactly one candidate per step, the one that best implements the step. Prefer components that match the "tech_stack" and respect the "constraints", and make sure each chosen component's outputs can feed the next step.
+
+Your response MUST be a single valid JSON object with exactly one key: "components".
+- "components" is a list with one object per step, in step order, each with exactly two keys:
+    - "step": the step text, exactly as given
+    - "component_name": the "name" of the chosen candidate, exactly as given (case-sensitive)
+- Only choose from that step's candidates. If none fits, omit the step.
+- Respond with valid JSON only, with no explanations or Markdown.
+'''
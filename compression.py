@@ -0,0 +1,226 @@
+"""
+compression.py
+
+HTTP response compression:
+- PrecompressedPayload: pre-serialized, pre-compressed payloads for responses that
+  do not change between requests (e.g. the sample flows behind /api/flows)
+- CompressionMiddleware: negotiated gzip/brotli for every other response
+
+A static body is serialized once, compressed once per encoding (gzip, and brotli when the
+optional `brotli` package is installed), and served with a strong ETag per encoding.
+Requests carrying a matching If-None-Match get a bodiless 304.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+from fast_json import dumps_bytes
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "9"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "11"))
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available) -> str:
+    """
+    Pick a content coding from an Accept-Encoding header: the highest q-value among
+    the available codings, ties broken by ENCODING_PREFERENCE. identity is acceptable
+    unless explicitly refused.
+    """
+    weights: Dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    def weight(coding: str) -> float:
+        if coding in weights:
+            return weights[coding]
+        if "*" in weights:
+            return weights["*"]
+        return 1.0 if coding == "identity" else 0.0
+
+    best, best_q = "identity", 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding in available and weight(coding) > best_q:
+            best, best_q = coding, weight(coding)
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class PrecompressedPayload:
+    """
+    A JSON body serialized and compressed once, served with strong ETags.
+    """
+    def __init__(self, content: Any, media_type: str = "application/json", cache_control: str = "no-cache"):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        body = dumps_bytes(content)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        # encoding -> (bytes, strong ETag); each representation gets its own tag
+        self.variants: Dict[str, Tuple[bytes, str]] = {"identity": (body, f'"{digest}"')}
+        compressed = {"gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = (data, f'"{digest}-{encoding}"')
+
+        sizes = {encoding: len(data) for encoding, (data, _) in self.variants.items()}
+        logging.info(f"[Compression] Prepared payload {digest[:12]}: {sizes}")
+
+    def response(self, request: Request) -> Response:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), self.variants)
+        data, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": self.cache_control}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=data, media_type=self.media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the best encoding the client accepts
+    (brotli when available, else gzip). Streaming responses are compressed
+    incrementally; the compressor emits output whenever its window fills, so small
+    chunks (e.g. one per node) are not flushed one by one.
+    Responses that are small, already encoded, or bodiless pass through unchanged.
+    """
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.available = ("br", "gzip", "identity") if brotli is not None else ("gzip", "identity")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), self.available)
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self, encoding)(self.app, scope, receive, send)
+
+    def compressor(self, encoding: str):
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._zlib.compress(data)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._brotli = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._brotli.process(data)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._brotli.process(data) + self._brotli.finish()
+
+
+class _CompressingResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.start_message = None
+        self.stream = None
+        self.passthrough = False
+
+    async def __call__(self, app, scope, receive, send):
+        self.send = send
+        await app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether compression applies
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or headers.get("content-type", "").startswith(("image/", "audio/", "video/"))
+            )
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if self.passthrough or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.stream = self.middleware.compressor(self.encoding)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                body = self.stream.chunk(body)
+            else:
+                body = self.stream.finish(body)
+                headers["Content-Length"] = str(len(body))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+        body = self.stream.chunk(body) if more_body else self.stream.finish(body)
+        if body or not more_body:
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
@@ -0,0 +1,128 @@
+"""
+flow/compatibility.py
+
+Component compatibility index, built once from every template in the catalog.
+
+The core structure is a bipartite map from output type to the (component, input field)
+pairs that accept it, plus per-component source/target lists precomputed from it, so
+"what can feed X" and "what can X feed" are dictionary lookups.
+"""
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from memory.component_catalog import ComponentCatalog, component_catalog
+
+
+def component_ports(template: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Connectable ports of a component template:
+    - outputs: [{"name", "types"}]
+    - inputs: [{"name", "input_types", "type", "list", "advanced"}] in field order
+    """
+    outputs = [
+        {"name": out["name"], "types": list(out.get("types") or [])}
+        for out in template.get("outputs", [])
+        if out.get("name")
+    ]
+    fields = template.get("template", {})
+    order = template.get("field_order") or []
+    names = [n for n in order if n in fields] + [n for n in fields if n not in order]
+    inputs = []
+    for name in names:
+        field = fields[name]
+        if not isinstance(field, dict) or not field.get("input_types"):
+            continue
+        inputs.append({
+            "name": name,
+            "input_types": list(field["input_types"]),
+            "type": field.get("type", "str"),
+            "list": bool(field.get("list")),
+            "advanced": bool(field.get("advanced")),
+        })
+    return {"outputs": outputs, "inputs": inputs}
+
+
+class CompatibilityIndex:
+    """
+    Precomputed wiring index over the component catalog. Built lazily on first use.
+    """
+    def __init__(self, catalog: ComponentCatalog = component_catalog):
+        self.catalog = catalog
+        self._ports: Optional[Dict[str, Dict[str, List[Dict[str, Any]]]]] = None
+        self._accepts: Dict[str, List[Tuple[str, str]]] = {}
+        self._produces: Dict[str, List[Tuple[str, str]]] = {}
+        # Links are shared (source, output, target, field, type) tuples
+        self._targets: Dict[str, List[Tuple[str, str, str, str, str]]] = {}
+        self._sources: Dict[str, List[Tuple[str, str, str, str, str]]] = {}
+        self._pairs: Set[Tuple[str, str]] = set()
+
+    def build(self):
+        if self._ports is not None:
+            return
+        ports = {name: component_ports(self.catalog.get(name)) for name in self.catalog.names()}
+        accepts: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        produces: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        for name, p in ports.items():
+            for field in p["inputs"]:
+                for input_type in field["input_types"]:
+                    accepts[input_type].append((name, field["name"]))
+            for out in p["outputs"]:
+                for output_type in out["types"]:
+                    produces[output_type].append((name, out["name"]))
+
+        targets: Dict[str, list] = defaultdict(list)
+        sources: Dict[str, list] = defaultdict(list)
+        for output_type, producers in produces.items():
+            for target, field in accepts.get(output_type, []):
+                for source, output in producers:
+                    link = (source, output, target, field, output_type)
+                    targets[source].append(link)
+                    sources[target].append(link)
+                    self._pairs.add((source, target))
+
+        self._accepts = dict(accepts)
+        self._produces = dict(produces)
+        self._targets = dict(targets)
+        self._sources = dict(sources)
+        self._ports = ports
+        logging.info(f"[Compatibility] Indexed {len(ports)} components, {len(self._pairs)} compatible pairs")
+
+    def ports(self, name: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Ports of a component, or None if it is not in the catalog."""
+        self.build()
+        return self._ports.get(name)
+
+    def accepting(self, output_type: str) -> List[Tuple[str, str]]:
+        """(component, input field) pairs that accept the given output type."""
+        self.build()
+        return self._accepts.get(output_type, [])
+
+    def producing(self, output_type: str) -> List[Tuple[str, str]]:
+        """(component, output name) pairs that produce the given type."""
+        self.build()
+        return self._produces.get(output_type, [])
+
+    def can_connect(self, source: str, target: str) -> bool:
+        """Whether any output of source can feed any input of target."""
+        self.build()
+        return (source, target) in self._pairs
+
+    def compatible(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Everything a component can feed ("targets") and be fed by ("sources"),
+        or None if the component is not in the catalog.
+        """
+        self.build()
+        if name not in self._ports:
+            return None
+        keys = ("source", "output", "target", "field", "type")
+        return {
+            "component": name,
+            "targets": [dict(zip(keys, link)) for link in self._targets.get(name, [])],
+            "sources": [dict(zip(keys, link)) for link in self._sources.get(name, [])],
+        }
+
+
+# Singleton instance
+compatibility_index = CompatibilityIndex()
@@ -0,0 +1,113 @@
+"""
+flow/edges.py
+
+Deterministic edge builder: wires an ordered list of nodes by matching each
+component's output types (outputs[].types) against the input_types of the
+fields on downstream components, then emits fully encoded React Flow edges.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from flow.handles import generate_edges
+from flow.compatibility import compatibility_index
+
+# Generic payload types are wired after specific ones (Embeddings, LanguageModel, Tool, ...)
+GENERIC_TYPES = ("Message", "Text", "Data", "DataFrame")
+# Message/Text is accepted by almost every text field, so it only wires primary inputs
+TEXT_TYPES = ("Message", "Text")
+PRIMARY_TEXT_FIELDS = ("input_value", "search_query")
+
+
+def _matching_output(outputs: List[Dict[str, Any]], accepted: List[str]) -> Optional[Dict[str, Any]]:
+    """First output producing a type the field accepts, preferring the field's own type order."""
+    for wanted in accepted:
+        for out in outputs:
+            if wanted in out["types"]:
+                return out
+    return None
+
+
+def build_edges(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Build encoded edges for nodes given in data-flow order.
+
+    Each input field is fed from the nearest earlier node with a compatible output,
+    preferring nodes whose outputs are not consumed yet. Specific types (Embeddings,
+    LanguageModel, Tool, Memory, ...) are wired first; generic payloads (Message, Data,
+    DataFrame) then only flow from nodes whose outputs are not used elsewhere, and
+    Message only into primary inputs. List fields accept every unconsumed compatible node. Nodes whose type is not in
+    the catalog fall back to a plain edge from the previous node.
+    """
+    ports = [compatibility_index.ports(node.get("type", "")) for node in nodes]
+    consumed = set()
+    specs: List[Dict[str, Any]] = []
+    connected_fields = set()
+
+    def connect(i: int, j: int, out: Dict[str, Any], field: Dict[str, Any]):
+        source, target = nodes[i], nodes[j]
+        specs.append({
+            "source_node_id": source["id"],
+            "source_node_type": source["type"],
+            "target_node_id": target["id"],
+            "output_name": out["name"],
+            "output_types": out["types"],
+            "target_field_name": field["name"],
+            "target_field_type": field["type"],
+            "input_types": field["input_types"],
+        })
+        consumed.add(i)
+        connected_fields.add((j, field["name"]))
+
+    def candidates(j: int, accepted: List[str]):
+        """Earlier nodes with a compatible output: unconsumed ones first, each group nearest first."""
+        found = []
+        for i in range(j - 1, -1, -1):
+            if ports[i] is None:
+                continue
+            out = _matching_output(ports[i]["outputs"], accepted)
+            if out is not None:
+                found.append((i, out))
+        return [c for c in found if c[0] not in consumed] + [c for c in found if c[0] in consumed]
+
+    for specific in (True, False):
+        for j, node_ports in enumerate(ports):
+            if node_ports is None:
+                continue
+            for field in node_ports["inputs"]:
+                if (j, field["name"]) in connected_fields:
+                    continue
+                if specific:
+                    accepted = [t for t in field["input_types"] if t not in GENERIC_TYPES]
+                else:
+                    accepted = [
+                        t for t in field["input_types"]
+                        if t in GENERIC_TYPES and (t not in TEXT_TYPES or field["name"] in PRIMARY_TEXT_FIELDS)
+                    ]
+                if not accepted:
+                    continue
+                found = candidates(j, accepted)
+                if not specific:
+                    # Generic payloads only flow from nodes whose outputs are otherwise unused
+                    found = [c for c in found if c[0] not in consumed]
+                if not found:
+                    continue
+                if field["list"]:
+                    for i, out in [c for c in found if c[0] not in consumed] or found[:1]:
+                        connect(i, j, out, field)
+                else:
+                    connect(found[0][0], j, found[0][1], field)
+
+    edges = generate_edges(specs)
+
+    # Components outside the catalog: keep them in the chain with a plain edge
+    for j in range(1, len(nodes)):
+        if ports[j] is None or ports[j - 1] is None:
+            edges.append({
+                "id": f"e-{nodes[j - 1]['id']}-{nodes[j]['id']}",
+                "source": nodes[j - 1]["id"],
+                "target": nodes[j]["id"],
+            })
+            logging.debug(f"[EdgeBuilder] Plain edge {nodes[j - 1]['id']} -> {nodes[j]['id']} (type not in catalog)")
+
+    logging.info(f"[EdgeBuilder] Built {len(edges)} edges for {len(nodes)} nodes")
+    return edges
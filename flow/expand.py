@@ -0,0 +1,132 @@
+"""
+flow/expand.py
+
+Expansion of minimal flows ({id, type, data} nodes) into the full Langflow
+"genericNode" JSON the frontend imports, with each node's complete
+data.node definition filled in from the in-memory catalog.
+
+Expanded nodes share every unchanged subtree with the catalog (copy-on-write):
+only the node dict, its "template" dict and the fields whose values are overridden
+are new objects. Treat expanded nodes as read-only; copy a subtree before editing it.
+Serialization streams node by node and reuses the encoding of shared subtrees.
+"""
+import json
+import logging
+from typing import Any, Dict, Iterator, Tuple
+
+from memory.component_catalog import ComponentCatalog, component_catalog
+
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+class FlowExpander:
+    """
+    Expands minimal flows against a component catalog and streams them as JSON.
+    """
+    def __init__(self, catalog: ComponentCatalog = component_catalog):
+        self.catalog = catalog
+        # Encoded '"key":value' members for catalog subtrees,
+        # keyed by (component, key) or (component, "template", field)
+        self._fragments: Dict[Tuple[str, ...], str] = {}
+
+    def expand_node(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the genericNode for one minimal node. Parameters in node["data"] are
+        overlaid on the template field values; unknown parameter names are dropped.
+        Nodes whose type is not in the catalog are returned unchanged.
+        """
+        component = node.get("type")
+        definition = self.catalog.get(component)
+        if definition is None:
+            logging.warning(f"[Expand] Component '{component}' not in catalog; leaving node '{node.get('id')}' minimal")
+            return node
+
+        fields = definition.get("template", {})
+        template = dict(fields)
+        for name, value in (node.get("data") or {}).items():
+            field = fields.get(name)
+            if isinstance(field, dict):
+                template[name] = {**field, "value": value}
+            else:
+                logging.debug(f"[Expand] Dropping unknown parameter '{name}' on '{node.get('id')}'")
+        node_definition = dict(definition)
+        node_definition["template"] = template
+
+        return {
+            "id": node["id"],
+            "type": "genericNode",
+            "position": node.get("position", {"x": 0, "y": 0}),
+            "data": {
+                "id": node["id"],
+                "type": component,
+                "node": node_definition,
+            },
+        }
+
+    def expand_flow(self, flow: Dict[str, Any]) -> Dict[str, Any]:
+        """Expand every node of a {"nodes", "edges"} flow; edges are kept as they are."""
+        return {
+            "nodes": [self.expand_node(node) for node in flow.get("nodes", [])],
+            "edges": flow.get("edges", []),
+        }
+
+    def _member(self, fragment_key: Tuple[str, ...], name: str, value: Any) -> str:
+        """Encoded '"name":value' for a shared catalog subtree, computed once."""
+        encoded = self._fragments.get(fragment_key)
+        if encoded is None:
+            encoded = f"{_encode(name)}:{_encode(value)}"
+            self._fragments[fragment_key] = encoded
+        return encoded
+
+    def _iter_node(self, node: Dict[str, Any]) -> Iterator[str]:
+        data = node.get("data") or {}
+        component = data.get("type")
+        definition = self.catalog.get(component) if node.get("type") == "genericNode" else None
+        if definition is None or not isinstance(data.get("node"), dict):
+            yield _encode(node)
+            return
+
+        node_definition = data["node"]
+        catalog_fields = definition.get("template", {})
+        yield (
+            f'{{"id":{_encode(node["id"])},"type":"genericNode","position":{_encode(node.get("position"))},'
+            f'"data":{{"id":{_encode(data.get("id"))},"type":{_encode(component)},"node":{{'
+        )
+        members = []
+        for key, value in node_definition.items():
+            if key == "template":
+                parts = [
+                    self._member((component, "template", name), name, field)
+                    if field is catalog_fields.get(name) else f"{_encode(name)}:{_encode(field)}"
+                    for name, field in value.items()
+                ]
+                members.append(f'"template":{{{",".join(parts)}}}')
+            elif value is definition.get(key):
+                members.append(self._member((component, key), key, value))
+            else:
+                members.append(f"{_encode(key)}:{_encode(value)}")
+        yield ",".join(members)
+        yield "}}}"
+
+    def iter_json(self, flow: Dict[str, Any], wrap_key: str = None) -> Iterator[str]:
+        """
+        Stream an expanded flow as compact JSON text, one node at a time.
+        With wrap_key the flow is nested under that key, e.g. {"flow_json": {...}}.
+        """
+        if wrap_key:
+            yield f"{{{_encode(wrap_key)}:"
+        yield '{"nodes":['
+        for i, node in enumerate(flow.get("nodes", [])):
+            if i:
+                yield ","
+            yield from self._iter_node(node)
+        yield '],"edges":'
+        yield _encode(flow.get("edges", []))
+        yield "}"
+        if wrap_key:
+            yield "}"
+
+
+# Singleton instance
+flow_expander = FlowExpander()
@@ -0,0 +1,203 @@
+"""
+flow/handles.py
+
+Encoding of React Flow edge handles in the exact format the Langflow frontend expects.
+
+Handles are encoded as sorted-key JSON (no whitespace, keys unescaped, scalars as
+json.dumps renders them), then URL-quoted. The encoding of a handle depends only on
+its (node id, type, port, types), so encoded handles are memoized per port and shared
+by every edge that uses it; generate_edges() encodes whole edge lists that way.
+"""
+import json
+import os
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+# Encoded handles kept per port (source or target)
+HANDLE_CACHE_SIZE = int(os.getenv("HANDLE_CACHE_SIZE", "8192"))
+
+
+class _Raw(str):
+    """Already-encoded text on the encoder stack."""
+
+
+_OPEN_OBJECT, _CLOSE_OBJECT = _Raw("{"), _Raw("}")
+_OPEN_ARRAY, _CLOSE_ARRAY = _Raw("["), _Raw("]")
+_COMMA = _Raw(",")
+
+
+def sorted_json(value: Any) -> str:
+    """
+    Sorted-key JSON in the handle format, built with an explicit stack and one join
+    instead of recursive string concatenation.
+    """
+    parts: List[str] = []
+    stack: List[Any] = [value]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind is _Raw:
+            parts.append(item)
+        elif kind is str:
+            parts.append(encode_basestring_ascii(item))
+        elif isinstance(item, dict):
+            stack.append(_CLOSE_OBJECT)
+            pairs = sorted(item.items())
+            for n in range(len(pairs) - 1, -1, -1):
+                key, child = pairs[n]
+                stack.append(child)
+                stack.append(_Raw(f'"{key}":'))
+                if n:
+                    stack.append(_COMMA)
+            stack.append(_OPEN_OBJECT)
+        elif isinstance(item, list):
+            stack.append(_CLOSE_ARRAY)
+            for n in range(len(item) - 1, -1, -1):
+                stack.append(item[n])
+                if n:
+                    stack.append(_COMMA)
+            stack.append(_OPEN_ARRAY)
+        elif item is None:
+            parts.append("null")
+        else:
+            parts.append(json.dumps(item))
+    return "".join(parts)
+
+
+def _value_json(value: Any) -> str:
+    """Encode one handle value; strings and lists of strings skip the generic encoder."""
+    if type(value) is str:
+        return encode_basestring_ascii(value)
+    if type(value) is list and all(type(v) is str for v in value):
+        return "[" + ",".join(map(encode_basestring_ascii, value)) + "]"
+    return sorted_json(value)
+
+
+# Handle keys below are written in sorted order, as the frontend format requires
+@lru_cache(maxsize=HANDLE_CACHE_SIZE, typed=True)
+def _encoded_source_handle(node_id: Any, node_type: Any, output_name: Any, output_types: Optional[Tuple[Any, ...]]) -> str:
+    types = None if output_types is None else list(output_types)
+    return quote(
+        f'{{"dataType":{_value_json(node_type)},"id":{_value_json(node_id)},'
+        f'"name":{_value_json(output_name)},"output_types":{_value_json(types)}}}'
+    )
+
+
+@lru_cache(maxsize=HANDLE_CACHE_SIZE, typed=True)
+def _encoded_target_handle(node_id: Any, field_name: Any, field_type: Any, input_types: Optional[Tuple[Any, ...]]) -> str:
+    types = None if input_types is None else list(input_types)
+    return quote(
+        f'{{"fieldName":{_value_json(field_name)},"id":{_value_json(node_id)},'
+        f'"inputTypes":{_value_json(types)},"type":{_value_json(field_type)}}}'
+    )
+
+
+def generate_edge_handles(
+    source_node_id, 
+    source_node_type, 
+    target_node_id, 
+    output_name="text",
+    output_types=["Message"],
+    target_field_name="input_value",
+    target_field_type="str",
+    input_types=None
+):
+    """
+    Generate properly encoded edge handles for React Flow edge connections.
+    
+    Args:
+        source_node_id: ID of the source node
+        source_node_type: Type of the source node
+        target_node_id: ID of the target node
+        output_name: Name of the output port (default: "text")
+        output_types: Types that this output can produce (default: ["Message"])
+        target_field_name: Name of the input field on target node (default: "input_value")
+        target_field_type: Type of the target field (default: "str")
+        input_types: Types that the target accepts (default: same as output_types)
+        
+    Returns:
+        Dict containing sourceHandle, targetHandle and data values
+    """
+    if input_types is None:
+        input_types = output_types
+    
+    # Create source handle object with explicit structure matching frontend expectations
+    source_handle = {
+        "dataType": source_node_type,
+        "id": source_node_id,
+        "name": output_name,
+        "output_types": output_types
+    }
+    
+    # Create target handle object with explicit structure matching frontend expectations
+    target_handle = {
+        "fieldName": target_field_name,
+        "id": target_node_id,
+        "inputTypes": input_types,
+        "type": target_field_type
+    }
+    
+    # Sorted-key JSON, URL encoded, memoized per port
+    source_handle_str = _source_handle_str(source_node_id, source_node_type, output_name, output_types)
+    target_handle_str = _target_handle_str(target_node_id, target_field_name, target_field_type, input_types)
+    
+    # Create edge ID from source and target info
+    edge_id = f"reactflow__edge-{source_node_id}{source_handle_str}-{target_node_id}{target_handle_str}"
+    
+    return {
+        "id": edge_id,
+        "source": source_node_id,
+        "target": target_node_id,
+        "sourceHandle": source_handle_str,
+        "targetHandle": target_handle_str,
+        "type": "default",
+        "data": {
+            "sourceHandle": source_handle,
+            "targetHandle": target_handle
+        }
+    }
+
+
+def _memoizable(types: Any) -> bool:
+    """Types lists are memoized as tuples, so only None or lists of strings qualify (1 == True in a key)."""
+    return types is None or (type(types) is list and all(type(t) is str for t in types))
+
+
+def _source_handle_str(node_id, node_type, output_name, output_types) -> str:
+    if _memoizable(output_types):
+        try:
+            return _encoded_source_handle(node_id, node_type, output_name,
+                                          None if output_types is None else tuple(output_types))
+        except TypeError:
+            pass
+    # Unhashable or unusual values (e.g. nested lists, tuples, numbers): encode without memoizing
+    return quote(sorted_json({"dataType": node_type, "id": node_id, "name": output_name, "output_types": output_types}))
+
+
+def _target_handle_str(node_id, field_name, field_type, input_types) -> str:
+    if _memoizable(input_types):
+        try:
+            return _encoded_target_handle(node_id, field_name, field_type,
+                                          None if input_types is None else tuple(input_types))
+        except TypeError:
+            pass
+    return quote(sorted_json({"fieldName": field_name, "id": node_id, "inputTypes": input_types, "type": field_type}))
+
+
+def generate_edges(specs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Encode a whole edge list. Each spec holds generate_edge_handles() keyword arguments;
+    handles are encoded once per port and reused across the list (and across calls).
+    """
+    return [generate_edge_handles(**spec) for spec in specs]
+
+
+def handle_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counts of the per-port handle caches."""
+    stats = {}
+    for name, cached in (("source", _encoded_source_handle), ("target", _encoded_target_handle)):
+        info = cached.cache_info()
+        stats[name] = {"size": info.currsize, "maxsize": info.maxsize, "hits": info.hits, "misses": info.misses}
+    return stats
@@ -0,0 +1,128 @@
+"""
+flow/layout.py
+
+Layered (Sugiyama-style) layout for flow graphs, so node positions no longer
+have to come from the LLM:
+1. Topological order with cycle breaking (Kahn's algorithm)
+2. Longest-path layering
+3. Crossing reduction by barycenter sweeps
+4. Grid coordinate assignment, each layer centered vertically
+
+Every step is O(V + E) except the per-layer sorts, so the whole pass is
+O((V + E) * sweeps + V log V).
+"""
+from collections import defaultdict, deque
+from typing import Any, Dict, List
+
+X_SPACING = 400
+Y_SPACING = 250
+ORIGIN = (100, 100)
+
+
+def _topological_order(ids: List[str], succs: Dict[str, List[str]], indegree: Dict[str, int]) -> List[str]:
+    """Kahn's algorithm; on a cycle, the earliest unplaced node (input order) is forced next."""
+    indegree = dict(indegree)
+    queue = deque(i for i in ids if indegree[i] == 0)
+    placed = set()
+    order = []
+    cursor = 0
+    while len(order) < len(ids):
+        if not queue:
+            while ids[cursor] in placed:
+                cursor += 1
+            queue.append(ids[cursor])
+        node = queue.popleft()
+        if node in placed:
+            continue
+        placed.add(node)
+        order.append(node)
+        for nxt in succs[node]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0 and nxt not in placed:
+                queue.append(nxt)
+    return order
+
+
+def layout_nodes(nodes: List[Dict[str, Any]],
+                 edges: List[Dict[str, Any]],
+                 x_spacing: int = X_SPACING,
+                 y_spacing: int = Y_SPACING,
+                 sweeps: int = 4) -> List[Dict[str, Any]]:
+    """
+    Assign node["position"] = {"x", "y"} in place for every node and return the nodes.
+    Edges referencing unknown nodes, and self-loops, are ignored.
+    """
+    ids = []
+    seen = set()
+    for node in nodes:
+        if node["id"] not in seen:
+            seen.add(node["id"])
+            ids.append(node["id"])
+    succs: Dict[str, List[str]] = defaultdict(list)
+    indegree = {i: 0 for i in ids}
+    for edge in edges:
+        source, target = edge.get("source"), edge.get("target")
+        if source in seen and target in seen and source != target:
+            succs[source].append(target)
+            indegree[target] += 1
+
+    order = _topological_order(ids, succs, indegree)
+    rank = {node_id: i for i, node_id in enumerate(order)}
+
+    # Longest-path layering over forward edges only (back edges of broken cycles are ignored)
+    layer = {node_id: 0 for node_id in order}
+    preds: Dict[str, List[str]] = defaultdict(list)
+    forward_succs: Dict[str, List[str]] = defaultdict(list)
+    for source in order:
+        for target in succs[source]:
+            if rank[target] > rank[source]:
+                preds[target].append(source)
+                forward_succs[source].append(target)
+                if layer[source] + 1 > layer[target]:
+                    layer[target] = layer[source] + 1
+
+    layers: List[List[str]] = [[] for _ in range(max(layer.values(), default=-1) + 1)]
+    for node_id in order:
+        layers[layer[node_id]].append(node_id)
+
+    # Barycenter sweeps: order each layer by the mean slot of its neighbours in the fixed layer
+    slot = {}
+    for members in layers:
+        for i, node_id in enumerate(members):
+            slot[node_id] = i
+
+    def reorder(members: List[str], neighbours: Dict[str, List[str]]):
+        def barycenter(node_id: str) -> float:
+            adjacent = neighbours[node_id]
+            if not adjacent:
+                return slot[node_id]
+            return sum(slot[n] for n in adjacent) / len(adjacent)
+        members.sort(key=barycenter)
+        for i, node_id in enumerate(members):
+            slot[node_id] = i
+
+    for _ in range(sweeps):
+        for members in layers[1:]:
+            reorder(members, preds)
+        for members in reversed(layers[:-1]):
+            reorder(members, forward_succs)
+
+    height = max((len(members) for members in layers), default=0)
+    positions = {}
+    for depth, members in enumerate(layers):
+        offset = (height - len(members)) / 2
+        for i, node_id in enumerate(members):
+            positions[node_id] = {
+                "x": ORIGIN[0] + depth * x_spacing,
+                "y": ORIGIN[1] + round((offset + i) * y_spacing),
+            }
+
+    for node in nodes:
+        node["position"] = dict(positions[node["id"]])
+    return nodes
+
+
+def layout_flow(flow: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+    """Lay out a {"nodes", "edges"} flow in place and return it."""
+    layout_nodes(flow.get("nodes", []), flow.get("edges", []), **kwargs)
+    return flow
@@ -0,0 +1,355 @@
+"""
+flow/validator.py
+
+Validation and local repair of generated flows against the component catalog.
+
+Nodes are indexed once, so every check is a dictionary lookup and a full pass is
+O(V + E):
+- ids are present and unique
+- every node type exists in the catalog
+- every parameter name exists in the component's template
+- edges reference existing nodes, and their ports are type-compatible
+- the graph is acyclic (optional)
+
+Problems with an unambiguous fix (dangling edges, malformed entries, duplicate ids no
+edge refers to, case-mismatched component or parameter names) are repaired locally.
+Whatever is left is described per offending node by repair_request(), so the model is
+only re-prompted about those.
+"""
+import difflib
+import logging
+import re
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from memory.component_catalog import ComponentCatalog, component_catalog
+from flow.compatibility import CompatibilityIndex, compatibility_index
+
+# Issue codes
+MALFORMED_NODE = "malformed_node"
+MALFORMED_EDGE = "malformed_edge"
+MISSING_ID = "missing_id"
+DUPLICATE_ID = "duplicate_id"
+UNKNOWN_TYPE = "unknown_type"
+UNKNOWN_PARAM = "unknown_param"
+DANGLING_EDGE = "dangling_edge"
+UNKNOWN_PORT = "unknown_port"
+INCOMPATIBLE_PORT = "incompatible_port"
+CYCLE = "cycle"
+
+
+def _fold(name: str) -> str:
+    """Case- and separator-insensitive key: 'openai_model' and 'OpenAIModel' fold alike."""
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def _valid_id(node_id: Any) -> bool:
+    return isinstance(node_id, (str, int)) and not isinstance(node_id, bool) and node_id != ""
+
+
+def _issue(code: str, message: str, node: Optional[str] = None, edge: Optional[int] = None) -> Dict[str, Any]:
+    return {"code": code, "node": node, "edge": edge, "message": message}
+
+
+class FlowValidator:
+    """
+    Linear-time checks and local repairs for {"nodes", "edges"} flows in the minimal
+    {id, type, data} node form (genericNode nodes are checked by their data.type).
+    """
+    def __init__(self,
+                 catalog: ComponentCatalog = component_catalog,
+                 index: CompatibilityIndex = compatibility_index):
+        self.catalog = catalog
+        self.index = index
+        self._names: Optional[Dict[str, Optional[str]]] = None
+        self._fields: Dict[str, Dict[str, Optional[str]]] = {}
+
+    # --- Catalog lookups ---
+
+    def _canonical_names(self) -> Dict[str, Optional[str]]:
+        """Folded name -> catalog name; None where two names fold alike (ambiguous)."""
+        if self._names is None:
+            names: Dict[str, Optional[str]] = {}
+            for name in self.catalog.names():
+                key = _fold(name)
+                names[key] = None if key in names and names[key] != name else name
+            self._names = names
+        return self._names
+
+    def _field_names(self, component: str) -> Dict[str, Optional[str]]:
+        """Folded field name -> template field name for a catalog component."""
+        fields = self._fields.get(component)
+        if fields is None:
+            fields = {}
+            for name, field in self.catalog.get(component).get("template", {}).items():
+                if isinstance(field, dict):
+                    key = _fold(name)
+                    fields[key] = None if key in fields else name
+            self._fields[component] = fields
+        return fields
+
+    def canonical_type(self, name: str) -> Optional[str]:
+        """Catalog name for a possibly case-mismatched component name, or None."""
+        if name in self.catalog:
+            return name
+        return self._canonical_names().get(_fold(name))
+
+    @staticmethod
+    def _component(node: Dict[str, Any]) -> Any:
+        if node.get("type") == "genericNode":
+            data = node.get("data")
+            return data.get("type") if isinstance(data, dict) else None
+        return node.get("type")
+
+    # --- Validation ---
+
+    def validate(self, flow: Dict[str, Any], acyclic: bool = True) -> List[Dict[str, Any]]:
+        """
+        Check a flow and return its issues as {"code", "node", "edge", "message"} dicts
+        (empty when valid). "node" is the offending node id, "edge" the edge index.
+        """
+        issues: List[Dict[str, Any]] = []
+        nodes = flow.get("nodes") or []
+        edges = flow.get("edges") or []
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for i, node in enumerate(nodes):
+            if not isinstance(node, dict):
+                issues.append(_issue(MALFORMED_NODE, f"Node {i} is not an object"))
+                continue
+            node_id = node.get("id")
+            if not _valid_id(node_id):
+                issues.append(_issue(MISSING_ID, f"Node {i} has no valid id"))
+                continue
+            if node_id in by_id:
+                issues.append(_issue(DUPLICATE_ID, f"Duplicate node id '{node_id}'", node=node_id))
+                continue
+            by_id[node_id] = node
+
+            component = self._component(node)
+            if not isinstance(component, str) or component not in self.catalog:
+                issues.append(_issue(UNKNOWN_TYPE, f"Unknown component type '{component}'", node=node_id))
+                continue
+            if node.get("type") == "genericNode":
+                continue
+            data = node.get("data") or {}
+            if not isinstance(data, dict):
+                issues.append(_issue(UNKNOWN_PARAM, f"Parameters of '{component}' are not an object", node=node_id))
+                continue
+            template = self.catalog.get(component).get("template", {})
+            for param in data:
+                if not isinstance(template.get(param), dict):
+                    issues.append(_issue(UNKNOWN_PARAM, f"'{component}' has no parameter '{param}'", node=node_id))
+
+        succs: Dict[str, List[str]] = {node_id: [] for node_id in by_id}
+        indegree = {node_id: 0 for node_id in by_id}
+        linked: List[Tuple[int, str, str]] = []
+        for i, edge in enumerate(edges):
+            if not isinstance(edge, dict):
+                issues.append(_issue(MALFORMED_EDGE, f"Edge {i} is not an object", edge=i))
+                continue
+            source, target = edge.get("source"), edge.get("target")
+            if not _valid_id(source) or not _valid_id(target) or source not in by_id or target not in by_id:
+                issues.append(_issue(DANGLING_EDGE, f"Edge {i} references a missing node ({source} -> {target})", edge=i))
+                continue
+            succs[source].append(target)
+            indegree[target] += 1
+            linked.append((i, source, target))
+            issue = self._check_ports(edge, by_id[source], by_id[target])
+            if issue:
+                issues.append(_issue(issue[0], issue[1], node=target, edge=i))
+
+        if acyclic:
+            stuck = self._cyclic_nodes(succs, indegree)
+            for i, source, target in linked:
+                if source in stuck and target in stuck:
+                    issues.append(_issue(CYCLE, f"Edge {i} ({source} -> {target}) is on or downstream of a cycle",
+                                         node=target, edge=i))
+        return issues
+
+    def _check_ports(self, edge: Dict[str, Any], source: Dict[str, Any], target: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """(code, message) if the edge's ports do not fit, None otherwise or when types are unknown."""
+        source_type, target_type = self._component(source), self._component(target)
+        if not isinstance(source_type, str) or not isinstance(target_type, str):
+            return None
+        source_ports, target_ports = self.index.ports(source_type), self.index.ports(target_type)
+        if source_ports is None or target_ports is None:
+            return None
+
+        handles = edge.get("data") or {}
+        source_handle, target_handle = handles.get("sourceHandle"), handles.get("targetHandle")
+        if not isinstance(source_handle, dict) or not isinstance(target_handle, dict):
+            # Plain edge: any compatible output/input pair will do
+            if not self.index.can_connect(source_type, target_type):
+                return INCOMPATIBLE_PORT, f"No output of '{source_type}' fits an input of '{target_type}'"
+            return None
+
+        output = next((o for o in source_ports["outputs"] if o["name"] == source_handle.get("name")), None)
+        if output is None:
+            return UNKNOWN_PORT, f"'{source_type}' has no output '{source_handle.get('name')}'"
+        field = next((f for f in target_ports["inputs"] if f["name"] == target_handle.get("fieldName")), None)
+        if field is None:
+            return UNKNOWN_PORT, f"'{target_type}' has no connectable input '{target_handle.get('fieldName')}'"
+        if not set(output["types"]) & set(field["input_types"]):
+            return (INCOMPATIBLE_PORT,
+                    f"'{source_type}.{output['name']}' {output['types']} does not fit "
+                    f"'{target_type}.{field['name']}' {field['input_types']}")
+        return None
+
+    @staticmethod
+    def _cyclic_nodes(succs: Dict[str, List[str]], indegree: Dict[str, int]) -> Set[str]:
+        """Nodes Kahn's algorithm cannot order, i.e. nodes on or behind a cycle."""
+        indegree = dict(indegree)
+        queue = deque(node_id for node_id, degree in indegree.items() if degree == 0)
+        ordered = 0
+        while queue:
+            node_id = queue.popleft()
+            ordered += 1
+            for nxt in succs[node_id]:
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    queue.append(nxt)
+        if ordered == len(indegree):
+            return set()
+        return {node_id for node_id, degree in indegree.items() if degree > 0}
+
+    # --- Local repair ---
+
+    def repair(self, flow: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Apply the unambiguous fixes and return (repaired flow, descriptions of the fixes).
+        The input is not modified; changed nodes are shallow copies.
+        - component and parameter names that differ only in case or separators are renamed
+        - missing ids are generated; duplicate ids get a numeric suffix unless an edge
+          refers to the id, since the edge could mean either node (validate() reports it)
+        - malformed nodes and edges, edges to missing nodes, and exact duplicate edges
+          are dropped
+        """
+        fixes: List[str] = []
+        nodes: List[Dict[str, Any]] = []
+        seen: Set[Any] = set()
+        raw_edges = flow.get("edges") or []
+        linked = {end for edge in raw_edges if isinstance(edge, dict)
+                  for end in (edge.get("source"), edge.get("target")) if _valid_id(end)}
+
+        for i, node in enumerate(flow.get("nodes") or []):
+            if not isinstance(node, dict):
+                fixes.append(f"Dropped malformed node {i}")
+                continue
+            node = dict(node)
+            component = self._component(node)
+            canonical = self.canonical_type(component) if isinstance(component, str) and component else None
+            if canonical and canonical != component and node.get("type") != "genericNode":
+                fixes.append(f"Renamed component '{component}' to '{canonical}'")
+                node["type"] = canonical
+            if canonical and node.get("type") != "genericNode" and isinstance(node.get("data"), dict):
+                node["data"] = self._repair_params(canonical, node["data"], fixes)
+
+            node_id = node.get("id")
+            if not _valid_id(node_id):
+                node_id = f"{canonical or 'node'}-{i}"
+                fixes.append(f"Assigned id '{node_id}' to node {i}")
+            if node_id in seen and node_id not in linked:
+                base, n = node_id, 2
+                while f"{base}-{n}" in seen:
+                    n += 1
+                node_id = f"{base}-{n}"
+                fixes.append(f"Renamed duplicate node id '{base}' to '{node_id}'")
+            node["id"] = node_id
+            seen.add(node_id)
+            nodes.append(node)
+
+        edges: List[Dict[str, Any]] = []
+        edge_keys: Set[Tuple[Any, ...]] = set()
+        for i, edge in enumerate(raw_edges):
+            if not isinstance(edge, dict):
+                fixes.append(f"Dropped malformed edge {i}")
+                continue
+            source, target = edge.get("source"), edge.get("target")
+            if not _valid_id(source) or not _valid_id(target) or source not in seen or target not in seen:
+                fixes.append(f"Dropped dangling edge {source} -> {target}")
+                continue
+            key = (source, target, repr(edge.get("sourceHandle")), repr(edge.get("targetHandle")))
+            if key in edge_keys:
+                fixes.append(f"Dropped duplicate edge {source} -> {target}")
+                continue
+            edge_keys.add(key)
+            edges.append(edge)
+
+        if fixes:
+            logging.info(f"[Validator] Applied {len(fixes)} local fixes: {fixes}")
+        return {**flow, "nodes": nodes, "edges": edges}, fixes
+
+    def _repair_params(self, component: str, params: Dict[str, Any], fixes: List[str]) -> Dict[str, Any]:
+        fields = self._field_names(component)
+        repaired = {}
+        for name, value in params.items():
+            canonical = fields.get(_fold(name))
+            if canonical and canonical != name and canonical not in params:
+                fixes.append(f"Renamed parameter '{component}.{name}' to '{canonical}'")
+                name = canonical
+            repaired[name] = value
+        return repaired
+
+    # --- Re-prompting ---
+
+    def repair_request(self, flow: Dict[str, Any], issues: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Payload for re-prompting the model about the offending nodes only: the issues,
+        those nodes and edges, and the valid parameters/ports (or closest catalog names)
+        for their component types.
+        """
+        edges = flow.get("edges") or []
+        node_ids = {issue["node"] for issue in issues if issue["node"]}
+        edge_indexes = sorted({issue["edge"] for issue in issues
+                               if issue["edge"] is not None and isinstance(edges[issue["edge"]], dict)})
+        for i in edge_indexes:
+            node_ids.update(end for end in (edges[i].get("source"), edges[i].get("target")) if _valid_id(end))
+
+        nodes = [node for node in flow.get("nodes") or []
+                 if isinstance(node, dict) and _valid_id(node.get("id")) and node.get("id") in node_ids]
+        components = {}
+        for node in nodes:
+            component = self._component(node)
+            if not isinstance(component, str):
+                component = str(component)
+            if component in components:
+                continue
+            if component in self.catalog:
+                ports = self.index.ports(component)
+                components[component] = {
+                    "parameters": sorted(name for name in self._field_names(component).values() if name),
+                    "outputs": ports["outputs"],
+                    "inputs": [{"name": f["name"], "input_types": f["input_types"]} for f in ports["inputs"]],
+                }
+            else:
+                components[component] = {
+                    "closest_components": difflib.get_close_matches(str(component), self.catalog.names(), n=5, cutoff=0.5)
+                }
+        return {
+            "issues": issues,
+            "nodes": nodes,
+            "edges": [edges[i] for i in edge_indexes],
+            "components": components,
+        }
+
+    @staticmethod
+    def merge_repair(flow: Dict[str, Any], issues: List[Dict[str, Any]], corrected: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge a corrected {"nodes", "edges"} answer back into the flow: nodes are replaced
+        by id, in place in the node order (nodes with new ids are ignored), and the
+        offending edges are replaced by the corrected edges.
+        """
+        replacements = {node["id"]: node for node in corrected.get("nodes") or []
+                        if isinstance(node, dict) and _valid_id(node.get("id"))}
+        nodes = [replacements.get(node.get("id"), node) if isinstance(node, dict) and _valid_id(node.get("id")) else node
+                 for node in flow.get("nodes") or []]
+        bad_edges = {issue["edge"] for issue in issues if issue["edge"] is not None}
+        edges = [edge for i, edge in enumerate(flow.get("edges") or []) if i not in bad_edges]
+        if bad_edges:
+            edges.extend(corrected.get("edges") or [])
+        return {**flow, "nodes": nodes, "edges": edges}
+
+
+# Singleton instance
+flow_validator = FlowValidator()
@@ -9,7 +9,8 @@ import logging
 from typing import TypedDict, Dict, Any, Annotated
 import pprint
 
-from fastapi import FastAPI, HTTPException
+from fastapi import BackgroundTasks, FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
@@ -18,18 +19,30 @@ from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 
 from agents.requirement_analyzer import analyze_requirements
-from agents.planner import plan_workflow
+from agents.planner import plan_workflow, record_plan
 from agents.selector import select_components
 from agents.optimizer import optimize_plan
 from agents.clarifier import clarify_requirements
 from agents.assembler import assemble_flow
-from memory.vector_store import vector_store
+from schemas import RequirementContext, WorkflowPlan, ComponentSelection, OptimizedPlan
+from memory.vector_store import vector_store, VectorStoreUnavailable
+from flow.compatibility import compatibility_index
+from flow.expand import flow_expander
+from server import router as flows_router
+from compression import CompressionMiddleware
+from fast_json import FastJSONResponse
+from memory.prompt_fragments import prompt_fragments
+from flow.handles import handle_cache_stats
+from memory.clarification_cache import clarification_cache
+from metrics import metrics
+from agents.model_router import model_router
 
 # --------------------
 # Pydantic schemas for request/response
 # --------------------
 class DesignRequest(BaseModel):
     prompt: str
+    expand: bool = False  # Return full genericNode definitions instead of minimal nodes
 
 class DesignResponse(BaseModel):
     flow_json: Dict[str, Any]
@@ -37,9 +50,19 @@ class DesignResponse(BaseModel):
 # --------------------
 # Graph state definition
 # --------------------
+class PipelineContext(TypedDict, total=False):
+    """Intermediate pipeline context; each agent's typed output is carried as is."""
+    prompt: str
+    requirements: RequirementContext
+    plan: WorkflowPlan
+    selection: ComponentSelection
+    optimized: OptimizedPlan
+    clarifications: Dict[str, str]
+    flow_json: Dict[str, Any]
+
 class ContextState(TypedDict):
     messages: Annotated[list, add_messages]   # chat history
-    context: Dict[str, Any]                  # intermediate pipeline context
+    context: PipelineContext                 # intermediate pipeline context
 
 # --------------------
 # Node implementations
@@ -47,15 +70,15 @@ class ContextState(TypedDict):
 async def node_analyze(state: ContextState) -> Dict[str, Any]:
     logging.info("[Pipeline] Node: analyze - entry.")
     logging.debug(f"[Pipeline] State before analyze: {pprint.pformat(state)[:500]}")
-    ctx = await analyze_requirements(state["context"]["prompt"])
-    logging.debug(f"[Pipeline] Output from analyze: {pprint.pformat(ctx)[:500]}")
+    requirements = await analyze_requirements(state["context"]["prompt"])
+    logging.debug(f"[Pipeline] Output from analyze: {pprint.pformat(requirements)[:500]}")
     logging.info("[Pipeline] Node: analyze - exit.")
-    return {"context": {**state["context"], **ctx}}
+    return {"context": {**state["context"], "requirements": requirements}}
 
 async def node_plan(state: ContextState) -> Dict[str, Any]:
     logging.info("[Pipeline] Node: plan - entry.")
     logging.debug(f"[Pipeline] State before plan: {pprint.pformat(state)[:500]}")
-    plan = await plan_workflow(state["context"])
+    plan = await plan_workflow(state["context"]["requirements"])
     logging.debug(f"[Pipeline] Output from plan: {pprint.pformat(plan)[:500]}")
     logging.info("[Pipeline] Node: plan - exit.")
     return {"context": {**state["context"], "plan": plan}}
@@ -63,38 +86,43 @@ async def node_plan(state: ContextState) -> Dict[str, Any]:
 async def node_select(state: ContextState) -> Dict[str, Any]:
     logging.info("[Pipeline] Node: select - entry.")
     logging.debug(f"[Pipeline] State before select: {pprint.pformat(state)[:500]}")
-    comps = await select_components(state["context"]["plan"], state["context"])
-    logging.debug(f"[Pipeline] Output from select: {pprint.pformat(comps)[:500]}")
+    selection = await select_components(state["context"]["plan"], state["context"]["requirements"])
+    logging.debug(f"[Pipeline] Output from select: {pprint.pformat(selection)[:500]}")
     logging.info("[Pipeline] Node: select - exit.")
-    return {"context": {**state["context"], "components": comps}}
+    return {"context": {**state["context"], "selection": selection}}
 
 async def node_optimize(state: ContextState) -> Dict[str, Any]:
     logging.info("[Pipeline] Node: optimize - entry.")
     logging.debug(f"[Pipeline] State before optimize: {pprint.pformat(state)[:500]}")
-    optim = await optimize_plan(state["context"]["components"], state["context"])
-    logging.debug(f"[Pipeline] Output from optimize: {pprint.pformat(optim)[:500]}")
+    optimized = await optimize_plan(state["context"]["selection"], state["context"]["requirements"])
+    logging.debug(f"[Pipeline] Output from optimize: {pprint.pformat(optimized)[:500]}")
     logging.info("[Pipeline] Node: optimize - exit.")
-    return {"context": {**state["context"], **optim}}
+    return {"context": {**state["context"], "optimized": optimized}}
 
 def next_after_optimize(state: ContextState) -> str:
-    next_node = "clarify" if state["context"].get("needs_clarification") else "assemble"
+    next_node = "clarify" if state["context"]["optimized"].needs_clarification else "assemble"
     logging.info(f"[Pipeline] Conditional transition after optimize: {next_node}")
     return next_node
 
 async def node_clarify(state: ContextState) -> Dict[str, Any]:
     logging.info("[Pipeline] Node: clarify - entry.")
     logging.debug(f"[Pipeline] State before clarify: {pprint.pformat(state)[:500]}")
-    answers = await clarify_requirements(state["context"].get("ambiguities", []))
+    optimized = state["context"]["optimized"]
+    answers = await clarify_requirements(optimized.ambiguities, state["context"]["requirements"])
     logging.debug(f"[Pipeline] Output from clarify: {pprint.pformat(answers)[:500]}")
     logging.info("[Pipeline] Node: clarify - exit.")
     # Remove ambiguities after clarification
-    new_context = {**state["context"], "clarifications": answers, "ambiguities": []}
+    new_context = {
+        **state["context"],
+        "clarifications": answers.clarifications,
+        "optimized": optimized.model_copy(update={"ambiguities": [], "needs_clarification": False}),
+    }
     return {"context": new_context}
 
 async def node_assemble(state: ContextState) -> Dict[str, Any]:
     logging.info("[Pipeline] Node: assemble - entry.")
     logging.debug(f"[Pipeline] State before assemble: {pprint.pformat(state)[:500]}")
-    flow = await assemble_flow(state["context"], state["context"])
+    flow = await assemble_flow(state["context"]["optimized"])
     logging.debug(f"[Pipeline] Output from assemble: {pprint.pformat(flow)[:500]}")
     logging.info("[Pipeline] Node: assemble - exit.")
     return {"context": {**state["context"], "flow_json": flow}}
@@ -130,25 +158,13 @@ pipeline = graph.compile()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await vector_store.initialize()
-    logging.info("Vector store initialized at startup.")
-    # Try to print 2 documents from the collection to verify data
-    try:
-        # Get up to 2 document ids (if any)
-        results = await vector_store._collection.get(limit=2)
-        docs = results.get("documents", [[]])[0]
-        ids = results.get("ids", [[]])[0]
-        logging.info(f"Sample Chroma DB docs: {docs}")
-        print(f"Sample Chroma DB docs: {docs}")
-        logging.info(f"Sample Chroma DB ids: {ids}")
-        print(f"Sample Chroma DB ids: {ids}")
-    except Exception as e:
-        logging.error(f"Could not fetch sample docs from Chroma DB: {e}")
-        print(f"Could not fetch sample docs from Chroma DB: {e}")
+    # Connect in the background so startup is not held up by Chroma retries
+    vector_store.start()
+    logging.info("Vector store connection started in the background.")
     yield
-    # (Optional) Add any shutdown/cleanup code here
+    await vector_store.stop()
 
-app = FastAPI(title="AI Architect Service", version="0.2.0", lifespan=lifespan)
+app = FastAPI(title="AI Architect Service", version="0.2.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -156,11 +172,48 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/brotli by Accept-Encoding; flow_json responses run to hundreds of kilobytes
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+# Static flows API (formerly the separate Flask server)
+app.include_router(flows_router)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: report dependency state; 503 until the vector store can serve queries."""
+    status = {"vector_store": vector_store.status()}
+    return JSONResponse(status_code=200 if vector_store.ready else 503, content=status)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-stage LLM latency and token counts, model routing windows, plus cache statistics."""
+    snapshot = metrics.snapshot()
+    snapshot["caches"] = {
+        "embeddings": vector_store.embedding_cache_stats(),
+        "results": vector_store.result_cache_stats(),
+        "prompt_fragments": prompt_fragments.stats(),
+        "edge_handles": handle_cache_stats(),
+        "clarifications": clarification_cache.stats(),
+    }
+    snapshot["models"] = model_router.stats()
+    return snapshot
+
+@app.get("/components/{name}/compatible")
+async def compatible_components(name: str):
+    """Components this one can feed (targets) and be fed by (sources), from the compatibility index."""
+    result = compatibility_index.compatible(name)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown component '{name}'")
+    return result
+
 @app.post("/design", response_model=DesignResponse)
-async def design_workflow(request: DesignRequest):
+async def design_workflow(request: DesignRequest, background_tasks: BackgroundTasks):
     logging.info("[API] /design endpoint called.")
     initial_state = {"messages": [], "context": {"prompt": request.prompt}}
     logging.debug(f"[API] Initial pipeline state: {pprint.pformat(initial_state)[:500]}")
@@ -168,8 +221,19 @@ async def design_workflow(request: DesignRequest):
         result_state = await pipeline.ainvoke(input=initial_state)
         logging.debug(f"[API] Final pipeline state: {pprint.pformat(result_state)[:500]}")
         flow = result_state["context"].get("flow_json", {})
+        if flow.get("nodes"):
+            # The plan produced a flow; keep it in the pattern library for similar requests,
+            # after the response is sent
+            background_tasks.add_task(record_plan, result_state["context"]["requirements"], result_state["context"]["plan"])
         logging.info("[API] /design endpoint completed successfully.")
-        return DesignResponse(flow_json=flow)
+        if request.expand:
+            expanded = flow_expander.expand_flow(flow)
+            return StreamingResponse(flow_expander.iter_json(expanded, wrap_key="flow_json"), media_type="application/json")
+        # The flow is plain JSON data already; skip re-validating it through DesignResponse
+        return FastJSONResponse({"flow_json": flow})
+    except VectorStoreUnavailable as e:
+        logging.error("[API] Design pipeline aborted, vector store unavailable: %s", e)
+        raise HTTPException(status_code=503, detail="Retrieval backend unavailable, try again shortly")
     except Exception as e:
         logging.error("[API] Design pipeline failed: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail="Design process error")
@@ -0,0 +1,72 @@
+"""
+memory/circuit_breaker.py
+
+Minimal circuit breaker used to fast-fail calls to a dependency during outages.
+"""
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    A successful trial closes the circuit again; a failed one re-opens it.
+    """
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go through right now."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self._state = CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, error: Exception = None):
+        if error is not None:
+            self.last_error = str(error)
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def trip(self, error: Exception = None):
+        """Open the circuit immediately, e.g. when the dependency is known to be down."""
+        self._failures = self.failure_threshold
+        self.record_failure(error)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "last_error": self.last_error,
+        }
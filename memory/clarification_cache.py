@@ -0,0 +1,256 @@
+"""
+memory/clarification_cache.py
+
+Answers to the pipeline's own ambiguity questions, so the clarifier only asks the
+model about questions it has not seen. The same generic questions ("Which embedding
+model should be used?", "What data source?") come up on almost every run.
+
+Lookups go exact normalized question -> local similarity match (Jaccard index of
+content words against cached questions, then against the per-domain defaults) -> unseen.
+The threshold is high on purpose: questions that share most words but differ in the
+distinctive one ("input format" / "output format") must not share an answer.
+Answers are kept in process and, when Redis is connected, in one Redis hash of
+normalized question -> answer shared by all workers, trimmed to the
+CLARIFICATION_CACHE_SIZE most recently written answers.
+"""
+import os
+import re
+import time
+import logging
+from difflib import SequenceMatcher
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from memory.lexical_index import tokenize
+
+CLARIFICATION_CACHE_SIZE = int(os.getenv("CLARIFICATION_CACHE_SIZE", "2048"))
+# Minimum similarity for a paraphrase to reuse an answer
+CLARIFICATION_MATCH_THRESHOLD = float(os.getenv("CLARIFICATION_MATCH_THRESHOLD", "0.8"))
+# difflib ratio above which two words count as the same word (typos, word forms)
+NEAR_DUPLICATE_RATIO = 0.85
+REDIS_HASH = os.getenv("CLARIFICATION_CACHE_KEY", "clarify:answers")
+# Seconds before retrying Redis after a failed connection
+REDIS_RETRY_SECONDS = float(os.getenv("CLARIFICATION_CACHE_REDIS_RETRY", "60"))
+
+# Words that carry no meaning in a clarification question
+_QUESTION_WORDS = frozenset(
+    "what which who whom whose when where why how should shall will would could can do does did "
+    "be been being we you i they there any kind type sort need needed required want wanted "
+    "used please specify provide".split()
+)
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+# Domain -> keywords in the request context that select it
+DOMAIN_KEYWORDS = {
+    "rag": ("rag", "retrieval", "document", "documents", "pdf", "knowledge base", "vector", "search", "question answering"),
+    "chatbot": ("chat", "chatbot", "assistant", "conversation", "support"),
+    "agent": ("agent", "agents", "tool", "tools", "autonomous"),
+}
+
+# Domain -> canonical question -> default answer; "general" applies to every domain
+DOMAIN_DEFAULTS = {
+    "general": {
+        "Which language model should be used?": "Use OpenAI gpt-4o-mini.",
+        "Which LLM provider should be used?": "Use OpenAI.",
+        "What should the temperature of the model be?": "Use a temperature of 0.2.",
+        "What is the expected output format?": "Plain text returned as a chat message.",
+        "How will users interact with the workflow?": "Through a chat input and chat output.",
+        "Are there any cost constraints?": "No specific cost constraints; prefer cost-effective defaults.",
+        "Are there any latency or performance requirements?": "No strict latency requirements.",
+    },
+    "rag": {
+        "Which embedding model should be used?": "Use OpenAI Embeddings (text-embedding-3-small).",
+        "Which vector store should be used?": "Use Chroma DB.",
+        "What data source will the documents come from?": "Files uploaded by the user (PDF or text).",
+        "What is the format of the documents?": "PDF and plain text files.",
+        "How should documents be split into chunks?": "Split text into chunks of 1000 characters with 200 characters of overlap.",
+        "How many documents should be retrieved per query?": "Retrieve the top 4 chunks.",
+    },
+    "chatbot": {
+        "Should the chatbot remember previous messages?": "Yes, keep the conversation history in chat memory.",
+        "What tone should the assistant use?": "Friendly and concise.",
+    },
+    "agent": {
+        "Which tools should the agent have access to?": "A web search tool and a calculator.",
+        "How many iterations may the agent run?": "At most 15 iterations.",
+    },
+}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return " ".join(_PUNCTUATION.sub(" ", question.lower()).split())
+
+
+def question_terms(question: str) -> FrozenSet[str]:
+    """Content words of a question, with a plural "s" stripped."""
+    terms = set()
+    for token in tokenize(question):
+        if len(token) < 2 or token in _QUESTION_WORDS:
+            continue
+        terms.add(token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token)
+    return frozenset(terms)
+
+
+def similarity(a_terms: FrozenSet[str], b_terms: FrozenSet[str]) -> float:
+    """
+    Paraphrase similarity of two questions: Jaccard index of their content words,
+    where a word also matches a near-identical one (difflib ratio of at least
+    NEAR_DUPLICATE_RATIO) on the other side. Every distinctive word has to match,
+    so a question with an extra or different content word scores low.
+    """
+    shared = a_terms & b_terms
+    matched = len(shared)
+    others = set(b_terms - shared)
+    for term in a_terms - shared:
+        twin = next((other for other in others
+                     if SequenceMatcher(None, term, other).ratio() >= NEAR_DUPLICATE_RATIO), None)
+        if twin is not None:
+            others.discard(twin)
+            matched += 1
+    union = len(a_terms) + len(b_terms) - matched
+    return matched / union if union else 0.0
+
+
+def detect_domains(context: Any) -> List[str]:
+    """
+    Domains whose keywords occur in the use case, tasks or tech stack of a context
+    dict or a RequirementContext.
+    """
+    if not context:
+        return []
+    if isinstance(context, dict):
+        get = context.get
+    else:
+        def get(key):
+            return getattr(context, key, None)
+    parts = [get("use_case") or "", get("prompt") or ""]
+    for key in ("key_tasks", "tech_stack"):
+        parts.extend(str(item) for item in get(key) or [])
+    text = " ".join(parts).lower()
+    return [domain for domain, keywords in DOMAIN_KEYWORDS.items()
+            if any(re.search(rf"\b{re.escape(k)}\b", text) for k in keywords)]
+
+
+class ClarificationCache:
+    """
+    Normalized question -> answer store with paraphrase matching and domain defaults.
+    """
+    def __init__(self, maxsize: int = CLARIFICATION_CACHE_SIZE, redis=None):
+        self.maxsize = maxsize
+        # normalized question -> (terms, answer), oldest first
+        self._answers: Dict[str, Tuple[FrozenSet[str], str]] = {}
+        self._defaults = {
+            domain: {normalize_question(q): (question_terms(q), answer) for q, answer in questions.items()}
+            for domain, questions in DOMAIN_DEFAULTS.items()
+        }
+        self._redis = redis
+        self._redis_loaded = False
+        self._redis_retry_at = 0.0
+        self.hits = 0
+        self.default_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _redis_backend():
+        """Shared Redis client, only when CLARIFICATION_CACHE_REDIS=1."""
+        if os.getenv("CLARIFICATION_CACHE_REDIS", "0") != "1":
+            return None
+        from memory.redis_client import redis_client
+        return redis_client
+
+    async def _load_redis(self):
+        """
+        Warm the local store from the Redis hash once per process. A failed connection
+        is retried after REDIS_RETRY_SECONDS.
+        """
+        if self._redis_loaded or time.monotonic() < self._redis_retry_at:
+            return
+        if self._redis is None:
+            self._redis = self._redis_backend()
+        if self._redis is None:
+            self._redis_loaded = True
+            return
+        if not self._redis.connected:
+            try:
+                await self._redis.connect()
+            except Exception as e:
+                self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+                logging.warning(f"[ClarifyCache] Running without Redis, retrying in {REDIS_RETRY_SECONDS:.0f}s: {e}")
+                return
+        self._redis_loaded = True
+        stored = await self._redis.get_hash(REDIS_HASH)
+        stored = {key: answer for key, answer in stored.items() if isinstance(answer, str)}
+        for key, answer in stored.items():
+            self._remember(key, answer)
+        logging.info(f"[ClarifyCache] Loaded {len(stored)} answers from Redis")
+
+    def _remember(self, key: str, answer: str):
+        self._answers.pop(key, None)
+        self._answers[key] = (question_terms(key), answer)
+        while len(self._answers) > self.maxsize:
+            self._answers.pop(next(iter(self._answers)))
+
+    def _best(self, terms: FrozenSet[str], entries: Dict[str, Tuple[FrozenSet[str], str]]) -> Tuple[float, Optional[str]]:
+        best_score, best_answer = 0.0, None
+        for other_terms, answer in entries.values():
+            score = similarity(terms, other_terms)
+            if score > best_score:
+                best_score, best_answer = score, answer
+        return best_score, best_answer
+
+    def match(self, question: str, domains: List[str] = ()) -> Optional[str]:
+        """Cached or default answer for a question or a paraphrase of it, or None."""
+        key = normalize_question(question)
+        entry = self._answers.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+        terms = question_terms(key)
+        score, answer = self._best(terms, self._answers)
+        if score >= CLARIFICATION_MATCH_THRESHOLD:
+            self.hits += 1
+            return answer
+        defaults: Dict[str, Tuple[FrozenSet[str], str]] = {}
+        for domain in ("general", *domains):
+            defaults.update(self._defaults.get(domain, {}))
+        score, answer = self._best(terms, defaults)
+        if score >= CLARIFICATION_MATCH_THRESHOLD:
+            self.default_hits += 1
+            return answer
+        self.misses += 1
+        return None
+
+    async def lookup(self, questions: List[str], domains: List[str] = ()) -> Tuple[Dict[str, str], List[str]]:
+        """Split questions into answered ones (question -> answer) and unseen ones."""
+        await self._load_redis()
+        answered: Dict[str, str] = {}
+        unseen: List[str] = []
+        for question in questions:
+            answer = self.match(question, domains)
+            if answer is None:
+                unseen.append(question)
+            else:
+                answered[question] = answer
+        return answered, unseen
+
+    async def store(self, answers: Dict[str, str]):
+        """Remember non-empty answers locally and in the Redis hash (capped at maxsize)."""
+        fields = {normalize_question(q): a for q, a in answers.items() if a and a.strip()}
+        for key, answer in fields.items():
+            self._remember(key, answer)
+        if fields and self._redis is not None and self._redis.connected:
+            await self._redis.set_hash_fields(REDIS_HASH, fields, max_fields=self.maxsize)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.default_hits + self.misses
+        return {
+            "size": len(self._answers),
+            "hits": self.hits,
+            "default_hits": self.default_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.default_hits) / lookups, 3) if lookups else None,
+        }
+
+
+# Singleton instance
+clarification_cache = ClarificationCache()
@@ -0,0 +1,77 @@
+"""
+memory/component_cards.py
+
+Precomputed component cards (name, display name, one-line description, output types,
+category) with a BM25 index over them, so a selector can shortlist candidates per
+step without sending full templates to the model.
+"""
+import os
+import re
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from memory.component_catalog import ComponentCatalog, component_catalog
+from memory.lexical_index import BM25Index, reciprocal_rank_fusion
+
+CARD_DESCRIPTION_CHARS = int(os.getenv("CARD_DESCRIPTION_CHARS", "140"))
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _one_line(text: str, limit: int = CARD_DESCRIPTION_CHARS) -> str:
+    """First sentence of a description, whitespace collapsed and capped at limit chars."""
+    text = " ".join((text or "").split())
+    text = _SENTENCE_END.split(text, maxsplit=1)[0]
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class ComponentCardIndex:
+    """
+    Cards for every catalog component, searchable by step description. Built lazily.
+    """
+    def __init__(self, catalog: ComponentCatalog = component_catalog):
+        self.catalog = catalog
+        self._cards: Optional[Dict[str, Dict[str, Any]]] = None
+        self._index = BM25Index()
+
+    def build(self):
+        if self._cards is not None:
+            return
+        cards = {}
+        for name in self.catalog.names():
+            template = self.catalog.get(name)
+            outputs = []
+            for out in template.get("outputs", []):
+                for output_type in out.get("types") or []:
+                    if output_type not in outputs:
+                        outputs.append(output_type)
+            card = {
+                "name": name,
+                "display_name": template.get("display_name", name),
+                "description": _one_line(template.get("description", "")),
+                "outputs": outputs,
+                "category": self.catalog.category(name),
+            }
+            cards[name] = card
+            self._index.add(name, " ".join([name, card["display_name"], card["description"], card["category"] or "", *outputs]))
+        self._cards = cards
+        logging.info(f"[Cards] Indexed {len(cards)} component cards")
+
+    def card(self, name: str) -> Optional[Dict[str, Any]]:
+        self.build()
+        return self._cards.get(name)
+
+    def shortlist(self, query: str, n_results: int = 8, related: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Best-matching cards for a step description. `related` is an optional ranking
+        of component names from another source (e.g. the components of the documentation
+        retrieved for the step), fused with the BM25 ranking.
+        """
+        self.build()
+        lexical = [name for name, _ in self._index.search(query, n_results=n_results * 2)]
+        related = [name for name in related if name in self._cards]
+        ranked = [name for name, _ in reciprocal_rank_fusion([lexical, related])] if related else lexical
+        return [self._cards[name] for name in ranked[:n_results]]
+
+
+# Singleton instance
+component_cards = ComponentCardIndex()
@@ -0,0 +1,256 @@
+"""
+memory/component_catalog.py
+
+In-memory catalog of Langflow component templates loaded from the
+component_categories/ JSON files (the same files the seeder puts into Chroma).
+
+When a compiled snapshot is present (see Scripts/build_catalog_snapshot.py) and still
+matches the source files, the catalog memory-maps it instead of parsing the JSON:
+only the index is read at startup, and each template is decoded on first access.
+The snapshot is keyed on a SHA-256 of the source files' names and contents; their
+size/mtime is only a fast path that skips hashing when nothing was touched.
+
+Snapshot layout:
+    SNAPSHOT_MAGIC | header length (uint32 LE) | header (JSON) | template blobs
+The header holds the content digest and the version (its first 16 hex digits), the
+blob codec ("msgpack", or "json" when msgpack is not installed), the size/mtime of
+every source file, and name -> [offset, length, category] for each template, offsets
+counted from the start of the blobs.
+"""
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+TEMPLATES_DIR = os.getenv(
+    "COMPONENT_TEMPLATES_DIR",
+    "component_categories"
+)
+SNAPSHOT_PATH = os.getenv(
+    "COMPONENT_CATALOG_SNAPSHOT",
+    "component_catalog.snapshot"
+)
+SNAPSHOT_MAGIC = b"LFCATv1\n"
+_HEADER_LENGTH = struct.Struct("<I")
+
+
+def _source_files(templates_dir: str) -> List[str]:
+    if not os.path.isdir(templates_dir):
+        return []
+    return sorted(f for f in os.listdir(templates_dir) if f.lower().endswith(".json"))
+
+
+def _source_stats(templates_dir: str) -> Dict[str, List[int]]:
+    """File name -> [size, mtime_ns] for every category file."""
+    stats = {}
+    for fname in _source_files(templates_dir):
+        st = os.stat(os.path.join(templates_dir, fname))
+        stats[fname] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def _hash_source(digest, fname: str, raw: bytes):
+    digest.update(fname.encode("utf-8") + b"\0" + raw)
+
+
+def _source_digest(templates_dir: str) -> str:
+    """SHA-256 of every category file's name and content, in file name order."""
+    digest = hashlib.sha256()
+    for fname in _source_files(templates_dir):
+        with open(os.path.join(templates_dir, fname), "rb") as f:
+            _hash_source(digest, fname, f.read())
+    return digest.hexdigest()
+
+
+def build_snapshot(templates_dir: str = TEMPLATES_DIR, path: str = SNAPSHOT_PATH) -> Dict[str, Any]:
+    """
+    Compile the category files into a snapshot at `path` and return its header
+    (without the index). The file is written to a temporary name and renamed into place.
+    """
+    codec = "msgpack" if msgpack is not None else "json"
+    digest = hashlib.sha256()
+    index: Dict[str, List[Any]] = {}
+    blobs: List[bytes] = []
+    offset = 0
+    for fname in _source_files(templates_dir):
+        with open(os.path.join(templates_dir, fname), "rb") as f:
+            raw = f.read()
+        _hash_source(digest, fname, raw)
+        category = os.path.splitext(fname)[0]
+        for name, template in json.loads(raw).items():
+            if codec == "msgpack":
+                blob = msgpack.packb(template, use_bin_type=True)
+            else:
+                blob = json.dumps(template, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if name in index:
+                # Later files win, as when loading the JSON directly
+                logging.warning(f"[Catalog] Component '{name}' defined again in {fname}")
+            index[name] = [offset, len(blob), category]
+            blobs.append(blob)
+            offset += len(blob)
+
+    header = {
+        "digest": digest.hexdigest(),
+        "version": digest.hexdigest()[:16],
+        "codec": codec,
+        "sources": _source_stats(templates_dir),
+        "index": index,
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+    logging.info(f"[Catalog] Wrote snapshot {path}: {len(index)} components, "
+                 f"{os.path.getsize(path)} bytes, version {header['version']} ({codec})")
+    return {key: value for key, value in header.items() if key != "index"}
+
+
+class ComponentCatalog:
+    """
+    Lazily loaded mapping of component name -> template, with its category.
+    """
+    def __init__(self, templates_dir: str = TEMPLATES_DIR, snapshot_path: Optional[str] = SNAPSHOT_PATH):
+        self.templates_dir = templates_dir
+        self.snapshot_path = snapshot_path
+        self.version: Optional[str] = None
+        # Decoded templates; with a snapshot, filled in on first access
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._categories: Dict[str, str] = {}
+        self._names: Optional[List[str]] = None
+        # Snapshot state: name -> (offset, length) into the mapped blobs
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._snapshot: Optional[mmap.mmap] = None
+        self._data_start = 0
+        self._codec = "json"
+
+    def load(self):
+        """Open the snapshot, or parse every category file; later calls are no-ops."""
+        if self._names is not None:
+            return
+        if not self._load_snapshot():
+            self._load_json()
+
+    def _load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if snapshot[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError("not a catalog snapshot")
+            start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+            (header_length,) = _HEADER_LENGTH.unpack(snapshot[len(SNAPSHOT_MAGIC):start])
+            header = json.loads(snapshot[start:start + header_length])
+        except (OSError, ValueError, struct.error) as e:
+            logging.warning(f"[Catalog] Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return False
+
+        if not self._snapshot_current(header):
+            logging.warning(f"[Catalog] Snapshot {self.snapshot_path} is stale; loading JSON files instead")
+            snapshot.close()
+            return False
+        if header["codec"] == "msgpack" and msgpack is None:
+            logging.warning("[Catalog] Snapshot needs msgpack, which is not installed; loading JSON files instead")
+            snapshot.close()
+            return False
+
+        self._snapshot = snapshot
+        self._data_start = start + header_length
+        self._codec = header["codec"]
+        self.version = header["version"]
+        for name, (offset, length, category) in header["index"].items():
+            self._offsets[name] = (offset, length)
+            self._categories[name] = category
+        self._names = list(header["index"])
+        logging.info(f"[Catalog] Mapped snapshot {self.snapshot_path}: {len(self._names)} components, version {self.version}")
+        return True
+
+    def _snapshot_current(self, header: Dict[str, Any]) -> bool:
+        """True if the snapshot was built from the current source files."""
+        if header.get("sources") == _source_stats(self.templates_dir):
+            return True
+        # Touched files (a fresh checkout, a copy) may still hold the same content
+        if header.get("digest") == _source_digest(self.templates_dir):
+            logging.debug(f"[Catalog] Source files of {self.snapshot_path} were touched but are unchanged")
+            return True
+        return False
+
+    def _load_json(self):
+        components: Dict[str, Dict[str, Any]] = {}
+        if not os.path.isdir(self.templates_dir):
+            logging.warning(f"[Catalog] Templates directory '{self.templates_dir}' not found")
+        else:
+            for fname in _source_files(self.templates_dir):
+                category = os.path.splitext(fname)[0]
+                try:
+                    with open(os.path.join(self.templates_dir, fname), encoding="utf-8") as f:
+                        templates = json.load(f)
+                except json.JSONDecodeError as e:
+                    logging.error(f"[Catalog] Error parsing JSON in {fname}: {e}")
+                    continue
+                for name, template in templates.items():
+                    components[name] = template
+                    self._categories[name] = category
+        self._components = components
+        self._names = list(components)
+        logging.info(f"[Catalog] Loaded {len(components)} component templates")
+
+    def _decode(self, name: str) -> Optional[Dict[str, Any]]:
+        location = self._offsets.get(name)
+        if location is None:
+            return None
+        offset, length = location
+        start = self._data_start + offset
+        blob = self._snapshot[start:start + length]
+        template = msgpack.unpackb(blob, raw=False) if self._codec == "msgpack" else json.loads(blob)
+        # setdefault keeps one shared object per component if two threads race here
+        return self._components.setdefault(name, template)
+
+    def names(self) -> List[str]:
+        self.load()
+        return list(self._names)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Full template for a component, or None if it is not in the catalog."""
+        self.load()
+        template = self._components.get(name)
+        if template is None and self._snapshot is not None:
+            template = self._decode(name)
+        return template
+
+    def category(self, name: str) -> Optional[str]:
+        self.load()
+        return self._categories.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        self.load()
+        return name in self._categories
+
+    def card(self, name: str) -> Optional[Dict[str, Any]]:
+        """Compact description of a component: name, display name, description and category."""
+        template = self.get(name)
+        if template is None:
+            return None
+        return {
+            "name": name,
+            "display_name": template.get("display_name", name),
+            "description": template.get("description", ""),
+            "category": self._categories.get(name),
+        }
+
+
+# Singleton instance
+component_catalog = ComponentCatalog()
@@ -0,0 +1,94 @@
+"""
+memory/embedding_cache.py
+
+LRU cache from normalized query text to embedding vector, sitting in front of
+the embedding function used for vector store queries. An optional Redis layer
+lets warm embeddings survive restarts and be shared across workers.
+"""
+import hashlib
+import logging
+import os
+from typing import Callable, Dict, List, Sequence
+
+from memory.cache import LRUCache
+from memory.threads import to_thread
+
+
+def normalize_query(text: str) -> str:
+    """
+    Collapse whitespace and lowercase a query.
+    The default MiniLM embedding model is uncased, so this does not change the vector.
+    """
+    return " ".join(text.split()).lower()
+
+
+class EmbeddingCache:
+    """
+    Caches query embeddings so repeated queries skip the embedding model entirely.
+
+    Lookups go in-process LRU -> Redis (when connected) -> embedding function,
+    and only the texts missing from both caches are embedded, in one batch.
+    """
+    def __init__(self,
+                 embed_fn: Callable[[List[str]], Sequence[Sequence[float]]],
+                 maxsize: int = None,
+                 redis=None,
+                 namespace: str = "default",
+                 redis_ttl: int = None):
+        self._embed_fn = embed_fn
+        self._cache = LRUCache(maxsize=maxsize or int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")))
+        self._redis = redis
+        self._namespace = namespace
+        self._redis_ttl = redis_ttl or int(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 3600)))
+        self.embedded = 0
+
+    def _redis_key(self, text: str) -> str:
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return f"emb:{self._namespace}:{digest}"
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return one embedding per input text, computing only the uncached ones."""
+        keys = [normalize_query(t) for t in texts]
+        vectors: Dict[str, List[float]] = {}
+        missing: List[str] = []
+        for key in keys:
+            if key in vectors or key in missing:
+                continue
+            vector = self._cache.get(key)
+            if vector is None:
+                missing.append(key)
+            else:
+                vectors[key] = vector
+
+        if missing and self._redis is not None and self._redis.connected:
+            still_missing = []
+            stored = await self._redis.get_values([self._redis_key(key) for key in missing])
+            for key, vector in zip(missing, stored):
+                if vector:
+                    vectors[key] = vector
+                    self._cache.set(key, vector)
+                else:
+                    still_missing.append(key)
+            missing = still_missing
+
+        if missing:
+            computed = await to_thread(self._embed_fn, missing)
+            self.embedded += len(missing)
+            for key, vector in zip(missing, computed):
+                vector = [float(x) for x in vector]
+                vectors[key] = vector
+                self._cache.set(key, vector)
+            if self._redis is not None and self._redis.connected:
+                await self._redis.set_values(
+                    {self._redis_key(key): vectors[key] for key in missing}, ttl=self._redis_ttl
+                )
+            logging.debug(f"[EmbeddingCache] Embedded {len(missing)} new queries; {self._cache.stats()}")
+
+        return [vectors[key] for key in keys]
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for the in-process layer plus how many texts were actually embedded."""
+        return {**self._cache.stats(), "embedded": self.embedded}
@@ -0,0 +1,95 @@
+"""
+memory/lexical_index.py
+
+In-process BM25 index and reciprocal rank fusion, used by the vector store to
+catch exact component names that pure embedding search tends to miss.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+_CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this to use using with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens. CamelCase identifiers also emit their parts,
+    so "OpenAIEmbeddings" matches both "openaiembeddings" and "embeddings".
+    """
+    tokens = []
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        if lowered not in _STOPWORDS:
+            tokens.append(lowered)
+        parts = _CAMEL.findall(word)
+        if len(parts) > 1:
+            tokens.extend(p.lower() for p in parts if p.lower() not in _STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index. Documents can be added incrementally.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._lengths
+
+    def add(self, doc_id: str, text: str):
+        if doc_id in self._lengths:
+            return
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings[term][doc_id] = tf
+        length = sum(counts.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+
+    def search(self,
+               query: str,
+               n_results: int = 10,
+               accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """Return up to n_results (doc_id, score) pairs, best first."""
+        if not self._lengths:
+            return []
+        n_docs = len(self._lengths)
+        avg_length = self._total_length / n_docs
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if accept is not None:
+            ranked = [item for item in ranked if accept(item[0])]
+        return ranked[:n_results]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse several ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    Returns (id, score) pairs, best first.
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,109 @@
+"""
+memory/prompt_fragments.py
+
+Cache of pre-serialized prompt fragments for component templates.
+
+Each template is reduced to its lean form (the component's Python source in the
+"code" field is dropped; it is large and tells the model nothing about wiring),
+encoded once as a ready-to-splice '"Name":{...}' JSON member, and cached per
+(component, corpus version). User messages are then assembled by concatenating
+fragments instead of re-encoding the same nested dicts on every request.
+"""
+import os
+import logging
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import fast_json
+from memory.cache import LRUCache
+from memory.component_catalog import ComponentCatalog, component_catalog
+
+PROMPT_FRAGMENT_CACHE_SIZE = int(os.getenv("PROMPT_FRAGMENT_CACHE_SIZE", "1024"))
+# Template fields left out of prompts
+LEAN_DROP_FIELDS = ("code",)
+
+
+class RawJSON(str):
+    """Already-encoded JSON text, spliced into messages as is."""
+
+
+def lean_template(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Shallow copy of a template without the fields in LEAN_DROP_FIELDS."""
+    fields = template.get("template")
+    if not isinstance(fields, dict) or not any(name in fields for name in LEAN_DROP_FIELDS):
+        return template
+    lean = dict(template)
+    lean["template"] = {name: field for name, field in fields.items() if name not in LEAN_DROP_FIELDS}
+    return lean
+
+
+def splice(fields: Dict[str, Any]) -> str:
+    """
+    Encode a JSON object whose RawJSON values are inserted verbatim and whose
+    other values are encoded normally.
+    """
+    members = []
+    for key, value in fields.items():
+        encoded = value if isinstance(value, RawJSON) else fast_json.dumps(value)
+        members.append(f"{fast_json.dumps(key)}:{encoded}")
+    return "{" + ",".join(members) + "}"
+
+
+class PromptFragments:
+    """
+    Lean template fragments keyed by (component, corpus version).
+    """
+    def __init__(self, catalog: ComponentCatalog = component_catalog, maxsize: int = PROMPT_FRAGMENT_CACHE_SIZE):
+        self.catalog = catalog
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def template(self, name: str, version: Optional[str] = None, document: Optional[str] = None) -> Optional[str]:
+        """
+        '"name":{lean template}' for a component, from the catalog or else from the
+        stored template document. None if neither has a parseable template.
+        """
+        key = (name, version)
+        fragment = self._cache.get(key)
+        if fragment is not None:
+            return fragment
+        template = self.catalog.get(name)
+        if template is None and document:
+            try:
+                template = fast_json.loads(document)
+            except ValueError:
+                logging.warning(f"[Fragments] Could not parse template for {name}")
+                return None
+        if not isinstance(template, dict):
+            return None
+        fragment = f"{fast_json.dumps(name)}:{fast_json.dumps(lean_template(template))}"
+        self._cache.set(key, fragment)
+        return fragment
+
+    def templates(self, entries: Iterable[Tuple[str, Optional[str]]], version: Optional[str] = None) -> RawJSON:
+        """
+        JSON object of lean templates for (name, document) pairs, each component once,
+        built by joining cached fragments. Members are sorted by component name so the
+        same set of components always encodes to the same text, whatever order retrieval
+        returned them in (provider prompt caches match on exact prefixes).
+        """
+        documents: Dict[str, Optional[str]] = {}
+        for name, document in entries:
+            if name and (name not in documents or documents[name] is None):
+                documents[name] = document
+        fragments = []
+        for name in sorted(documents):
+            fragment = self.template(name, version, documents[name])
+            if fragment is not None:
+                fragments.append(fragment)
+        return RawJSON("{" + ",".join(fragments) + "}")
+
+    @staticmethod
+    def entries(template_results: Iterable[Dict[str, Any]]) -> Iterable[Tuple[str, Optional[str]]]:
+        """(component, document) pairs from vector store template results."""
+        return ((entry["metadata"].get("component"), entry.get("document")) for entry in template_results)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+# Singleton instance
+prompt_fragments = PromptFragments()
@@ -1,90 +1,310 @@
 """
 app/memory/redis_client.py
 
-Asynchronous Redis client for short-term memory (session state) management.
-Provides methods to connect/disconnect and to set/get/clear session contexts with TTL.
+Asynchronous Redis client for short-term memory (session state) and the shared caches,
+built on redis.asyncio with one connection pool per process.
+
+Values are msgpack-encoded (JSON when msgpack is not installed) and zlib-compressed
+above REDIS_COMPRESS_MIN_BYTES; a one-byte codec marker in front of each value says
+which, so the settings can change without invalidating stored data. Multi-key reads
+use MGET and multi-key writes a non-transactional pipeline, one round trip each.
+Sessions are hashes with one field per top-level context key, so updating part of a
+context only rewrites the fields that changed. They live under "session:h:<id>", apart
+from the "session:<id>" JSON strings of the previous client, which expire on their own.
 """
 import os
 import json
+import time
+import zlib
 import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency
+    aioredis = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+# Seconds a command waits for a free pooled connection before failing
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+# Values at least this large (encoded) are compressed
+REDIS_COMPRESS_MIN_BYTES = int(os.getenv("REDIS_COMPRESS_MIN_BYTES", "512"))
+REDIS_COMPRESS_LEVEL = int(os.getenv("REDIS_COMPRESS_LEVEL", "3"))
+
+# Codec markers: first byte of every stored value. Control bytes never start the
+# plain JSON/text values written by the previous client, which decode as misses.
+_MSGPACK = b"\x01"
+_MSGPACK_ZLIB = b"\x02"
+_JSON = b"\x03"
+_JSON_ZLIB = b"\x04"
+
+
+def encode_value(value: Any) -> bytes:
+    """Codec marker + msgpack (or JSON) encoding of a value, compressed when large."""
+    if msgpack is not None:
+        body, marker, compressed = msgpack.packb(value, use_bin_type=True), _MSGPACK, _MSGPACK_ZLIB
+    else:
+        body, marker, compressed = json.dumps(value, separators=(",", ":")).encode("utf-8"), _JSON, _JSON_ZLIB
+    if len(body) >= REDIS_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(body, REDIS_COMPRESS_LEVEL)
+        if len(packed) < len(body):
+            return compressed + packed
+    return marker + body
+
 
-import aioredis
+def decode_value(raw: Optional[bytes]) -> Any:
+    """Value stored by encode_value; None for missing or unreadable values."""
+    if not raw:
+        return None
+    marker, body = raw[:1], raw[1:]
+    try:
+        if marker in (_MSGPACK_ZLIB, _JSON_ZLIB):
+            body = zlib.decompress(body)
+        if marker in (_MSGPACK, _MSGPACK_ZLIB):
+            if msgpack is None:
+                logging.warning("[Redis] Value is msgpack-encoded but msgpack is not installed")
+                return None
+            return msgpack.unpackb(body, raw=False)
+        if marker in (_JSON, _JSON_ZLIB):
+            return json.loads(body)
+    except Exception as e:
+        logging.warning(f"[Redis] Ignoring unreadable value: {e}")
+        return None
+    logging.debug("[Redis] Ignoring value with unknown encoding")
+    return None
 
 
 class RedisClient:
     """
-    Wrapper around aioredis for session-based context storage.
+    Pooled redis.asyncio client for session-based context storage and shared caches.
     """
     def __init__(self):
         # Read Redis connection URL from environment, default to localhost
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        self.max_connections = REDIS_MAX_CONNECTIONS
+        self._pool = None
         self._redis = None
         # Default TTL for session context in seconds (1 hour)
         self.default_ttl = int(os.getenv("REDIS_SESSION_TTL", 3600))
 
     async def connect(self):
-        """Establish connection to Redis."""
-        if self._redis is None:
-            try:
-                self._redis = await aioredis.from_url(
-                    self.redis_url,
-                    decode_responses=True,
-                )
-                logging.info(f"Connected to Redis at {self.redis_url}")
-            except Exception as e:
-                logging.error(f"Failed to connect to Redis: {e}")
-                raise
+        """Create the connection pool and check that Redis answers."""
+        if self._redis is not None:
+            return
+        if aioredis is None:
+            raise RuntimeError("The redis package is not installed")
+        # Blocking pool: concurrent requests queue for a connection instead of failing
+        pool = aioredis.BlockingConnectionPool.from_url(
+            self.redis_url,
+            max_connections=self.max_connections,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30,
+        )
+        client = aioredis.Redis(connection_pool=pool)
+        try:
+            await client.ping()
+        except Exception as e:
+            logging.error(f"Failed to connect to Redis: {e}")
+            await pool.disconnect()
+            raise
+        self._pool, self._redis = pool, client
+        logging.info(f"Connected to Redis at {self.redis_url} (pool of {self.max_connections})")
 
     async def disconnect(self):
-        """Close the Redis connection."""
+        """Close the client and every pooled connection."""
         if self._redis:
             try:
-                await self._redis.close()
+                await self._redis.aclose()
+                await self._pool.disconnect()
                 logging.info("Redis connection closed.")
             except Exception as e:
                 logging.warning(f"Error closing Redis connection: {e}")
             finally:
                 self._redis = None
+                self._pool = None
+
+    @property
+    def connected(self) -> bool:
+        """True once connect() has succeeded."""
+        return self._redis is not None
+
+    async def get_value(self, key: str) -> Any:
+        """
+        Fetch the value stored under key.
+        Returns None if missing, not connected, or on error.
+        """
+        if self._redis is None:
+            return None
+        try:
+            return decode_value(await self._redis.get(key))
+        except Exception as e:
+            logging.warning(f"Error reading {key} from Redis: {e}")
+            return None
+
+    async def get_values(self, keys: List[str]) -> List[Any]:
+        """
+        Fetch the values stored under several keys in one MGET, None for each missing
+        key. All None if not connected or on error.
+        """
+        if self._redis is None or not keys:
+            return [None] * len(keys)
+        try:
+            return [decode_value(raw) for raw in await self._redis.mget(keys)]
+        except Exception as e:
+            logging.warning(f"Error reading {len(keys)} keys from Redis: {e}")
+            return [None] * len(keys)
+
+    async def set_value(self, key: str, value: Any, ttl: int = None):
+        """
+        Store a value under key, with an optional TTL in seconds.
+        Failures are logged and ignored since callers treat Redis as a cache.
+        """
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(key, encode_value(value), ex=ttl)
+        except Exception as e:
+            logging.warning(f"Error writing {key} to Redis: {e}")
+
+    async def set_values(self, items: Dict[str, Any], ttl: int = None):
+        """
+        Store several key -> value pairs in one pipelined round trip, each with the TTL.
+        Failures are logged and ignored since callers treat Redis as a cache.
+        """
+        if self._redis is None or not items:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(key, encode_value(value), ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Error writing {len(items)} keys to Redis: {e}")
+
+    async def get_hash(self, key: str, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Fetch the fields of the hash stored under key (all of them, or only `fields`,
+        leaving out missing ones). Returns {} if missing, not connected, or on error.
+        """
+        if self._redis is None:
+            return {}
+        try:
+            if fields is None:
+                stored = await self._redis.hgetall(key) or {}
+                return {name.decode("utf-8"): decode_value(raw) for name, raw in stored.items()}
+            fields = list(fields)
+            if not fields:
+                return {}
+            values = await self._redis.hmget(key, fields)
+            return {name: decode_value(raw) for name, raw in zip(fields, values) if raw is not None}
+        except Exception as e:
+            logging.warning(f"Error reading hash {key} from Redis: {e}")
+            return {}
+
+    async def set_hash_fields(self, key: str, fields: Dict[str, Any], ttl: int = None, max_fields: int = None):
+        """
+        Set fields of the hash stored under key, refreshing its TTL when given. With
+        max_fields, the write time of each field is kept in the sorted set "<key>:order"
+        and the least recently written fields beyond max_fields are deleted.
+        Failures are logged and ignored since callers treat Redis as a cache.
+        """
+        if self._redis is None or not fields:
+            return
+        try:
+            if not max_fields:
+                await self._write_hash(key, fields, ttl)
+                return
+            order_key = f"{key}:order"
+            now = time.time()
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping={name: encode_value(value) for name, value in fields.items()})
+                pipe.zadd(order_key, {name: now for name in fields})
+                if ttl:
+                    pipe.expire(key, ttl)
+                    pipe.expire(order_key, ttl)
+                pipe.zcard(order_key)
+                overflow = (await pipe.execute())[-1] - max_fields
+            if overflow > 0:
+                oldest = [name for name, _ in await self._redis.zpopmin(order_key, overflow)]
+                if oldest:
+                    await self._redis.hdel(key, *oldest)
+                    logging.debug(f"Trimmed {len(oldest)} fields from hash {key} (cap {max_fields})")
+        except Exception as e:
+            logging.warning(f"Error writing hash {key} to Redis: {e}")
+
+    async def _write_hash(self, key: str, fields: Dict[str, Any], ttl: Optional[int], replace: bool = False,
+                          remove: Iterable[str] = ()):
+        """HSET the encoded fields (after DEL when replacing, HDEL of `remove`) and EXPIRE in one pipeline."""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            if replace:
+                pipe.delete(key)
+            remove = list(remove)
+            if remove:
+                pipe.hdel(key, *remove)
+            if fields:
+                pipe.hset(key, mapping={name: encode_value(value) for name, value in fields.items()})
+            if ttl:
+                pipe.expire(key, ttl)
+            await pipe.execute()
+
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"session:h:{session_id}"
 
     async def set_session_context(self, session_id: str, context: dict, ttl: int = None):
         """
-        Store the serialized context dict for a given session_id with TTL.
+        Replace the stored context for a given session_id, one hash field per key, with TTL.
         :param session_id: Unique identifier for the session.
         :param context: Dictionary representing the session state.
         :param ttl: Time-to-live in seconds; defaults to self.default_ttl.
         """
         if self._redis is None:
             raise RuntimeError("Redis connection is not established.")
-        key = f"session:{session_id}"
-        data = json.dumps(context)
+        key = self._session_key(session_id)
         expire = ttl or self.default_ttl
         try:
-            await self._redis.set(key, data, ex=expire)
+            await self._write_hash(key, context, expire, replace=True)
             logging.debug(f"Set context for {key} with TTL={expire}s")
         except Exception as e:
             logging.error(f"Error setting session context for {session_id}: {e}")
             raise
 
-    async def get_session_context(self, session_id: str) -> dict:
+    async def update_session_context(self, session_id: str, updates: dict, ttl: int = None,
+                                     remove: Iterable[str] = ()):
         """
-        Retrieve and deserialize the context for a given session_id.
-        Returns {} if not found or on error.
+        Write only the given top-level keys of a session's context (and delete the keys
+        in `remove`), refreshing its TTL. The rest of the stored context is untouched.
         """
         if self._redis is None:
             raise RuntimeError("Redis connection is not established.")
-        key = f"session:{session_id}"
+        key = self._session_key(session_id)
+        expire = ttl or self.default_ttl
         try:
-            raw = await self._redis.get(key)
-            if raw:
-                context = json.loads(raw)
-                logging.debug(f"Retrieved context for {key}")
-                return context
-            else:
-                logging.debug(f"No context found for {key}, returning empty dict.")
-                return {}
+            await self._write_hash(key, updates, expire, remove=remove)
+            logging.debug(f"Updated {len(updates)} context fields for {key}")
         except Exception as e:
-            logging.error(f"Error retrieving session context for {session_id}: {e}")
-            return {}
+            logging.error(f"Error updating session context for {session_id}: {e}")
+            raise
+
+    async def get_session_context(self, session_id: str, keys: Optional[Iterable[str]] = None) -> dict:
+        """
+        Retrieve the context for a given session_id, or only the given top-level keys.
+        Returns {} if not found or on error.
+        """
+        if self._redis is None:
+            raise RuntimeError("Redis connection is not established.")
+        key = self._session_key(session_id)
+        context = await self.get_hash(key, keys)
+        logging.debug(f"Retrieved {len(context)} context fields for {key}")
+        return context
 
     async def clear_session_context(self, session_id: str):
         """
@@ -92,7 +312,7 @@ class RedisClient:
         """
         if self._redis is None:
             raise RuntimeError("Redis connection is not established.")
-        key = f"session:{session_id}"
+        key = self._session_key(session_id)
         try:
             await self._redis.delete(key)
             logging.debug(f"Cleared context for {key}")
@@ -0,0 +1,17 @@
+"""
+memory/threads.py
+
+Run blocking calls (Chroma, embedding functions) in the default thread pool without
+blocking the event loop. Same as asyncio.to_thread, which needs Python 3.9.
+"""
+import asyncio
+import contextvars
+import functools
+from typing import Any, Callable
+
+
+async def to_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await func(*args, **kwargs) run in the loop's default executor, with the current context."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(None, call)
@@ -6,13 +6,30 @@ memory/vector_store.py
 Chroma DB–based vector store with async support and metadata filtering.
 """
 import os
+import json
+import math
+import time
+import hashlib
 import logging
 import asyncio
-from typing import List, Dict, Any, Optional
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Sequence
 
 import chromadb
 from chromadb.config import Settings
 from chromadb import HttpClient
+from chromadb.utils import embedding_functions
+
+from memory.cache import LRUCache
+from memory.circuit_breaker import CircuitBreaker, OPEN
+from memory.embedding_cache import EmbeddingCache, normalize_query
+from memory.component_catalog import component_catalog
+from memory.lexical_index import BM25Index, reciprocal_rank_fusion
+from memory.threads import to_thread
+
+class VectorStoreUnavailable(RuntimeError):
+    """Raised when a query cannot be served: not connected yet, or the circuit is open."""
+
 
 class VectorStore:
     """
@@ -25,9 +42,90 @@ class VectorStore:
         self.collection_name = os.getenv("CHROMA_COLLECTION", "architect-docs")
         self._client: Optional[HttpClient] = None
         self._collection = None
+        # Same model Chroma uses by default; queries go through the cache in front of it
+        self._embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self._query_embeddings = EmbeddingCache(
+            self._embedding_function,
+            redis=self._redis_backend(),
+            namespace=self.collection_name,
+        )
+        # Hybrid retrieval: BM25 over the same corpus, fused with vector hits by RRF
+        self.hybrid_search = os.getenv("HYBRID_SEARCH", "1") == "1"
+        self.hybrid_candidates = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "3"))
+        self.rrf_k = int(os.getenv("RRF_K", "60"))
+        self._lexical: Optional[BM25Index] = None
+        self._lexical_entries: Dict[str, tuple] = {}
+        self._lexical_lock: Optional[asyncio.Lock] = None
+        # Formatted query results, keyed on the query signature plus the seeded corpus version
+        self.meta_collection_name = f"{self.collection_name}-meta"
+        self._results = LRUCache(
+            maxsize=int(os.getenv("RESULT_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("RESULT_CACHE_TTL", "3600")),
+        )
+        self._results_redis = self._redis_backend()
+        self.corpus_version_check_interval = float(os.getenv("CORPUS_VERSION_CHECK_INTERVAL", "30"))
+        self._corpus_version: Optional[str] = None
+        self._corpus_version_checked_at = 0.0
+        # Connection management: background connect with backoff, fast-fail during outages
+        self._breaker = CircuitBreaker(
+            "chroma",
+            failure_threshold=int(os.getenv("CHROMA_BREAKER_THRESHOLD", "3")),
+            reset_timeout=float(os.getenv("CHROMA_BREAKER_RESET", "10")),
+        )
+        self.reconnect_max_delay = float(os.getenv("CHROMA_RECONNECT_MAX_DELAY", "30"))
+        self._connect_task: Optional[asyncio.Task] = None
+        # Pattern library: successful plans, capped and evicted by decayed use count
+        self.patterns_collection_name = f"{self.collection_name}-patterns"
+        self._patterns = None
+        self.pattern_store_size = int(os.getenv("PATTERN_STORE_SIZE", "500"))
+        self.pattern_half_life = float(os.getenv("PATTERN_HALF_LIFE_DAYS", "14")) * 86400
+
+    @staticmethod
+    def _redis_backend():
+        """Redis client backing the query caches, only when EMBEDDING_CACHE_REDIS=1."""
+        if os.getenv("EMBEDDING_CACHE_REDIS", "0") != "1":
+            return None
+        from memory.redis_client import redis_client
+        return redis_client
+
+    async def _connect_redis(self):
+        redis = self._redis_backend()
+        if redis is not None and not redis.connected:
+            try:
+                await redis.connect()
+            except Exception as e:
+                logging.warning(f"Query caches will run without Redis: {e}")
+
+    def _connect(self):
+        """Create the client and collection. Blocking; run it off the event loop."""
+        client = HttpClient(
+            host=self.host,
+            port=self.port,
+            settings=Settings(
+                chroma_client_auth_provider="token",
+                chroma_client_auth_credentials=os.getenv("CHROMA_TOKEN", "")
+            )
+        )
+        # Use get_or_create_collection to avoid duplicate collections
+        self._collection = client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self._embedding_function
+        )
+        self._patterns = client.get_or_create_collection(
+            name=self.patterns_collection_name,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=self._embedding_function
+        )
+        self._client = client
+        self._breaker.record_success()
 
     async def initialize(self):
-        """Initialize client and collection using get_or_create_collection."""
+        """
+        Connect to Chroma, waiting for the connection (used by scripts such as the seeder).
+        Services should call start() instead so startup does not block.
+        """
+        await self._connect_redis()
         tries = 0
         max_tries = 5
         retry_delay = 3  # seconds
@@ -35,32 +133,94 @@ class VectorStore:
         while tries < max_tries:
             try:
                 logging.info(f"Attempting to connect to ChromaDB at {self.host}:{self.port} (attempt {tries+1}/{max_tries})")
-                self._client = HttpClient(
-                    host=self.host,
-                    port=self.port,
-                    settings=Settings(
-                        chroma_client_auth_provider="token",
-                        chroma_client_auth_credentials=os.getenv("CHROMA_TOKEN", "")
-                    )
-                )
-                # Use get_or_create_collection to avoid duplicate collections
-                self._collection = self._client.get_or_create_collection(
-                    name=self.collection_name,
-                    metadata={"hnsw:space": "cosine"}
-                )
+                await to_thread(self._connect)
                 logging.info(f"Successfully connected to Chroma server at {self.host}:{self.port}")
                 break
             except Exception as e:
                 tries += 1
+                self._breaker.last_error = str(e)
                 if tries < max_tries:
                     logging.warning(f"ChromaDB connection attempt {tries}/{max_tries} failed: {e}")
                     await asyncio.sleep(retry_delay)
                 else:
                     logging.error(f"All {max_tries} attempts to connect to ChromaDB failed: {e}")
-                    # Initialize with empty collection to prevent app crash
                     self._collection = None
-                    # Don't raise exception, let the app continue with limited functionality
-                    logging.warning("Application will start without ChromaDB functionality")
+                    logging.warning("Vector store is unavailable; queries will fail fast")
+
+    def start(self):
+        """Begin connecting in the background and return immediately."""
+        if self._connect_task is None or self._connect_task.done():
+            self._connect_task = asyncio.create_task(self._connect_in_background())
+
+    async def stop(self):
+        """Cancel any in-flight background connection attempt."""
+        if self._connect_task is not None and not self._connect_task.done():
+            self._connect_task.cancel()
+            try:
+                await self._connect_task
+            except asyncio.CancelledError:
+                pass
+        self._connect_task = None
+
+    async def _connect_in_background(self):
+        """Retry the connection with exponential backoff until it succeeds."""
+        await self._connect_redis()
+        delay = 1.0
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await to_thread(self._connect)
+                logging.info(f"Connected to Chroma server at {self.host}:{self.port} (attempt {attempt})")
+                return
+            except Exception as e:
+                self._breaker.last_error = str(e)
+                logging.warning(f"ChromaDB connection attempt {attempt} failed: {e}; retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+
+    @property
+    def ready(self) -> bool:
+        """True when connected and the circuit is not open."""
+        return self._collection is not None and self._breaker.state != OPEN
+
+    def status(self) -> Dict[str, Any]:
+        """Dependency state for readiness checks."""
+        if self._collection is not None:
+            state = "connected"
+        elif self._connect_task is not None and not self._connect_task.done():
+            state = "connecting"
+        else:
+            state = "disconnected"
+        redis = self._redis_backend()
+        return {
+            "ready": self.ready,
+            "state": state,
+            "host": f"{self.host}:{self.port}",
+            "collection": self.collection_name,
+            "circuit": self._breaker.snapshot(),
+            "redis": None if redis is None else {"connected": redis.connected},
+            "corpus_version": self._corpus_version,
+        }
+
+    def _guard(self):
+        """Fast-fail instead of sending a query Chroma cannot answer."""
+        if self._collection is None:
+            raise VectorStoreUnavailable(f"Vector store is not connected ({self._breaker.last_error or 'connecting'})")
+        if not self._breaker.allow():
+            raise VectorStoreUnavailable(f"Vector store circuit is open ({self._breaker.last_error})")
+
+    def _record_failure(self, error: Exception):
+        """Count a failed call; once the circuit opens, drop the handle and reconnect in the background."""
+        self._breaker.record_failure(error)
+        if self._breaker.state == OPEN:
+            logging.error(f"Vector store circuit opened after repeated failures: {error}")
+            self._collection = None
+            try:
+                self.start()
+            except RuntimeError:
+                # No running event loop (e.g. called from a script); the next start() reconnects
+                pass
 
     async def add_doc_chunk(self,
                             chunk_id: str,
@@ -83,13 +243,126 @@ class VectorStore:
                 documents=[document],
                 metadatas=[meta]
             )
+            if self._lexical is not None:
+                self._index_lexical(chunk_id, document, meta)
+            self._results.clear()
         except Exception as e:
             logging.error(f"Doc chunk add failed: {e}")
             raise
 
+    async def set_corpus_version(self, version: str):
+        """
+        Publish the corpus version after (re)seeding. Every process watching the
+        collection drops its cached results once it sees the new version.
+        """
+        meta = self._client.get_or_create_collection(name=self.meta_collection_name)
+        meta.modify(metadata={"corpus_version": version})
+        self._set_local_corpus_version(version)
+        logging.info(f"Published corpus version {version}")
+
+    def _set_local_corpus_version(self, version: Optional[str]):
+        if version != self._corpus_version:
+            if self._corpus_version is not None:
+                logging.info(f"Corpus version changed {self._corpus_version} -> {version}; invalidating caches")
+            self._corpus_version = version
+            self._results.clear()
+            self._lexical = None
+            self._lexical_entries = {}
+        self._corpus_version_checked_at = time.monotonic()
+
+    def corpus_version(self) -> Optional[str]:
+        """Corpus version as of the last refresh_corpus_version (no Chroma call)."""
+        return self._corpus_version
+
+    async def refresh_corpus_version(self) -> Optional[str]:
+        """Current corpus version, re-read from Chroma at most every CORPUS_VERSION_CHECK_INTERVAL seconds."""
+        if self._collection is None:
+            return self._corpus_version
+        if time.monotonic() - self._corpus_version_checked_at >= self.corpus_version_check_interval:
+            # Marked checked up front so concurrent requests do not all re-read it
+            self._corpus_version_checked_at = time.monotonic()
+            try:
+                version = await to_thread(self._read_corpus_version)
+                self._set_local_corpus_version(version)
+            except Exception as e:
+                logging.warning(f"Could not read corpus version: {e}")
+        return self._corpus_version
+
+    def _read_corpus_version(self) -> Optional[str]:
+        meta = self._client.get_or_create_collection(name=self.meta_collection_name)
+        return (meta.metadata or {}).get("corpus_version")
+
+    def _result_key(self, kind: str, query: str, n_results: int, where: Optional[Dict[str, Any]]) -> str:
+        signature = json.dumps(
+            [kind, normalize_query(query), n_results, where, self.hybrid_search, self._corpus_version],
+            sort_keys=True
+        )
+        return hashlib.sha1(signature.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _freeze(results: List[Dict[str, Any]]) -> Sequence[MappingProxyType]:
+        """Read-only view of formatted results, safe to hand to every caller from the cache."""
+        return tuple(
+            MappingProxyType({**entry, "metadata": MappingProxyType(dict(entry["metadata"] or {}))})
+            for entry in results
+        )
+
+    async def _cached_results(self, key: str) -> Optional[Sequence[MappingProxyType]]:
+        cached = self._results.get(key)
+        if cached is None and self._results_redis is not None and self._results_redis.connected:
+            stored = await self._results_redis.get_value(f"vsq:{self.collection_name}:{key}")
+            if stored is not None:
+                cached = self._freeze(stored)
+                self._results.set(key, cached)
+        return cached
+
+    async def _cache_results(self, key: str, results: List[Dict[str, Any]]) -> Sequence[MappingProxyType]:
+        frozen = self._freeze(results)
+        self._results.set(key, frozen)
+        if self._results_redis is not None and self._results_redis.connected:
+            await self._results_redis.set_value(
+                f"vsq:{self.collection_name}:{key}", results, ttl=int(self._results.ttl)
+            )
+        return frozen
+
+    async def _query_many(self,
+                          queries: List[str],
+                          n_results: int,
+                          content_type: Optional[str]) -> List[Sequence[MappingProxyType]]:
+        """Serve each query from the result cache, sending only the misses to Chroma in one call."""
+        where_filter = None
+        if content_type:
+            where_filter = {"content_type": content_type}
+        await self.refresh_corpus_version()
+        keys = [self._result_key("docs", query, n_results, where_filter) for query in queries]
+        results: List[Optional[Sequence[MappingProxyType]]] = [await self._cached_results(key) for key in keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            self._guard()
+            embeddings = await self._query_embeddings.embed([queries[i] for i in missing])
+            try:
+                raw = await to_thread(
+                    self._collection.query,
+                    query_embeddings=embeddings,
+                    n_results=self._candidate_count(n_results),
+                    where=where_filter
+                )
+                self._breaker.record_success()
+            except Exception as e:
+                self._record_failure(e)
+                raise VectorStoreUnavailable(f"Vector store query failed: {e}") from e
+            for j, i in enumerate(missing):
+                fused = await self._fuse(queries[i], self._format_results(raw, j), n_results, content_type)
+                results[i] = await self._cache_results(keys[i], fused)
+        return results
+
     async def query_docs(self, query: str, n_results: int = 5, content_type: Optional[str] = None):
         """
         Query the vector store for documentation chunks similar to the query string.
+        With hybrid search on (HYBRID_SEARCH=1, the default) vector hits are fused with
+        BM25 hits, so exact component names rank well even at small n_results.
+        Results are cached per corpus version and returned as read-only mappings.
+        Raises VectorStoreUnavailable when the store is down and the result is not cached.
         
         Args:
             query: The search query text
@@ -97,21 +370,39 @@ class VectorStore:
             content_type: Optional filter for "documentation" or "template" content types
         """
         try:
-            # Build where clause if content_type is specified
-            where_filter = None
-            if content_type:
-                where_filter = {"content_type": content_type}
-            
-            results = self._collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where=where_filter
-            )
-            return self._format_results(results)
+            return (await self._query_many([query], n_results, content_type))[0]
+        except VectorStoreUnavailable:
+            raise
         except Exception as e:
             logging.error(f"Doc chunk query failed: {e}")
             return []
             
+    async def query_docs_batch(self,
+                               queries: List[str],
+                               n_results: int = 5,
+                               content_type: Optional[str] = None) -> List[Sequence[MappingProxyType]]:
+        """
+        Query the vector store for several query strings in a single Chroma round trip.
+        Queries already in the result cache are not sent at all.
+
+        Args:
+            queries: The search query texts
+            n_results: Maximum number of results to return per query
+            content_type: Optional filter for "documentation" or "template" content types
+
+        Returns:
+            One result list per query, in the same order as `queries`.
+        """
+        if not queries:
+            return []
+        try:
+            return await self._query_many(queries, n_results, content_type)
+        except VectorStoreUnavailable:
+            raise
+        except Exception as e:
+            logging.error(f"Batched doc chunk query failed: {e}")
+            return [[] for _ in queries]
+
     async def query_templates(self, component_name: Optional[str] = None, n_results: int = 5):
         """
         Query specifically for component templates.
@@ -125,29 +416,336 @@ class VectorStore:
             where_filter = {"content_type": "template"}
             if component_name:
                 where_filter["component"] = component_name
-                
-            results = self._collection.query(
-                query_texts=["component template"],
-                n_results=n_results,
-                where=where_filter
-            )
-            return self._format_results(results)
+
+            await self.refresh_corpus_version()
+            key = self._result_key("templates", "component template", n_results, where_filter)
+            cached = await self._cached_results(key)
+            if cached is not None:
+                return cached
+
+            self._guard()
+            embeddings = await self._query_embeddings.embed(["component template"])
+            try:
+                results = await to_thread(
+                    self._collection.query,
+                    query_embeddings=embeddings,
+                    n_results=n_results,
+                    where=where_filter
+                )
+                self._breaker.record_success()
+            except Exception as e:
+                self._record_failure(e)
+                raise VectorStoreUnavailable(f"Vector store query failed: {e}") from e
+            return await self._cache_results(key, self._format_results(results))
+        except VectorStoreUnavailable:
+            raise
         except Exception as e:
             logging.error(f"Template query failed: {e}")
             return []
 
-    def _format_results(self, results):
-        # Chroma returns lists of lists for each field
+    def _candidate_count(self, n_results: int) -> int:
+        """Vector hits to fetch per query; hybrid mode over-fetches so fusion has candidates to rerank."""
+        return n_results * self.hybrid_candidates if self.hybrid_search else n_results
+
+    def _index_lexical(self, chunk_id: str, document: str, metadata: Dict[str, Any]):
+        """Add one chunk to the BM25 index."""
+        self._lexical.add(chunk_id, self._lexical_text(document, metadata))
+        self._lexical_entries[chunk_id] = (document, metadata)
+
+    @staticmethod
+    def _lexical_text(document: str, metadata: Dict[str, Any]) -> str:
+        """Text a chunk is indexed by. Templates are indexed by their component card only."""
+        if metadata.get("content_type") == "template":
+            name = metadata.get("component", "")
+            card = component_catalog.card(name)
+            if card is None:
+                try:
+                    template = json.loads(document)
+                    card = {"display_name": template.get("display_name", ""),
+                            "description": template.get("description", "")}
+                except (json.JSONDecodeError, AttributeError):
+                    card = {"display_name": "", "description": ""}
+            return f"{name} {card['display_name']} {card['description']}"
+        return f"{metadata.get('component', '')} {document}"
+
+    async def _ensure_lexical_index(self) -> Optional[BM25Index]:
+        """
+        Build the BM25 index from the collection contents on first use. The full-corpus
+        get and the indexing run in a worker thread; concurrent requests wait for one build.
+        """
+        if self._lexical is None and self._collection is not None:
+            if self._lexical_lock is None:
+                self._lexical_lock = asyncio.Lock()
+            async with self._lexical_lock:
+                if self._lexical is None:
+                    self._lexical, self._lexical_entries = await to_thread(self._build_lexical_index)
+                    logging.info(f"Built lexical index over {len(self._lexical)} chunks")
+        return self._lexical
+
+    def _build_lexical_index(self):
+        corpus = self._collection.get(include=["documents", "metadatas"])
+        index = BM25Index()
+        entries: Dict[str, tuple] = {}
+        for chunk_id, document, metadata in zip(corpus["ids"], corpus["documents"], corpus["metadatas"]):
+            metadata = metadata or {}
+            index.add(chunk_id, self._lexical_text(document, metadata))
+            entries[chunk_id] = (document, metadata)
+        return index, entries
+
+    async def _fuse(self,
+              query: str,
+              vector_hits: List[Dict[str, Any]],
+              n_results: int,
+              content_type: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Combine vector hits with BM25 hits by reciprocal rank fusion and keep the top n_results.
+        Lexical-only hits carry a distance of None.
+        """
+        if not self.hybrid_search:
+            return vector_hits[:n_results]
+        try:
+            index = await self._ensure_lexical_index()
+        except Exception as e:
+            logging.warning(f"Lexical index unavailable, using vector results only: {e}")
+            return vector_hits[:n_results]
+        if index is None:
+            return vector_hits[:n_results]
+
+        def accept(chunk_id: str) -> bool:
+            return content_type is None or self._lexical_entries[chunk_id][1].get("content_type") == content_type
+
+        lexical_hits = index.search(query, n_results=self._candidate_count(n_results), accept=accept)
+        by_id = {entry["id"]: entry for entry in vector_hits}
+        fused = reciprocal_rank_fusion(
+            [[entry["id"] for entry in vector_hits], [chunk_id for chunk_id, _ in lexical_hits]],
+            k=self.rrf_k
+        )
+        results = []
+        for chunk_id, score in fused[:n_results]:
+            entry = by_id.get(chunk_id)
+            if entry is None:
+                document, metadata = self._lexical_entries[chunk_id]
+                entry = {"id": chunk_id, "document": document, "metadata": metadata, "distance": None}
+            results.append({**entry, "score": score})
+        return results
+
+    @staticmethod
+    def pattern_text(use_case: str, tech_stack: List[str], key_tasks: Optional[List[str]] = None) -> str:
+        """Text a plan pattern is embedded and queried by."""
+        parts = [use_case.strip()]
+        if key_tasks:
+            parts.append("Tasks: " + "; ".join(key_tasks))
+        if tech_stack:
+            parts.append("Tech: " + ", ".join(sorted(tech_stack, key=str.lower)))
+        return "\n".join(parts)
+
+    @staticmethod
+    def pattern_id(use_case: str, tech_stack: List[str]) -> str:
+        """Same use case and tech stack -> same pattern, whatever the wording's case and spacing."""
+        key = json.dumps([normalize_query(use_case), sorted(normalize_query(t) for t in tech_stack)])
+        return "pattern-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def _pattern_score(self, metadata: Dict[str, Any], now: float) -> float:
+        """Use count decayed by time since last use (half-life PATTERN_HALF_LIFE_DAYS)."""
+        age = max(now - float(metadata.get("last_used", 0)), 0.0)
+        return int(metadata.get("uses", 1)) * math.pow(0.5, age / self.pattern_half_life)
+
+    async def add_pattern(self,
+                          use_case: str,
+                          tech_stack: List[str],
+                          steps: List[str],
+                          key_tasks: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Store a successful plan, or refresh it (steps, use count, last use) if the same
+        use case and tech stack were stored before. Evicts the lowest-scoring patterns
+        once the library exceeds PATTERN_STORE_SIZE. Returns the pattern id.
+        """
+        if not use_case or not steps:
+            return None
+        self._guard()
+        pattern_id = self.pattern_id(use_case, tech_stack)
+        try:
+            # The upsert embeds the document; keep that and the Chroma calls off the event loop
+            await to_thread(self._upsert_pattern, pattern_id, use_case, tech_stack, steps, key_tasks)
+            self._breaker.record_success()
+        except Exception as e:
+            self._record_failure(e)
+            raise VectorStoreUnavailable(f"Pattern store failed: {e}") from e
+        return pattern_id
+
+    def _upsert_pattern(self,
+                        pattern_id: str,
+                        use_case: str,
+                        tech_stack: List[str],
+                        steps: List[str],
+                        key_tasks: Optional[List[str]]):
+        now = time.time()
+        existing = self._patterns.get(ids=[pattern_id], include=["metadatas"])
+        uses = 0
+        created_at = now
+        if existing["ids"]:
+            uses = int(existing["metadatas"][0].get("uses", 0))
+            created_at = existing["metadatas"][0].get("created_at", now)
+        metadata = {
+            "use_case": use_case,
+            "tech_stack": json.dumps(tech_stack),
+            "steps": json.dumps(steps),
+            "uses": uses + 1,
+            "created_at": created_at,
+            "last_used": now,
+        }
+        self._patterns.upsert(
+            ids=[pattern_id],
+            documents=[self.pattern_text(use_case, tech_stack, key_tasks)],
+            metadatas=[metadata]
+        )
+        if not existing["ids"] and self._patterns.count() > self.pattern_store_size:
+            self._evict_patterns(now)
+
+    def _evict_patterns(self, now: float):
+        stored = self._patterns.get(include=["metadatas"])
+        overflow = len(stored["ids"]) - self.pattern_store_size
+        if overflow <= 0:
+            return
+        ranked = sorted(zip(stored["ids"], stored["metadatas"]), key=lambda item: self._pattern_score(item[1] or {}, now))
+        evicted = [pattern_id for pattern_id, _ in ranked[:overflow]]
+        self._patterns.delete(ids=evicted)
+        logging.info(f"Evicted {len(evicted)} plan patterns (cap {self.pattern_store_size})")
+
+    async def touch_pattern(self, pattern_id: str):
+        """Count a reuse of a stored pattern."""
+        self._guard()
+        try:
+            await to_thread(self._touch_pattern, pattern_id)
+            self._breaker.record_success()
+        except Exception as e:
+            self._record_failure(e)
+            raise VectorStoreUnavailable(f"Pattern store failed: {e}") from e
+
+    def _touch_pattern(self, pattern_id: str):
+        existing = self._patterns.get(ids=[pattern_id], include=["metadatas"])
+        if existing["ids"]:
+            metadata = dict(existing["metadatas"][0])
+            metadata["uses"] = int(metadata.get("uses", 0)) + 1
+            metadata["last_used"] = time.time()
+            self._patterns.update(ids=[pattern_id], metadatas=[metadata])
+
+    async def query_patterns(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+        """
+        Stored plans closest to the query text (see pattern_text), best first, each as
+        {"id", "use_case", "tech_stack", "steps", "uses", "similarity"} with the cosine
+        similarity in [0, 1]. Raises VectorStoreUnavailable when the store is down.
+        """
+        self._guard()
+        try:
+            if await to_thread(self._patterns.count) == 0:
+                return []
+            embeddings = await self._query_embeddings.embed([query])
+            results = await to_thread(
+                self._patterns.query,
+                query_embeddings=embeddings,
+                n_results=n_results,
+                include=["metadatas", "distances"]
+            )
+            self._breaker.record_success()
+        except Exception as e:
+            self._record_failure(e)
+            raise VectorStoreUnavailable(f"Pattern query failed: {e}") from e
+        patterns = []
+        for pattern_id, metadata, distance in zip(results["ids"][0], results["metadatas"][0], results["distances"][0]):
+            metadata = metadata or {}
+            patterns.append({
+                "id": pattern_id,
+                "use_case": metadata.get("use_case", ""),
+                "tech_stack": json.loads(metadata.get("tech_stack") or "[]"),
+                "steps": json.loads(metadata.get("steps") or "[]"),
+                "uses": int(metadata.get("uses", 0)),
+                "similarity": max(0.0, 1.0 - distance) if distance is not None else 0.0,
+            })
+        return patterns
+
+    async def get_templates(self, component_names: List[str]) -> Dict[str, str]:
+        """
+        Template documents by exact component name, in one metadata-filtered Chroma
+        get (no embedding, no similarity search). Names already fetched for this corpus
+        version are served from the result cache. Names without a stored template are
+        left out of the result.
+        """
+        names = list(dict.fromkeys(name for name in component_names if name))
+        if not names:
+            return {}
+        await self.refresh_corpus_version()
+        found: Dict[str, str] = {}
+        keys = {name: self._result_key("template", name, 1, None) for name in names}
+        missing = []
+        for name in names:
+            cached = await self._cached_results(keys[name])
+            if cached is None:
+                missing.append(name)
+            elif cached:
+                found[name] = cached[0]["document"]
+        if not missing:
+            return found
+
+        self._guard()
+        where_filter = {"$and": [{"content_type": "template"}, {"component": {"$in": missing}}]}
+        try:
+            results = await to_thread(
+                self._collection.get, where=where_filter, include=["documents", "metadatas"]
+            )
+            self._breaker.record_success()
+        except Exception as e:
+            self._record_failure(e)
+            raise VectorStoreUnavailable(f"Vector store get failed: {e}") from e
+        by_name: Dict[str, List[Dict[str, Any]]] = {name: [] for name in missing}
+        for chunk_id, document, metadata in zip(results["ids"], results["documents"], results["metadatas"]):
+            component = (metadata or {}).get("component")
+            if component in by_name and not by_name[component]:
+                by_name[component].append({"id": chunk_id, "document": document, "metadata": metadata, "distance": None})
+        for name, entries in by_name.items():
+            # Misses are cached too, so an unknown name is not fetched again on every request
+            await self._cache_results(keys[name], entries)
+            if entries:
+                found[name] = entries[0]["document"]
+        return found
+
+    def _format_results(self, results, query_index: int = 0):
+        # Chroma returns lists of lists for each field, one inner list per query
         return [
             {
-                "id": results["ids"][0][i],
-                "document": results["documents"][0][i],
-                "metadata": results["metadatas"][0][i],
-                "distance": results["distances"][0][i]
+                "id": results["ids"][query_index][i],
+                "document": results["documents"][query_index][i],
+                "metadata": results["metadatas"][query_index][i],
+                "distance": results["distances"][query_index][i]
             }
-            for i in range(len(results["ids"][0]))
+            for i in range(len(results["ids"][query_index]))
         ]
-    
+
+    @staticmethod
+    def dedupe_results(result_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Merge per-query result lists into one list with each chunk id appearing once.
+        Order of first appearance is kept; the closest distance seen for a chunk wins
+        (lexical-only hits have no distance).
+        """
+        merged: Dict[str, Dict[str, Any]] = {}
+        for results in result_lists:
+            for entry in results:
+                seen = merged.get(entry["id"])
+                if seen is None:
+                    merged[entry["id"]] = entry
+                elif entry["distance"] is not None and (seen["distance"] is None or entry["distance"] < seen["distance"]):
+                    merged[entry["id"]] = {**seen, "distance": entry["distance"]}
+        return list(merged.values())
+
+    def embedding_cache_stats(self) -> Dict[str, Any]:
+        """Hit rate and size of the query embedding cache."""
+        return self._query_embeddings.stats()
+
+    def result_cache_stats(self) -> Dict[str, Any]:
+        """Hit rate and size of the query result cache, with the corpus version it holds."""
+        return {**self._results.stats(), "corpus_version": self._corpus_version}
+
     
 
 # Singleton instance
@@ -0,0 +1,159 @@
+"""
+metrics.py
+
+In-process metrics for the design pipeline: LLM calls per stage (latency, input,
+provider-cached input and output tokens), plain counters, and latency timings, exposed
+by the /metrics endpoints together with the cache statistics.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Optional, Tuple
+
+# Latency samples kept per stage for percentiles
+WINDOW = 512
+
+
+def usage_tokens(usage: Any) -> Dict[str, int]:
+    """
+    Input/output token counts from an OpenAI usage object, for both the Responses API
+    (input_tokens/output_tokens) and Chat Completions (prompt_tokens/completion_tokens).
+    "cached" is the part of the input served from the provider's prompt cache
+    (input_tokens_details / prompt_tokens_details.cached_tokens).
+    """
+    if usage is None:
+        return {"input": 0, "output": 0, "cached": 0}
+    details = _field(usage, "input_tokens_details") or _field(usage, "prompt_tokens_details")
+    return {
+        "input": _field(usage, "input_tokens") or _field(usage, "prompt_tokens") or 0,
+        "output": _field(usage, "output_tokens") or _field(usage, "completion_tokens") or 0,
+        "cached": (_field(details, "cached_tokens") if details is not None else 0) or 0,
+    }
+
+
+def _field(obj: Any, key: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+
+class _Stage:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self.total_seconds = 0.0
+        self.latencies: Deque[float] = deque(maxlen=WINDOW)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_share": round(self.cached_tokens / self.input_tokens, 3) if self.input_tokens else None,
+            "output_tokens": self.output_tokens,
+            "avg_input_tokens": round(self.input_tokens / self.calls, 1) if self.calls else None,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 1) if self.calls else None,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe registry of per-stage LLM metrics, counters and timings.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _Stage] = defaultdict(_Stage)
+        self._counters: Dict[str, float] = defaultdict(float)
+        # Rate name -> (numerator counter, denominator counter)
+        self._rates: Dict[str, Tuple[str, str]] = {}
+        self.started_at = time.time()
+
+    def record_llm_call(self, stage: str, seconds: float, usage: Any = None, error: bool = False):
+        tokens = usage_tokens(usage)
+        with self._lock:
+            entry = self._stages[stage]
+            entry.calls += 1
+            entry.errors += int(error)
+            entry.input_tokens += tokens["input"]
+            entry.cached_tokens += tokens["cached"]
+            entry.output_tokens += tokens["output"]
+            entry.total_seconds += seconds
+            entry.latencies.append(seconds)
+
+    def observe(self, stage: str, seconds: float):
+        """Record a timing for a non-LLM stage."""
+        with self._lock:
+            entry = self._stages[stage]
+            entry.calls += 1
+            entry.total_seconds += seconds
+            entry.latencies.append(seconds)
+
+    @contextmanager
+    def llm_call(self, stage: str):
+        """
+        Time an LLM call; the caller stores the response's usage in the yielded dict
+        under "usage". A call that raises is recorded as an error.
+        """
+        call: Dict[str, Any] = {"usage": None}
+        start = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            self.record_llm_call(stage, time.perf_counter() - start, call["usage"], error=True)
+            raise
+        self.record_llm_call(stage, time.perf_counter() - start, call["usage"])
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def increment(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def register_rate(self, name: str, numerator: str, denominator: str):
+        """Report counter numerator / counter denominator as `name` in the snapshot."""
+        self._rates[name] = (numerator, denominator)
+
+    def average_seconds(self, stage: str) -> Optional[float]:
+        """Mean latency recorded for a stage, or None before its first call."""
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None or not entry.calls:
+                return None
+            return entry.total_seconds / entry.calls
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            rates = {}
+            for name, (numerator, denominator) in self._rates.items():
+                total = self._counters.get(denominator, 0)
+                rates[name] = round(self._counters.get(numerator, 0) / total, 3) if total else None
+            return {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "stages": {name: stage.snapshot() for name, stage in sorted(self._stages.items())},
+                "counters": dict(self._counters),
+                "rates": rates,
+            }
+
+
+# Singleton instance
+metrics = Metrics()
@@ -23,6 +23,9 @@ class RequirementContext(BaseModel):
 
 class WorkflowPlan(BaseModel):
     steps: List[str] = Field(..., description="Sequential abstract steps defining the AI workflow")
+    plan_pattern_id: Optional[str] = Field(
+        None, description="Pattern library entry the plan was reused from, if any"
+    )
 
 
 class ComponentSpec(BaseModel):
@@ -1,16 +1,16 @@
-from flask import Flask, jsonify, request
-from flask_cors import CORS
 import logging
 import traceback
 import json
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+from compression import PrecompressedPayload
+
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)
+# Flows API, included by the main ASGI apps (main.py, singleModel.py)
+router = APIRouter()
 
 trialAPIJson = {
     "flow_json": {
@@ -422,88 +422,7 @@ trial3Json = {
     ]
 }
 
-import json
-from urllib.parse import quote
-
-import json
-from urllib.parse import quote
-
-def generate_edge_handles(
-    source_node_id, 
-    source_node_type, 
-    target_node_id, 
-    output_name="text",
-    output_types=["Message"],
-    target_field_name="input_value",
-    target_field_type="str",
-    input_types=None
-):
-    """
-    Generate properly encoded edge handles for React Flow edge connections.
-    
-    Args:
-        source_node_id: ID of the source node
-        source_node_type: Type of the source node
-        target_node_id: ID of the target node
-        output_name: Name of the output port (default: "text")
-        output_types: Types that this output can produce (default: ["Message"])
-        target_field_name: Name of the input field on target node (default: "input_value")
-        target_field_type: Type of the target field (default: "str")
-        input_types: Types that the target accepts (default: same as output_types)
-        
-    Returns:
-        Dict containing sourceHandle, targetHandle and data values
-    """
-    if input_types is None:
-        input_types = output_types
-    
-    # Create source handle object with explicit structure matching frontend expectations
-    source_handle = {
-        "dataType": source_node_type,
-        "id": source_node_id,
-        "name": output_name,
-        "output_types": output_types
-    }
-    
-    # Create target handle object with explicit structure matching frontend expectations
-    target_handle = {
-        "fieldName": target_field_name,
-        "id": target_node_id,
-        "inputTypes": input_types,
-        "type": target_field_type
-    }
-    
-    # Properly sort keys to match frontend's exact JSON format
-    def custom_json_dumps(obj):
-        if isinstance(obj, dict):
-            # Sort keys to ensure consistent output
-            return "{" + ",".join(f'"{k}":{custom_json_dumps(v)}' for k, v in sorted(obj.items())) + "}"
-        elif isinstance(obj, list):
-            return "[" + ",".join(custom_json_dumps(item) for item in obj) + "]"
-        elif obj is None:
-            return "null"
-        else:
-            return json.dumps(obj)
-    
-    # URL encode the JSON strings
-    source_handle_str = quote(custom_json_dumps(source_handle))
-    target_handle_str = quote(custom_json_dumps(target_handle))
-    
-    # Create edge ID from source and target info
-    edge_id = f"reactflow__edge-{source_node_id}{source_handle_str}-{target_node_id}{target_handle_str}"
-    
-    return {
-        "id": edge_id,
-        "source": source_node_id,
-        "target": target_node_id,
-        "sourceHandle": source_handle_str,
-        "targetHandle": target_handle_str,
-        "type": "default",
-        "data": {
-            "sourceHandle": source_handle,
-            "targetHandle": target_handle
-        }
-    }
+from flow.handles import generate_edge_handles
 
 def generate_flow_with_error_handling(input_json, use_case=None):
     logger.info(f"Starting flow generation with JSON: {json.dumps(input_json, indent=2)}")
@@ -528,6 +447,7 @@ def generate_flow_with_error_handling(input_json, use_case=None):
         # Validate edges
         if "edges" in input_json and input_json["edges"]:
             logger.info("Validating edges")
+            node_ids = {node["id"] for node in input_json["nodes"]}
             
             for i, edge in enumerate(input_json["edges"]):
                 logger.info(f"Validating edge {i+1}/{len(input_json['edges'])}: {edge}")
@@ -539,7 +459,6 @@ def generate_flow_with_error_handling(input_json, use_case=None):
                 source = edge["source"]
                 target = edge["target"]
                 
-                node_ids = [node["id"] for node in input_json["nodes"]]
                 if source not in node_ids or target not in node_ids:
                     raise ValueError(f"Source or target node not found in nodes")
                 
@@ -625,23 +544,28 @@ trial4Json = {
     "edges": [edge]
 }
 
-@app.route('/api/flows', methods=['GET'])
-def return_json():
-    try:
-        use_case = request.args.get('use_case')
-        # flow = generate_flow_with_error_handling(trial8Json, use_case)
-        flow = trialAPIJson
-        return jsonify(flow)
-        
-    except Exception as e:
-        logger.error(f"Error in /api/flows endpoint: {str(e)}")
-        logger.error(traceback.format_exc())
-        
-        return jsonify({
-            "error": True,
-            "message": str(e),
-            "stack": traceback.format_exc()
-        }), 500
+# The sample flow is static: serialize, compress and tag it once
+flows_payload = PrecompressedPayload(trialAPIJson)
+
+@router.get("/api/flows")
+async def return_json(request: Request):
+    # use_case = request.query_params.get("use_case")
+    # flow = generate_flow_with_error_handling(trial8Json, use_case)
+    return flows_payload.response(request)
+
+# Standalone app for serving the flows API on its own
+app = FastAPI(title="LangFlow Flows API")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.include_router(router)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=8002)
\ No newline at end of file
+    import uvicorn
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, 
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    uvicorn.run(app, host="127.0.0.1", port=8002)
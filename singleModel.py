@@ -1,21 +1,36 @@
 import os
-import json
 import logging
 from typing import Dict, Any, List
 import asyncio
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 
 from openai import OpenAI
-from memory.vector_store import vector_store
+import fast_json
+from memory.vector_store import vector_store, VectorStoreUnavailable
+from memory.prompt_fragments import prompt_fragments
+from flow.layout import layout_flow
+from flow.compatibility import compatibility_index
+from flow.expand import flow_expander
+from server import router as flows_router
+from compression import CompressionMiddleware
+from fast_json import FastJSONResponse
+from flow.validator import flow_validator
+from agents.systemprompts import FLOW_REPAIR_PROMPT
+from flow.handles import handle_cache_stats
+from metrics import metrics
+from agents.model_router import model_router
+from agents.messages import build_messages, prompt_chars
 
 # --- Request/Response models ---
 class DesignRequest(BaseModel):
     prompt: str
     api_provider: str = "groq"  # Default to groq, can be "openai" or "groq"
+    expand: bool = False  # Return full genericNode definitions instead of minimal nodes
 
 class DesignResponse(BaseModel):
     flow_json: Dict[str, Any]
@@ -33,69 +48,11 @@ groq_client = OpenAI(
     api_key=os.getenv("GROQ_API_KEY", "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")
 )
 
-# --- Main RAG function ---
-async def generate_flow(prompt: str, api_provider: str = "groq") -> Dict[str, Any]:
-    """Generate a flow using RAG pattern with either GROQ or OpenAI
-    
-    Args:
-        prompt: The user prompt
-        api_provider: Which API to use - "groq" or "openai"
-    """
-    logging.info(f"[RAG] Generating flow for prompt using {api_provider} API")
-    
-    try:
-        # 1. Retrieve relevant documentation and templates from ChromaDB
-        logging.info(f"[RAG] Querying vector store for documentation related to: '{prompt[:100]}...'")
-        doc_results = await vector_store.query_docs(
-            query=prompt, 
-            content_type="documentation",
-            n_results=5
-        )
-        logging.info(f"[RAG] Retrieved {len(doc_results)} documentation chunks")
-        
-        # Log documentation details
-        for i, doc in enumerate(doc_results):
-            component = doc["metadata"].get("component", "unknown")
-            doc_type = doc["metadata"].get("doc_type", "unknown")
-            doc_id = doc["id"]
-            doc_preview = doc["document"][:150] + "..." if len(doc["document"]) > 150 else doc["document"]
-            logging.info(f"[RAG] Doc {i+1}/{len(doc_results)}: ID={doc_id}, Component={component}, Type={doc_type}")
-            logging.debug(f"[RAG] Doc {i+1} Content Preview: {doc_preview}")
-        
-        # 2. Get templates for potential components
-        logging.info("[RAG] Retrieving component templates")
-        template_results = await vector_store.query_templates(n_results=20)
-        logging.info(f"[RAG] Retrieved {len(template_results)} component templates")
-        
-        # Log template details
-        template_names = []
-        for i, entry in enumerate(template_results):
-            component_name = entry["metadata"].get("component", "unknown")
-            category = entry["metadata"].get("category", "unknown")
-            template_names.append(component_name)
-            logging.info(f"[RAG] Template {i+1}/{len(template_results)}: Component={component_name}, Category={category}")
-        
-        # Process templates
-        component_templates = {}
-        successful_templates = 0
-        for entry in template_results:
-            component_name = entry["metadata"].get("component")
-            if component_name:
-                try:
-                    template_data = json.loads(entry["document"])
-                    component_templates[component_name] = template_data
-                    successful_templates += 1
-                except json.JSONDecodeError:
-                    logging.warning(f"[RAG] Could not parse template for {component_name}")
-        
-        logging.info(f"[RAG] Successfully parsed {successful_templates}/{len(template_results)} templates")
-        logging.info(f"[RAG] Available component templates: {', '.join(component_templates.keys())}")
-        
-        # 3. Prepare documents for context
-        doc_chunks = [entry["document"] for entry in doc_results]
-        
-        # 4. Build the system prompt
-        system_prompt = """
+# Rounds of re-prompting about validation issues that could not be fixed locally
+FLOW_REPAIR_ROUNDS = int(os.getenv("FLOW_REPAIR_ROUNDS", "1"))
+
+# --- System prompt (static; built once at import) ---
+FLOW_DESIGNER_PROMPT = """
 You are an expert Langflow workflow designer specializing in creating precise, functional workflows for language models and AI applications.
 
 # CRITICAL REQUIREMENTS
@@ -117,7 +74,10 @@ Your task is to design a workflow that EXACTLY follows these specifications:
    - Each edge must have a unique ID (e.g., "e1", "e2")
    - Sources and targets must reference valid node IDs
 
-4. JSON FORMAT:
+4. LAYOUT:
+   - Do NOT include node positions; the layout is computed automatically
+
+5. JSON FORMAT:
    - Respond with a SINGLE valid JSON object with exactly one top-level key: "flow_json"
    - "flow_json" must contain exactly two keys: "nodes" and "edges"
    - Do NOT include any explanation text outside the JSON
@@ -131,7 +91,6 @@ Your task is to design a workflow that EXACTLY follows these specifications:
       {
         "id": "unique_identifier_string",
         "type": "ExactComponentNameFromTemplate",
-        "position": {"x": number, "y": number},
         "data": {
           "param1": value1,
           "param2": value2
@@ -170,7 +129,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "loader",
         "type": "GitLoaderComponent",
-        "position": {"x": 100, "y": 100},
         "data": {
           "repo_source": "Remote",
           "clone_url": "https://github.com/example/repo.git",
@@ -180,7 +138,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "splitter",
         "type": "RecursiveCharacterTextSplitter",
-        "position": {"x": 400, "y": 100},
         "data": {
           "chunk_size": 1000,
           "chunk_overlap": 200
@@ -189,7 +146,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "embedder",
         "type": "OpenAIEmbeddings",
-        "position": {"x": 700, "y": 100},
         "data": {
           "model": "text-embedding-3-small"
         }
@@ -197,7 +153,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "vectorstore",
         "type": "Chroma",
-        "position": {"x": 1000, "y": 100},
         "data": {
           "collection_name": "repo_documents",
           "persist_directory": "./chroma_db"
@@ -206,7 +161,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "llm",
         "type": "OpenAIModel",
-        "position": {"x": 700, "y": 300},
         "data": {
           "model_name": "gpt-4o",
           "temperature": 0.2
@@ -215,7 +169,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "qa",
         "type": "RetrievalQA",
-        "position": {"x": 1000, "y": 300},
         "data": {
           "chain_type": "stuff"
         }
@@ -240,7 +193,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "search_tool",
         "type": "GoogleSearchAPIWrapper",
-        "position": {"x": 100, "y": 100},
         "data": {
           "api_key": "{{GOOGLE_API_KEY}}",
           "search_engine_id": "{{SEARCH_ENGINE_ID}}"
@@ -249,13 +201,11 @@ Follow these compatibility rules when connecting components:
       {
         "id": "calculator_tool",
         "type": "Calculator",
-        "position": {"x": 100, "y": 300},
         "data": {}
       },
       {
         "id": "llm",
         "type": "OpenAIModel",
-        "position": {"x": 400, "y": 200},
         "data": {
           "model_name": "gpt-4o",
           "temperature": 0
@@ -264,7 +214,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "memory",
         "type": "Memory",
-        "position": {"x": 400, "y": 400},
         "data": {
           "chat_memory": "BufferMemory",
           "return_messages": true,
@@ -274,7 +223,6 @@ Follow these compatibility rules when connecting components:
       {
         "id": "agent",
         "type": "Agent",
-        "position": {"x": 700, "y": 200},
         "data": {
           "system_prompt": "You are a helpful assistant that can use tools to find information and perform calculations."
         }
@@ -302,64 +250,149 @@ Study the templates carefully to identify exact component names and valid parame
 
 Now, create a workflow that precisely matches the user's request using only components from the provided templates.
 """
+
+def _complete_json(messages: List[Dict[str, str]], api_provider: str, model: str, stage: str = "design") -> Dict[str, Any]:
+    """
+    Run one JSON-mode completion of `model` on the selected provider and return the parsed
+    object. The call's latency and token usage are recorded in the metrics under `stage`.
+    """
+    with model_router.track(f"{stage}.{api_provider.lower()}", model, provider=api_provider) as call:
+        return _complete_json_call(messages, api_provider, model, call)
+
+def _complete_json_call(messages: List[Dict[str, str]], api_provider: str, model: str, call: Dict[str, Any]) -> Dict[str, Any]:
+    if api_provider.lower() == "openai":
+        logging.info(f"[RAG] Using OpenAI Responses API ({model})")
+        response = openai_client.responses.create(
+            model=model,
+            input=messages,
+            text={"format": {"type": "json_object"}},
+        )
+        call["usage"] = response.usage
         
-        # 5. Build payload for API
-        payload = {
-            "prompt": prompt,
-            "documentation": doc_chunks,
-            "templates": component_templates
-        }
+        # Process the OpenAI response
+        content = response.output[0].content
+        if isinstance(content, list):
+            content = content[0]
+        if hasattr(content, 'text'):
+            content = content.text
+        if isinstance(content, str):
+            return fast_json.loads(content)
+        return content
+
+    # Default to GROQ
+    logging.info(f"[RAG] Using GROQ API ({model})")
+    chat_completion = groq_client.chat.completions.create(
+        model=model,
+        messages=messages,
+        response_format={"type": "json_object"}  # keeps JSON-only answers
+    )
+    call["usage"] = chat_completion.usage
+
+    # Extract the assistant's JSON text
+    content = chat_completion.choices[0].message.content
+    return fast_json.loads(content)
+
+def _validate_and_repair(flow: Dict[str, Any], api_provider: str, model: str) -> Dict[str, Any]:
+    """
+    Validate a generated flow, apply local fixes, and re-prompt about the offending
+    nodes only, for up to FLOW_REPAIR_ROUNDS rounds, one model stronger than the one
+    that produced the flow.
+    """
+    flow, _ = flow_validator.repair(flow)
+    issues = flow_validator.validate(flow)
+    for round_number in range(FLOW_REPAIR_ROUNDS):
+        if not issues:
+            break
+        model = model_router.upgrade(model, api_provider) or model
+        logging.info(f"[RAG] Re-prompting about {len(issues)} issues (round {round_number + 1}): {[i['message'] for i in issues]}")
+        try:
+            corrected = _complete_json(build_messages(FLOW_REPAIR_PROMPT, flow_validator.repair_request(flow, issues)), api_provider, model, stage="repair")
+        except Exception as e:
+            logging.warning(f"[RAG] Repair prompt failed: {e}")
+            break
+        flow, _ = flow_validator.repair(flow_validator.merge_repair(flow, issues, corrected))
+        issues = flow_validator.validate(flow)
+    if issues:
+        logging.warning(f"[RAG] Flow still has {len(issues)} validation issues: {[i['message'] for i in issues]}")
+    return flow
+
+# --- Main RAG function ---
+async def generate_flow(prompt: str, api_provider: str = "groq") -> Dict[str, Any]:
+    """Generate a flow using RAG pattern with either GROQ or OpenAI
+    
+    Args:
+        prompt: The user prompt
+        api_provider: Which API to use - "groq" or "openai"
+    """
+    # Anything but "openai" runs on Groq
+    api_provider = "openai" if api_provider.lower() == "openai" else "groq"
+    logging.info(f"[RAG] Generating flow for prompt using {api_provider} API")
+    
+    try:
+        # 1. Retrieve relevant documentation and templates from ChromaDB
+        logging.info(f"[RAG] Querying vector store for documentation related to: '{prompt[:100]}...'")
+        doc_results = await vector_store.query_docs(
+            query=prompt, 
+            content_type="documentation",
+            n_results=3
+        )
+        logging.info(f"[RAG] Retrieved {len(doc_results)} documentation chunks")
+        logging.info(f"[RAG] Query embedding cache: {vector_store.embedding_cache_stats()}")
         
-        # 6. Call the appropriate API based on the provider
-        if api_provider.lower() == "openai":
-            logging.info("[RAG] Using OpenAI Responses API")
-            response = openai_client.responses.create(
-                model="gpt-4o-mini",  # or a more cost-effective model like "gpt-4o-mini"
-                input=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": json.dumps(payload, ensure_ascii=False),
-                    },
-                ],
-                text={"format": {"type": "json_object"}},
-            )
-            
-            # Process the OpenAI response
-            content = response.output[0].content
-            if isinstance(content, list):
-                content = content[0]
-            if hasattr(content, 'text'):
-                content = content.text
-            if isinstance(content, str):
-                parsed = json.loads(content)
-            else:
-                parsed = content
-        else:
-            # Default to GROQ
-            logging.info("[RAG] Using GROQ API")
-            chat_completion = groq_client.chat.completions.create(
-                model="gemma2-9b-it",        # Groq model
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
-                ],
-                response_format={"type": "json_object"}  # keeps JSON-only answers
-            )
-
-            # Extract the assistant's JSON text
-            content = chat_completion.choices[0].message.content
-            parsed = json.loads(content)
+        # Log documentation details
+        for i, doc in enumerate(doc_results):
+            component = doc["metadata"].get("component", "unknown")
+            doc_type = doc["metadata"].get("doc_type", "unknown")
+            doc_id = doc["id"]
+            doc_preview = doc["document"][:150] + "..." if len(doc["document"]) > 150 else doc["document"]
+            logging.info(f"[RAG] Doc {i+1}/{len(doc_results)}: ID={doc_id}, Component={component}, Type={doc_type}")
+            logging.debug(f"[RAG] Doc {i+1} Content Preview: {doc_preview}")
+        
+        # 2. Get templates for potential components
+        logging.info("[RAG] Retrieving component templates")
+        template_results = await vector_store.query_templates(n_results=20)
+        logging.info(f"[RAG] Retrieved {len(template_results)} component templates")
+        
+        # Log template details
+        template_names = []
+        for i, entry in enumerate(template_results):
+            component_name = entry["metadata"].get("component", "unknown")
+            category = entry["metadata"].get("category", "unknown")
+            template_names.append(component_name)
+            logging.info(f"[RAG] Template {i+1}/{len(template_results)}: Component={component_name}, Category={category}")
+        
+        # Lean template fragments, encoded once per component and corpus version
+        templates_json = prompt_fragments.templates(prompt_fragments.entries(template_results), vector_store.corpus_version())
+        logging.info(f"[RAG] Template fragments: {prompt_fragments.stats()}")
+        
+        # 3. Prepare documents for context
+        doc_chunks = [entry["document"] for entry in doc_results]
+        
+        # 4. Build the messages: the sorted, pre-encoded templates (the same for most
+        #    requests, so the provider can cache them) before the prompt and documentation
+        messages = build_messages(
+            FLOW_DESIGNER_PROMPT,
+            {"prompt": prompt, "documentation": doc_chunks},
+            reference={"templates": templates_json},
+        )
+        
+        # 5. Call the appropriate API based on the provider, on the model routed for the prompt size
+        model = model_router.route("design", api_provider, prompt_chars=prompt_chars(messages))
+        parsed = _complete_json(messages, api_provider, model)
             
         # If the top-level keys are 'nodes' and 'edges', wrap them in 'flow_json'
         if "flow_json" not in parsed and {"nodes", "edges"} <= parsed.keys():
             parsed = {"flow_json": parsed}
 
-        return parsed["flow_json"]
+        # 6. Validate, fix what can be fixed locally, re-prompt only about the rest
+        flow = _validate_and_repair(parsed["flow_json"], api_provider, model)
+
+        # Positions are assigned locally rather than generated by the model
+        return layout_flow(flow)
     
+    except VectorStoreUnavailable:
+        # Don't generate a flow without retrieval context
+        raise
     except Exception as e:
         logging.error(f"Error generating flow: {e}", exc_info=True)
         # Simple fallback flow in case of errors
@@ -368,11 +401,13 @@ Now, create a workflow that precisely matches the user's request using only comp
 # --- FastAPI setup ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await vector_store.initialize()
-    logging.info("Vector store initialized at startup.")
+    # Connect in the background so startup is not held up by Chroma retries
+    vector_store.start()
+    logging.info("Vector store connection started in the background.")
     yield
+    await vector_store.stop()
 
-app = FastAPI(title="LangFlow Designer", version="1.0.0", lifespan=lifespan)
+app = FastAPI(title="LangFlow Designer", version="1.0.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -380,16 +415,59 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/brotli by Accept-Encoding; flow_json responses run to hundreds of kilobytes
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+# Static flows API (formerly the separate Flask server)
+app.include_router(flows_router)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: report dependency state; 503 until the vector store can serve queries."""
+    status = {"vector_store": vector_store.status()}
+    return JSONResponse(status_code=200 if vector_store.ready else 503, content=status)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-stage LLM latency and token counts, model routing windows, plus cache statistics."""
+    snapshot = metrics.snapshot()
+    snapshot["caches"] = {
+        "embeddings": vector_store.embedding_cache_stats(),
+        "results": vector_store.result_cache_stats(),
+        "prompt_fragments": prompt_fragments.stats(),
+        "edge_handles": handle_cache_stats(),
+    }
+    snapshot["models"] = model_router.stats()
+    return snapshot
+
+@app.get("/components/{name}/compatible")
+async def compatible_components(name: str):
+    """Components this one can feed (targets) and be fed by (sources), from the compatibility index."""
+    result = compatibility_index.compatible(name)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown component '{name}'")
+    return result
+
 @app.post("/design", response_model=DesignResponse)
 async def design_workflow(request: DesignRequest):
     logging.info(f"[API] /design endpoint called with api_provider: {request.api_provider}")
     try:
         flow = await generate_flow(request.prompt, request.api_provider)
         logging.info("[API] Successfully generated flow.")
-        return DesignResponse(flow_json=flow)
+        if request.expand:
+            expanded = flow_expander.expand_flow(flow)
+            return StreamingResponse(flow_expander.iter_json(expanded, wrap_key="flow_json"), media_type="application/json")
+        # The flow is plain JSON data already; skip re-validating it through DesignResponse
+        return FastJSONResponse({"flow_json": flow})
+    except VectorStoreUnavailable as e:
+        logging.error(f"[API] Design aborted, vector store unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Retrieval backend unavailable, try again shortly")
     except Exception as e:
         logging.error(f"[API] Design process failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Design process error")
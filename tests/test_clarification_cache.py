@@ -0,0 +1,113 @@
+"""
+tests/test_clarification_cache.py
+
+Paraphrase matching of the clarification cache: reworded questions reuse an answer,
+questions that differ in a distinctive word do not.
+
+    python -m pytest tests/test_clarification_cache.py
+"""
+import asyncio
+
+import pytest
+
+from memory.clarification_cache import ClarificationCache, question_terms, similarity
+
+
+@pytest.fixture
+def cache():
+    return ClarificationCache()
+
+
+@pytest.mark.parametrize("question, domains, answer", [
+    ("Which embedding model should we use?", ["rag"], "Use OpenAI Embeddings (text-embedding-3-small)."),
+    ("What embedding model should be used?", ["rag"], "Use OpenAI Embeddings (text-embedding-3-small)."),
+    ("Which embeding model should be used?", ["rag"], "Use OpenAI Embeddings (text-embedding-3-small)."),
+    ("Which vector store should we use?", ["rag"], "Use Chroma DB."),
+    ("Which language model should we use?", [], "Use OpenAI gpt-4o-mini."),
+    ("What should the model temperature be?", [], "Use a temperature of 0.2."),
+    ("what is the expected OUTPUT format", [], "Plain text returned as a chat message."),
+])
+def test_paraphrases_reuse_the_default_answer(cache, question, domains, answer):
+    assert cache.match(question, domains) == answer
+
+
+@pytest.mark.parametrize("question, domains", [
+    ("What is the expected input format?", []),
+    ("How many agents are needed?", ["agent"]),
+    ("Which embedding model dimension should be used?", ["rag"]),
+    ("What is the format of the output documents?", ["rag"]),
+])
+def test_near_miss_questions_are_unseen(cache, question, domains):
+    assert cache.match(question, domains) is None
+    assert cache.misses == 1
+
+
+def test_stored_answers_match_paraphrases_only():
+    cache = ClarificationCache()
+    asyncio.run(cache.store({"Which database should store the chat history?": "Use Postgres."}))
+    answered, unseen = asyncio.run(cache.lookup([
+        "Which database should store chat history?",
+        "Which database should store the documents?",
+    ]))
+    assert answered == {"Which database should store chat history?": "Use Postgres."}
+    assert unseen == ["Which database should store the documents?"]
+
+
+def test_similarity_requires_every_distinctive_word():
+    a = question_terms("What is the expected input format?")
+    b = question_terms("What is the expected output format?")
+    assert similarity(a, a) == 1.0
+    assert similarity(a, b) < 0.8
+    assert similarity(frozenset(), frozenset()) == 0.0
+
+
+class FlakyRedis:
+    """Redis client stand-in whose first connection attempts fail."""
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.connected = False
+        self.hash = {"which vector store should be used": "Use Qdrant."}
+
+    async def connect(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("redis down")
+        self.connected = True
+
+    async def get_hash(self, key):
+        return dict(self.hash)
+
+    async def set_hash_fields(self, key, fields, ttl=None, max_fields=None):
+        self.hash.update(fields)
+
+
+def test_redis_load_is_retried_after_a_failed_connection(monkeypatch):
+    redis = FlakyRedis(failures=1)
+    cache = ClarificationCache(redis=redis)
+    question = "Which vector store should be used?"
+    answered, _ = asyncio.run(cache.lookup([question], ["rag"]))
+    assert answered == {question: "Use Chroma DB."}
+
+    # Still inside the retry delay: no new connection attempt
+    asyncio.run(cache.lookup([question], ["rag"]))
+    assert not redis.connected
+
+    monkeypatch.setattr(cache, "_redis_retry_at", 0.0)
+    answered, _ = asyncio.run(cache.lookup([question], ["rag"]))
+    assert redis.connected
+    assert answered == {question: "Use Qdrant."}
+
+
+def test_redis_hash_is_trimmed_to_the_newest_answers():
+    fakeredis = pytest.importorskip("fakeredis")
+    from memory.redis_client import RedisClient
+
+    async def run():
+        client = RedisClient()
+        client._redis = fakeredis.FakeAsyncRedis()
+        cache = ClarificationCache(maxsize=3, redis=client)
+        for i in range(5):
+            await cache.store({f"Question number {i}?": f"Answer {i}."})
+        return await client.get_hash("clarify:answers")
+
+    assert asyncio.run(run()) == {f"question number {i}": f"Answer {i}." for i in (2, 3, 4)}
@@ -0,0 +1,53 @@
+"""
+tests/test_component_catalog.py
+
+The compiled catalog snapshot is used while the source templates keep their content,
+whatever their mtimes, and ignored once the content changes.
+
+    python -m pytest tests/test_component_catalog.py
+"""
+import json
+import os
+
+import pytest
+
+from memory.component_catalog import ComponentCatalog, build_snapshot
+
+
+@pytest.fixture
+def templates(tmp_path):
+    templates_dir = tmp_path / "component_categories"
+    templates_dir.mkdir()
+    (templates_dir / "inputs.json").write_text(json.dumps({"ChatInput": {"display_name": "Chat Input"}}))
+    (templates_dir / "outputs.json").write_text(json.dumps({"ChatOutput": {"display_name": "Chat Output"}}))
+    snapshot_path = str(tmp_path / "catalog.snapshot")
+    build_snapshot(str(templates_dir), snapshot_path)
+    return templates_dir, snapshot_path
+
+
+def load(templates_dir, snapshot_path):
+    catalog = ComponentCatalog(str(templates_dir), snapshot_path)
+    catalog.load()
+    return catalog
+
+
+def test_snapshot_is_mapped(templates):
+    catalog = load(*templates)
+    assert catalog._snapshot is not None
+    assert catalog.get("ChatInput") == {"display_name": "Chat Input"}
+
+
+def test_touched_sources_keep_the_snapshot(templates):
+    templates_dir, snapshot_path = templates
+    source = templates_dir / "inputs.json"
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load(templates_dir, snapshot_path)._snapshot is not None
+
+
+def test_changed_sources_skip_the_snapshot(templates):
+    templates_dir, snapshot_path = templates
+    (templates_dir / "inputs.json").write_text(json.dumps({"TextInput": {"display_name": "Text Input"}}))
+    catalog = load(templates_dir, snapshot_path)
+    assert catalog._snapshot is None
+    assert catalog.names() == ["TextInput", "ChatOutput"]
@@ -0,0 +1,125 @@
+"""
+tests/test_edge_handles.py
+
+The memoized handle encoder in flow/handles.py must produce byte-for-byte the edges
+of the original recursive generate_edge_handles, kept below as the reference.
+
+    python -m pytest tests/test_edge_handles.py
+"""
+import json
+import random
+from urllib.parse import quote
+
+import pytest
+
+from flow.handles import generate_edge_handles, generate_edges, sorted_json
+
+
+def custom_json_dumps(obj):
+    """The original recursive handle encoder."""
+    if isinstance(obj, dict):
+        return "{" + ",".join(f'"{k}":{custom_json_dumps(v)}' for k, v in sorted(obj.items())) + "}"
+    elif isinstance(obj, list):
+        return "[" + ",".join(custom_json_dumps(item) for item in obj) + "]"
+    elif obj is None:
+        return "null"
+    else:
+        return json.dumps(obj)
+
+
+def reference_edge(source_node_id, source_node_type, target_node_id, output_name="text",
+                   output_types=["Message"], target_field_name="input_value",
+                   target_field_type="str", input_types=None):
+    """The original generate_edge_handles."""
+    if input_types is None:
+        input_types = output_types
+    source_handle = {
+        "dataType": source_node_type,
+        "id": source_node_id,
+        "name": output_name,
+        "output_types": output_types
+    }
+    target_handle = {
+        "fieldName": target_field_name,
+        "id": target_node_id,
+        "inputTypes": input_types,
+        "type": target_field_type
+    }
+    source_handle_str = quote(custom_json_dumps(source_handle))
+    target_handle_str = quote(custom_json_dumps(target_handle))
+    edge_id = f"reactflow__edge-{source_node_id}{source_handle_str}-{target_node_id}{target_handle_str}"
+    return {
+        "id": edge_id,
+        "source": source_node_id,
+        "target": target_node_id,
+        "sourceHandle": source_handle_str,
+        "targetHandle": target_handle_str,
+        "type": "default",
+        "data": {
+            "sourceHandle": source_handle,
+            "targetHandle": target_handle
+        }
+    }
+
+
+# Usual flows, plus values outside the usual shape: escaping, unicode, None, numbers, nesting, tuples
+EDGES = [
+    {"source_node_id": "ChatInput-a1", "source_node_type": "ChatInput", "target_node_id": "OpenAIModel-c3"},
+    {"source_node_id": "OpenAIModel-c3", "source_node_type": "OpenAIModel", "target_node_id": "ChatOutput-b2",
+     "output_name": "text_output", "output_types": ["Message"], "target_field_name": "input_value",
+     "target_field_type": "str", "input_types": ["Data", "DataFrame", "Message"]},
+    {"source_node_id": "OpenAIEmbeddings-e1", "source_node_type": "OpenAIEmbeddings", "target_node_id": "Chroma-v1",
+     "output_name": "embeddings", "output_types": ["Embeddings"], "target_field_name": "embedding",
+     "target_field_type": "other"},
+    {"source_node_id": 'quo"te\\s', "source_node_type": "Tab\tType", "target_node_id": "ünï cödé-✓",
+     "output_name": "out put", "output_types": ["Mes\"sage", "Ünïcode"], "input_types": []},
+    {"source_node_id": "n1", "source_node_type": "T", "target_node_id": "n2", "output_types": None},
+    {"source_node_id": "n1", "source_node_type": "T", "target_node_id": "n2",
+     "output_types": [1, 2.5, True, None, ["nested", {"b": 1, "a": [None]}]], "target_field_type": None},
+    {"source_node_id": "n1", "source_node_type": "T", "target_node_id": "n2",
+     "output_types": ("tu", "ple"), "input_types": ("x",)},
+    {"source_node_id": 7, "source_node_type": "T", "target_node_id": 8, "output_types": [True], "input_types": [1]},
+    {"source_node_id": 7, "source_node_type": "T", "target_node_id": 8, "output_types": [1], "input_types": [True]},
+    {"source_node_id": 1, "source_node_type": "T", "target_node_id": True, "output_types": ["a"]},
+    {"source_node_id": True, "source_node_type": "T", "target_node_id": 1, "output_types": ["a"]},
+]
+
+
+def random_edges(n_edges: int, seed: int):
+    """Edges whose ports repeat across nodes, the way they do in imported flows."""
+    rng = random.Random(seed)
+    types = ["Message", "Data", "DataFrame", "Embeddings", "LanguageModel", "Tool", "Memory", "Text"]
+    edges = []
+    for _ in range(n_edges):
+        source, target = rng.sample(range(n_edges // 4), 2)
+        edges.append({
+            "source_node_id": f"Component-{source:05d}",
+            "source_node_type": f"Component{source % 10}",
+            "target_node_id": f"Component-{target:05d}",
+            "output_name": f"output_{rng.randrange(3)}",
+            "output_types": rng.sample(types, 2),
+            "target_field_name": f"field_{rng.randrange(3)}",
+            "target_field_type": "other",
+            "input_types": rng.sample(types, 3),
+        })
+    return edges
+
+
+@pytest.mark.parametrize("edges", [EDGES, random_edges(400, seed=1)], ids=["fixed", "random"])
+def test_generate_edges_matches_original(edges):
+    expected = [reference_edge(**edge) for edge in edges]
+    # Twice: the first call fills the handle caches, the second is served from them
+    for _ in range(2):
+        actual = generate_edges(edges)
+        assert actual == expected
+        assert [json.dumps(edge) for edge in actual] == [json.dumps(edge) for edge in expected]
+
+
+@pytest.mark.parametrize("edge", EDGES)
+def test_generate_edge_handles_matches_original(edge):
+    assert json.dumps(generate_edge_handles(**edge)) == json.dumps(reference_edge(**edge))
+
+
+@pytest.mark.parametrize("value", [{"b": [1, {"d": None, "c": "x"}], "a": []}, [], {}, "s", 1.5, None, [[[]]]])
+def test_sorted_json_matches_original(value):
+    assert sorted_json(value) == custom_json_dumps(value)
@@ -0,0 +1,37 @@
+"""
+tests/test_redis_client.py
+
+Session contexts are hashes under their own key namespace, so JSON strings left by the
+previous client under "session:<id>" do not get in the way.
+
+    python -m pytest tests/test_redis_client.py
+"""
+import asyncio
+import json
+
+import pytest
+
+from memory.redis_client import RedisClient
+
+
+def test_session_hash_ignores_a_legacy_string_session():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def run():
+        client = RedisClient()
+        client._redis = fakeredis.FakeAsyncRedis()
+        await client._redis.set("session:abc", json.dumps({"prompt": "old"}))
+
+        await client.set_session_context("abc", {"prompt": "Build a chatbot", "plan": {"steps": []}})
+        await client.update_session_context("abc", {"clarifications": {"Which model?": "gpt-4o-mini"}})
+        context = await client.get_session_context("abc")
+        partial = await client.get_session_context("abc", ["prompt"])
+        await client.clear_session_context("abc")
+        return context, partial, await client._redis.get("session:abc"), await client.get_session_context("abc")
+
+    context, partial, legacy, cleared = asyncio.run(run())
+    assert context == {"prompt": "Build a chatbot", "plan": {"steps": []},
+                       "clarifications": {"Which model?": "gpt-4o-mini"}}
+    assert partial == {"prompt": "Build a chatbot"}
+    assert json.loads(legacy) == {"prompt": "old"}
+    assert cleared == {}
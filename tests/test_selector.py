@@ -0,0 +1,104 @@
+"""
+tests/test_selector.py
+
+Phase two of the component selector: the documentation retrieved for the steps
+reaches the parameters payload as the sections of the chosen components.
+
+    python -m pytest tests/test_selector.py
+"""
+import asyncio
+import json
+
+import pytest
+
+from agents import selector
+from schemas import ComponentSelection, RequirementContext, WorkflowPlan
+
+MODELS_DOC = """# Model components in Langflow
+
+## Use a model component in a flow
+
+Connect a model to a prompt.
+
+## Anthropic
+
+Generates text with Anthropic's Claude models.
+
+## OpenAI
+
+Generates text with OpenAI's models.
+
+### Inputs
+
+| model_name | The OpenAI model to use. |
+"""
+
+IO_DOC = """# Input and output components in Langflow
+
+## Chat Input
+
+Receives the user's chat message.
+
+## Chat Output
+
+Shows the response in the Playground.
+"""
+
+
+def chunk(chunk_id, document, component):
+    return {"id": chunk_id, "document": document, "distance": 0.2,
+            "metadata": {"component": component, "content_type": "documentation"}}
+
+
+@pytest.fixture
+def payloads(monkeypatch):
+    """Stub retrieval and the model calls; collect what each model call was sent."""
+    sent = {}
+
+    async def query_docs_batch(queries, n_results, content_type):
+        models = chunk("doc-models", MODELS_DOC, "components-models")
+        io = chunk("doc-io", IO_DOC, "components-io")
+        return [[io], [models, io], [io]]
+
+    def call_model(stage, messages, components=0):
+        sent[stage] = json.loads(messages[-1]["content"])
+        if stage == "selector.shortlist":
+            return json.dumps({"components": [
+                {"step": "Receive the question", "component_name": "ChatInput"},
+                {"step": "Answer with an LLM", "component_name": "OpenAIModel"},
+                {"step": "Show the answer", "component_name": "ChatOutput"},
+            ]})
+        return json.dumps({"components": [
+            {"step": "Answer with an LLM", "component_name": "OpenAIModel", "parameters": {"model_name": "gpt-4o-mini"}},
+        ]})
+
+    def shortlist(query, n_results=8, related=()):
+        return [{"name": name} for name in ("ChatInput", "OpenAIModel", "ChatOutput")]
+
+    monkeypatch.setattr(selector.vector_store, "query_docs_batch", query_docs_batch)
+    monkeypatch.setattr(selector.vector_store, "corpus_version", lambda: "test")
+    monkeypatch.setattr(selector.prompt_fragments, "templates", lambda names, version: {})
+    monkeypatch.setattr(selector.component_cards, "shortlist", shortlist)
+    monkeypatch.setattr(selector, "_call_model", call_model)
+    return sent
+
+
+def test_documentation_reaches_the_parameters_payload(payloads):
+    plan = WorkflowPlan(steps=["Receive the question", "Answer with an LLM", "Show the answer"])
+    requirements = RequirementContext(use_case="Q&A chatbot", key_tasks=[], tech_stack=["OpenAI"],
+                                      constraints=[], ambiguities=[])
+    selection = asyncio.run(selector.select_components(plan, requirements))
+
+    assert isinstance(selection, ComponentSelection)
+    assert [c.component_name for c in selection.components] == ["OpenAIModel"]
+    documentation = payloads["selector.parameters"]["documentation"]
+    assert [doc.split("\n", 1)[0] for doc in documentation] == ["## Chat Input", "## OpenAI", "## Chat Output"]
+    assert "model_name" in documentation[1]
+    # Sections of components that were not chosen stay out
+    assert not any("Anthropic" in doc for doc in documentation)
+
+
+def test_documentation_is_capped_per_component(monkeypatch):
+    monkeypatch.setattr(selector, "DOC_SECTION_CHARS", 20)
+    docs = selector._documentation([chunk("doc-models", MODELS_DOC, "components-models")], ["OpenAIModel", "Unknown"])
+    assert docs == ["## OpenAI\n\nGenerates"]
@@ -0,0 +1,61 @@
+"""
+tests/test_validator.py
+
+Malformed flows come back from FlowValidator as issues and fixes rather than
+exceptions, and repair() never rewires edges between duplicated node ids.
+
+    python -m pytest tests/test_validator.py
+"""
+from flow.validator import (DANGLING_EDGE, DUPLICATE_ID, MALFORMED_EDGE, MALFORMED_NODE, MISSING_ID, UNKNOWN_TYPE,
+                            flow_validator)
+
+
+def node(node_id, component="ChatInput"):
+    return {"id": node_id, "type": component, "data": {}}
+
+
+def codes(issues):
+    return sorted(issue["code"] for issue in issues)
+
+
+def test_duplicate_id_without_edges_is_renamed():
+    flow = {"nodes": [node("a"), node("a", "ChatOutput")], "edges": []}
+    repaired, fixes = flow_validator.repair(flow)
+    assert [n["id"] for n in repaired["nodes"]] == ["a", "a-2"]
+    assert fixes == ["Renamed duplicate node id 'a' to 'a-2'"]
+    assert flow_validator.validate(repaired) == []
+
+
+def test_duplicate_id_referenced_by_an_edge_is_reported():
+    flow = {"nodes": [node("in"), node("out", "ChatOutput"), node("out", "ChatOutput")],
+            "edges": [{"source": "in", "target": "out"}]}
+    repaired, fixes = flow_validator.repair(flow)
+    # Left as is: the edge could mean either node
+    assert [n["id"] for n in repaired["nodes"]] == ["in", "out", "out"]
+    assert repaired["edges"] == flow["edges"]
+    assert fixes == []
+    issues = flow_validator.validate(repaired)
+    assert codes(issues) == [DUPLICATE_ID]
+    request = flow_validator.repair_request(repaired, issues)
+    assert [n["id"] for n in request["nodes"]] == ["out", "out"]
+
+
+def test_malformed_entries_are_issues():
+    flow = {"nodes": ["ChatInput", node("in"), node(["x"]), node("t", {"not": "hashable"}),
+                      {"id": "g", "type": "genericNode", "data": ["ChatOutput"]}],
+            "edges": [None, {"source": "in", "target": ["t"]}, "in->t"]}
+    issues = flow_validator.validate(flow)
+    assert codes(issues) == sorted([MALFORMED_NODE, MISSING_ID, UNKNOWN_TYPE, UNKNOWN_TYPE,
+                                    MALFORMED_EDGE, DANGLING_EDGE, MALFORMED_EDGE])
+    request = flow_validator.repair_request(flow, issues)
+    assert sorted(n["id"] for n in request["nodes"]) == ["g", "in", "t"]
+
+
+def test_repair_drops_malformed_entries():
+    flow = {"nodes": [42, node("in"), node("out", ["ChatOutput"])],
+            "edges": ["in->out", {"source": "in", "target": "out"}, {"source": {}, "target": "out"}]}
+    repaired, fixes = flow_validator.repair(flow)
+    assert [n["id"] for n in repaired["nodes"]] == ["in", "out"]
+    assert repaired["edges"] == [{"source": "in", "target": "out"}]
+    assert fixes == ["Dropped malformed node 0", "Dropped malformed edge 0", "Dropped dangling edge {} -> out"]
+    assert codes(flow_validator.validate(repaired)) == [UNKNOWN_TYPE]